@@ -0,0 +1 @@
+# Benchmark and load-testing tools. Run modules with `python -m backend.benchmarks.<name>`.
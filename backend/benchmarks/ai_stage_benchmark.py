@@ -0,0 +1,149 @@
+# generate（AIステージ）のエンドツーエンド遅延をモックOpenAIサーバーに対して計測する
+#
+#   python -m backend.benchmarks.ai_stage_benchmark --runs 3
+#   python -m backend.benchmarks.ai_stage_benchmark --scenario rate_limited --max-retries 4
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from ..raw_store import write_raw_document
+from .mock_openai_server import MockScenario, create_app
+from .synthetic_data import make_raw_document
+
+SCENARIOS = {
+    "baseline": dict(latency="fixed:0.05"),
+    "slow": dict(latency="lognormal:0.0,0.5"),
+    "rate_limited": dict(latency="fixed:0.05", rate_limit=0.3),
+    "truncated": dict(latency="fixed:0.05", truncate=0.2),
+}
+
+
+class MockServerThread:
+    """Runs the mock OpenAI server with uvicorn in a background thread."""
+
+    def __init__(self, scenario):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(create_app(scenario), host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(name, runs, max_retries, timeout):
+    from ..data_fetcher import MarketDataError, MarketDataFetcher
+
+    class CountingFetcher(MarketDataFetcher):
+        """Counts logical AI calls and their failures to separate them from HTTP retries."""
+
+        def __init__(self):
+            super().__init__()
+            self.ai_calls = 0
+            self.ai_failures = 0
+            self.ai_call_seconds = []
+
+        def _call_openai_api(self, *args, **kwargs):
+            self.ai_calls += 1
+            started = time.perf_counter()
+            try:
+                return super()._call_openai_api(*args, **kwargs)
+            except MarketDataError:
+                self.ai_failures += 1
+                raise
+            finally:
+                self.ai_call_seconds.append(time.perf_counter() - started)
+
+    scenario = MockScenario(seed=0, **SCENARIOS[name])
+    latencies, calls, failures, call_seconds = [], 0, 0, []
+
+    with MockServerThread(scenario) as server:
+        os.environ.update({
+            "OPENAI_API_KEY": "mock-key",
+            "OPENAI_BASE_URL": server.base_url,
+            "OPENAI_MAX_RETRIES": str(max_retries),
+            "OPENAI_TIMEOUT": str(timeout),
+        })
+        for _ in range(runs):
+            fetcher = CountingFetcher()
+            started = time.perf_counter()
+            fetcher.generate_report()
+            latencies.append(time.perf_counter() - started)
+            calls += fetcher.ai_calls
+            failures += fetcher.ai_failures
+            call_seconds.extend(fetcher.ai_call_seconds)
+
+    stats = scenario.snapshot()
+    return {
+        "scenario": name,
+        "runs": runs,
+        "generate_p50_s": round(statistics.median(latencies), 3),
+        "generate_p95_s": round(_percentile(latencies, 95), 3),
+        "generate_max_s": round(max(latencies), 3),
+        "ai_call_p50_s": round(statistics.median(call_seconds), 3) if call_seconds else None,
+        "ai_calls": calls,
+        "ai_failures": failures,
+        "http_requests": stats.get("requests", 0),
+        "http_retries": stats.get("requests", 0) - calls,
+        "rate_limited": stats.get("rate_limited", 0),
+        "truncated": stats.get("truncated", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generate stage against a mock OpenAI server")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--tickers", type=int, default=600, help="size of the synthetic heatmap")
+    args = parser.parse_args()
+
+    from ..data_fetcher import logger as fetcher_logger
+    fetcher_logger.setLevel(logging.WARNING)
+
+    # generate_report は相対パス data/ を使うため、一時ディレクトリで実行する
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            os.makedirs("data")
+            write_raw_document(make_raw_document(args.tickers), os.path.join("data", "data_raw.bin"))
+
+            for name in args.scenario or sorted(SCENARIOS):
+                result = run_scenario(name, args.runs, args.max_retries, args.timeout)
+                print(json.dumps(result))
+        finally:
+            os.chdir(original_cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# 過去データの取得（指標の日次系列・1日分の一部）を、日付ファイルを毎回読む方法と索引を使う方法で比較する
+#
+#   python -m backend.benchmarks.archive_benchmark --days 30 --tickers 600
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from .. import data_archive
+from ..data_publisher import write_document
+from .synthetic_data import make_raw_document
+
+
+def timed(func, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return result, round(statistics.median(timings) * 1000, 3)
+
+
+def history_by_parsing(data_dir, metric):
+    """What a history query costs without the index: parse every dated file."""
+    series = []
+    for filename in sorted(os.listdir(data_dir)):
+        if data_archive.DATED_FILE_PATTERN.match(filename):
+            with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+                series.append([filename[5:15], data_archive.metric_values(json.load(f)).get(metric)])
+    return series
+
+
+def history_from_index(data_dir, metric):
+    return data_archive.load_index(data_dir)["series"][metric]
+
+
+def member_by_parsing(path, key):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)[key]
+
+
+def member_by_offset(path, offsets, key):
+    start, length = offsets[key]
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return json.loads(f.read(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark archive queries with and without the archive index")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--tickers", type=int, default=600, help="size of the synthetic heatmaps")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        document = make_raw_document(args.tickers)
+        first_day = date(2025, 9, 1)
+        for i in range(args.days):
+            day = (first_day + timedelta(days=i)).isoformat()
+            document["market"]["fear_and_greed"]["now"] = 20 + i % 60
+            path = os.path.join(workdir, f"data_{day}.json")
+            data = dict(document, date=day)
+            write_document(data, [path])
+            data_archive.record_snapshot(path, data)
+
+        parsed, parse_ms = timed(lambda: history_by_parsing(workdir, "fear_greed"), args.runs)
+        indexed, index_ms = timed(lambda: history_from_index(workdir, "fear_greed"), args.runs)
+        assert parsed == indexed
+        print(json.dumps({"query": "history fear_greed", "days": args.days,
+                          "parse_files_ms": parse_ms, "index_ms": index_ms}))
+
+        offsets = data_archive.load_index(workdir)["dates"][day]["offsets"]
+        parsed, parse_ms = timed(lambda: member_by_parsing(path, "market"), args.runs)
+        sliced, slice_ms = timed(lambda: member_by_offset(path, offsets, "market"), args.runs)
+        assert parsed == sliced
+        print(json.dumps({"query": "one day, market only", "file_bytes": os.path.getsize(path),
+                          "member_bytes": offsets["market"][1], "parse_file_ms": parse_ms, "offset_read_ms": slice_ms}))
+
+
+if __name__ == '__main__':
+    main()
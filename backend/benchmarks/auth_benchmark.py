@@ -0,0 +1,79 @@
+# 認証（JWT検証）1回あたりのコストを、python-jose で毎回検証する場合と検証済みトークンのキャッシュを使う場合で比較する
+#
+#   python -m backend.benchmarks.auth_benchmark --calls 20000 --tokens 1,100,5000
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from ..data_publisher import write_document
+from ..token_cache import AUTH_TOKEN_CACHE_SIZE, VerifiedTokenCache
+from .synthetic_data import make_raw_document
+
+
+def make_tokens(api, count):
+    return [api.create_access_token({"sub": f"user{i}", "type": "main"}, timedelta(hours=1)) for i in range(count)]
+
+
+def time_dependency(api, tokens, calls):
+    """Average microseconds of one get_current_user call, cycling through tokens."""
+    async def loop():
+        started = time.perf_counter()
+        for i in range(calls):
+            await api.get_current_user(f"Bearer {tokens[i % len(tokens)]}")
+        return time.perf_counter() - started
+    return round(asyncio.run(loop()) / calls * 1e6, 2)
+
+
+async def time_requests(api, token, requests):
+    """Median milliseconds of a GET /api/data/meta answered with 304 (the cheapest authenticated response)."""
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as client:
+        etag = (await client.get("/api/data/meta", headers=headers)).headers["etag"]
+        headers["If-None-Match"] = etag
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get("/api/data/meta", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 304
+    return round(statistics.median(latencies) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request JWT verification cost with and without the token cache")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--tokens", default="1,100,5000",
+                        help=f"distinct tokens in rotation (the cache holds {AUTH_TOKEN_CACHE_SIZE})")
+    parser.add_argument("--requests", type=int, default=2000, help="requests for the end-to-end comparison")
+    args = parser.parse_args()
+
+    from .. import main as api
+
+    api.security_manager.jwt_secret = "benchmark-secret"
+    for count in (int(value) for value in args.tokens.split(',')):
+        tokens = make_tokens(api, count)
+        api.verified_tokens = VerifiedTokenCache(maxsize=0)
+        uncached = time_dependency(api, tokens, args.calls)
+        api.verified_tokens = VerifiedTokenCache()
+        cached = time_dependency(api, tokens, args.calls)
+        print(json.dumps({"tokens": count, "jose_us_per_call": uncached, "cached_us_per_call": cached,
+                          "hit_ratio": round(api.verified_tokens.hits / args.calls, 3)}))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        api.DATA_DIR = data_dir
+        write_document(make_raw_document(50), [os.path.join(data_dir, "data_2025-09-01.json")])
+        token = make_tokens(api, 1)[0]
+        for name, cache in (("jose", VerifiedTokenCache(maxsize=0)), ("cached", VerifiedTokenCache())):
+            api.verified_tokens = cache
+            print(json.dumps({"variant": name, "meta_304_p50_ms": asyncio.run(time_requests(api, token, args.requests))}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# /api/data のスループット（req/s）を、毎回ファイルを読み直す従来の実装とキャッシュ版で比較する
+#
+#   python -m backend.benchmarks.data_api_benchmark --requests 500 --concurrency 16
+#   python -m backend.benchmarks.data_api_benchmark --accept-encoding identity
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from ..data_publisher import write_document
+from .synthetic_data import make_raw_document
+
+
+def legacy_app(main):
+    """The /api/data handler as it was before DataDocumentCache: listdir + json.load + re-serialization per request."""
+    from fastapi import Depends, FastAPI, HTTPException
+
+    app = FastAPI()
+
+    @app.get("/api/data")
+    def get_market_data(current_user: str = Depends(main.get_current_user)):
+        try:
+            data_file = main.get_latest_data_file()
+            if data_file is None or not os.path.exists(data_file):
+                raise HTTPException(status_code=404, detail="Data file not found.")
+            with open(data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return app
+
+
+async def run_load(app, token, total, concurrency, accept_encoding):
+    import httpx
+
+    latencies = []
+    transferred = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": accept_encoding}
+        # ウォームアップ（キャッシュ版では最初の読み込みをここで済ませる）
+        (await client.get("/api/data", headers=headers)).raise_for_status()
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                # 展開はクライアント側のコストなので、受信したままのバイト列を数える
+                async with client.stream("GET", "/api/data", headers=headers) as response:
+                    response.raise_for_status()
+                    size = 0
+                    async for chunk in response.aiter_raw():
+                        size += len(chunk)
+                latencies.append(time.perf_counter() - started)
+                transferred.append(size)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "response_bytes": int(statistics.median(transferred)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/data with and without the document cache")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tickers", type=int, default=600, help="size of the synthetic heatmap")
+    parser.add_argument("--accept-encoding", default="gzip, br", help="Accept-Encoding sent by the clients")
+    parser.add_argument("--history-files", type=int, default=7, help="older data_YYYY-MM-DD.json files in the directory")
+    args = parser.parse_args()
+
+    from .. import main as api
+
+    with tempfile.TemporaryDirectory() as workdir:
+        api.DATA_DIR = workdir
+        document = make_raw_document(args.tickers)
+        for day in range(args.history_files + 1):
+            path = os.path.join(workdir, f"data_2025-09-{day + 1:02d}.json")
+            # generate_report と同じく圧縮済みファイルとETagも書き出す
+            write_document(document, [path])
+        document_bytes = os.path.getsize(path)
+
+        api.security_manager.jwt_secret = "benchmark-secret"
+        token = api.create_access_token({"sub": "user", "type": "main"}, timedelta(hours=1))
+
+        for name, app in (("legacy", legacy_app(api)), ("cached", api.app)):
+            result = asyncio.run(run_load(app, token, args.requests, args.concurrency, args.accept_encoding))
+            print(json.dumps(dict({"variant": name, "document_bytes": document_bytes}, **result)))
+
+
+if __name__ == '__main__':
+    main()
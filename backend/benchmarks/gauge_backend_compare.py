@@ -0,0 +1,132 @@
+# ゲージ描画バックエンド（matplotlib / pillow / svg）の速度・サイズ・見た目の差を比較する
+#
+#   python -m backend.benchmarks.gauge_backend_compare --runs 10
+#   見た目の回帰チェックは backend/tests/test_gauge_visual.py
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .. import gauge_matplotlib, image_generator
+from .gauge_render_benchmark import sample_chart_data
+
+BACKENDS = ["matplotlib", "pillow", "svg"]
+
+# 新しいプロセスで1回だけ描画し、import込みの所要時間と最大RSSを測る
+# (ru_maxrss はLinuxではexec前の親プロセスの値を引き継ぐため、VmHWMを優先する)
+COLD_RUN_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from backend import image_generator
+image_generator.generate_fear_greed_chart(json.loads(sys.argv[1]), sys.argv[2])
+seconds = time.perf_counter() - started
+try:
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except (OSError, StopIteration):
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": seconds, "max_rss_mb": max_rss_kb / 1024}))
+"""
+
+
+def render(backend, data, output_dir):
+    os.environ['GAUGE_RENDERER'] = backend
+    return image_generator.generate_fear_greed_chart(data, output_dir)
+
+
+def load_rgb(path):
+    """Loads a rendered gauge as an RGB array, rasterizing SVGs when cairosvg is installed."""
+    import numpy as np
+    from PIL import Image
+
+    if path.endswith('.svg'):
+        try:
+            import cairosvg
+        except ImportError:
+            return None
+        png_path = path[:-4] + '.png'
+        cairosvg.svg2png(url=path, write_to=png_path)
+        path = png_path
+    with Image.open(path) as image:
+        return np.asarray(image.convert('RGB'), dtype=np.int16)
+
+
+def visual_diff(reference, candidate):
+    """Mean absolute channel difference and the share of pixels differing by more than 40 in any channel."""
+    import numpy as np
+
+    if candidate is None:
+        return None
+    if reference.shape != candidate.shape:
+        return {"size_mismatch": [list(reference.shape), list(candidate.shape)]}
+    delta = np.abs(reference - candidate)
+    return {
+        "mean_abs_diff": round(float(delta.mean()), 2),
+        "pixels_over_40_pct": round(float((delta.max(axis=2) > 40).mean() * 100), 2),
+    }
+
+
+def cold_run(backend, data, output_dir):
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    env = dict(os.environ, GAUGE_RENDERER=backend)
+    result = subprocess.run([sys.executable, "-c", COLD_RUN_SCRIPT, json.dumps(data), output_dir],
+                            cwd=repo_root, env=env, capture_output=True, text=True, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"cold_s": round(measured["seconds"], 3), "cold_max_rss_mb": round(measured["max_rss_mb"], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Fear & Greed gauge rendering backends")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cold", action="store_true", help="skip the fresh-process measurements")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    datasets = [sample_chart_data(rng) for _ in range(args.runs)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 背景キャッシュを一時ディレクトリに置き、data/ を汚さない
+        os.environ['GAUGE_CACHE_DIR'] = os.path.join(workdir, "cache")
+        gauge_matplotlib.template_renderer = gauge_matplotlib.GaugeTemplateRenderer(cache_dir=os.environ['GAUGE_CACHE_DIR'])
+        reference_dir = os.path.join(workdir, "reference")
+        os.makedirs(reference_dir)
+        references = [load_rgb(render("matplotlib", data, reference_dir)) for data in datasets[:3]]
+
+        for backend in BACKENDS:
+            output_dir = os.path.join(workdir, backend)
+            os.makedirs(output_dir)
+            timings = []
+            for data in datasets:
+                started = time.perf_counter()
+                path = render(backend, data, output_dir)
+                timings.append(time.perf_counter() - started)
+
+            steady = timings[1:] or timings
+            result = {
+                "backend": backend,
+                "renders": len(timings),
+                "first_ms": round(timings[0] * 1000, 1),
+                "steady_p50_ms": round(statistics.median(steady) * 1000, 1),
+                "bytes": os.path.getsize(path),
+            }
+
+            if backend != "matplotlib":
+                diffs = [visual_diff(reference, load_rgb(render(backend, data, output_dir)))
+                         for reference, data in zip(references, datasets)]
+                result["visual_diff"] = diffs[0] if diffs[0] is None or "size_mismatch" in diffs[0] else {
+                    key: max(d[key] for d in diffs) for key in diffs[0]
+                }
+
+            if not args.no_cold:
+                result.update(cold_run(backend, datasets[0], output_dir))
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
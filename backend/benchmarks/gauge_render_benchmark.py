@@ -0,0 +1,83 @@
+# Fear & Greed ゲージ描画の速度とメモリを、毎回フル描画する方式とテンプレート方式で比較する
+#
+#   python -m backend.benchmarks.gauge_render_benchmark --runs 20
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from .. import gauge_matplotlib, image_generator
+
+
+def sample_chart_data(rng):
+    """Builds chart data shaped like the one fetch_fear_greed_index passes to the renderer."""
+    def item(label, value):
+        return {"label": label, "status": image_generator.get_fear_greed_category(value), "value": value}
+
+    return {
+        "center_value": rng.randint(0, 100),
+        "history": {
+            "previous_close": item("Previous close", rng.randint(0, 100)),
+            "week_ago": item("1 week ago", rng.randint(0, 100)),
+            "month_ago": item("1 month ago", rng.randint(0, 100)),
+            "year_ago": item("1 year ago", rng.randint(0, 100)),
+        },
+    }
+
+
+def measure(name, render, datasets, output_path):
+    """Renders every dataset, returning first-call and steady-state timings plus peak traced memory."""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    timings = []
+    for data in datasets:
+        started = time.perf_counter()
+        render(data, output_path)
+        timings.append(time.perf_counter() - started)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    steady = timings[1:] or timings
+    return {
+        "renderer": name,
+        "renders": len(timings),
+        "first_ms": round(timings[0] * 1000, 1),
+        "steady_p50_ms": round(statistics.median(steady) * 1000, 1),
+        "steady_mean_ms": round(statistics.mean(steady) * 1000, 1),
+        "peak_traced_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "png_bytes": os.path.getsize(output_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Fear & Greed gauge renderers")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    datasets = [sample_chart_data(rng) for _ in range(args.runs)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        renderer = gauge_matplotlib.GaugeTemplateRenderer(cache_dir=os.path.join(workdir, "cache"))
+        cases = [
+            ("full", gauge_matplotlib.render_fear_greed_chart_full),
+            ("template_cold_cache", renderer.render),
+            # 2回目は全カテゴリの背景がメモリ・ディスクにある状態
+            ("template_warm_cache", renderer.render),
+            # 新しいプロセスを模して、ディスク上のベースPNGのみを使う
+            ("template_disk_cache", gauge_matplotlib.GaugeTemplateRenderer(cache_dir=os.path.join(workdir, "cache")).render),
+        ]
+        for name, render in cases:
+            print(json.dumps(measure(name, render, datasets, os.path.join(workdir, f"{name}.png"))))
+
+
+if __name__ == '__main__':
+    main()
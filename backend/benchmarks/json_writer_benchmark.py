@@ -0,0 +1,108 @@
+# 取得データ（data_raw.json）の書き込みと公開時の直列化を、NaN/Infinity を含む大きな文書で比較する。
+# 以前の方法（_clean_non_compliant_floats で文書全体を複製してから json.dump(indent=2)）と、
+# 直列化しながら null に置き換える write_json / serialize（orjson と標準jsonのフォールバック）の時間とピークRSSの増分
+#
+#   python -m backend.benchmarks.json_writer_benchmark --tickers 3000
+import argparse
+import gc
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+
+from .. import data_publisher
+from .sse_benchmark import rss_mb
+from .synthetic_data import make_raw_document
+
+
+def clean_non_compliant_floats(obj):
+    """The recursive copy data_fetcher used to make before every write."""
+    if isinstance(obj, dict):
+        return {k: clean_non_compliant_floats(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [clean_non_compliant_floats(elem) for elem in obj]
+    if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
+        return None
+    return obj
+
+
+def legacy_raw_write(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(clean_non_compliant_floats(data), f, indent=2, ensure_ascii=False)
+
+
+def streaming_raw_write(data, path):
+    with open(path, 'wb') as f:
+        data_publisher.write_json(data, f)
+
+
+def legacy_serialize(data):
+    return json.dumps(clean_non_compliant_floats(data), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode('utf-8')
+
+
+def reset_peak_rss():
+    """Resets VmHWM (Linux) so the next read is the peak since now. Returns False where that is not allowed."""
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+
+
+def measure(fn, runs):
+    """(median ms, peak RSS growth in MB over the RSS before the first run)."""
+    gc.collect()
+    before = rss_mb(os.getpid())
+    resettable = reset_peak_rss()
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    growth = round(peak_rss_mb() - before, 1) if resettable else None
+    return round(statistics.median(times) * 1000, 1), growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sanitizing while encoding vs copying the document first")
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--nan-ratio", type=float, default=0.02, help="share of heatmap performances that are NaN")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    document = make_raw_document(args.tickers, nan_ratio=args.nan_ratio)
+    orjson = data_publisher.orjson
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "data_raw.json")
+        variants = [
+            ("raw: clean + json.dump(indent=2)", None, lambda: legacy_raw_write(document, path)),
+            ("raw: write_json (orjson)", orjson, lambda: streaming_raw_write(document, path)),
+            ("raw: write_json (json)", None, lambda: streaming_raw_write(document, path)),
+            ("publish: clean + json.dumps", None, lambda: legacy_serialize(document)),
+            ("publish: serialize (orjson)", orjson, lambda: data_publisher.serialize(document)),
+            ("publish: serialize (json)", None, lambda: data_publisher.serialize(document)),
+        ]
+        for name, encoder, fn in variants:
+            if "orjson" in name and encoder is None:
+                print(json.dumps({"variant": name, "skipped": "orjson is not installed"}, ensure_ascii=False))
+                continue
+            data_publisher.orjson = encoder
+            ms, growth = measure(fn, args.runs)
+            result = {"variant": name, "tickers": args.tickers, "ms": ms, "peak_rss_growth_mb": growth}
+            if name.startswith("raw"):
+                result["file_mb"] = round(os.path.getsize(path) / 1e6, 2)
+            print(json.dumps(result, ensure_ascii=False))
+    data_publisher.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
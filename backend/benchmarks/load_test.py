@@ -0,0 +1,237 @@
+# backend.main:app への負荷試験。ダッシュボードの実際のアクセスに近い混合リクエストを、
+# 大きさの異なる合成データに対して流し、エンドポイントごとの p50/p95/p99・スループット・メモリを出す
+#
+#   python -m backend.benchmarks.load_test --tickers 100,600,3000 --concurrency 32 --duration 10
+#   python -m backend.benchmarks.load_test --transport uvicorn            # 実際のソケット経由（別プロセスのuvicorn）
+#   python -m backend.benchmarks.load_test --save-baseline load_baseline.json
+#   python -m backend.benchmarks.load_test --baseline load_baseline.json   # 基準より悪化したら終了コード1
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from ..data_archive import record_snapshot
+from ..data_publisher import write_document
+from .sse_benchmark import SERVER_SCRIPT, free_port, rss_mb, wait_until_up
+from .synthetic_data import make_raw_document
+
+# ダッシュボードを開いたときと、開いている間のアクセス（重みは1分あたりのおおよその比率）
+DEFAULT_MIX = "meta=4,meta_304=2,section=3,full=1,history=1,static=2,health=1"
+# タブを開いたときに取得するセクション（frontend/app.js の TAB_SECTIONS）
+SECTIONS = ["market", "news", "indicators", "nasdaq_heatmap_1d", "sp500_combined_heatmap_1d"]
+STATIC_PATHS = ["/", "/app.js", "/style.css", "/manifest.json"]
+# 基準と比べるときの指標と、悪化とみなす方向
+BASELINE_METRICS = {"req_per_s": "lower", "p95_ms": "higher", "p99_ms": "higher"}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(REQUESTS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown request kind(s): {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _auth(state):
+    return {"Authorization": f"Bearer {state['token']}", "Accept-Encoding": "gzip, br"}
+
+
+# 種類ごとに (path, headers) を返す。state はシナリオ中に覚えておく値（トークン・metaのETag）
+REQUESTS = {
+    "meta": lambda rng, state: ("/api/data/meta", _auth(state)),
+    # Service Worker の再検証（If-None-Match 付き、通常は304）
+    "meta_304": lambda rng, state: ("/api/data/meta", dict(_auth(state), **{"If-None-Match": state["meta_etag"]})),
+    "section": lambda rng, state: (f"/api/data/{rng.choice(SECTIONS)}", _auth(state)),
+    "full": lambda rng, state: ("/api/data", _auth(state)),
+    "history": lambda rng, state: ("/api/history/vix", _auth(state)),
+    "static": lambda rng, state: (rng.choice(STATIC_PATHS), {"Accept-Encoding": "gzip, br"}),
+    "health": lambda rng, state: ("/api/health", {}),
+}
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(latencies, elapsed=None):
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+    if elapsed:
+        summary["req_per_s"] = round(len(latencies) / elapsed, 1)
+    return summary
+
+
+def prepare_data(data_dir, tickers, history_days=5):
+    """Publishes history_days dated documents of the given size (plus data.json and the archive index)."""
+    document = make_raw_document(tickers)
+    for day in range(history_days):
+        path = os.path.join(data_dir, f"data_2025-09-{day + 1:02d}.json")
+        document["market"]["vix"]["current"] = 15 + day
+        write_document(document, [path])
+        record_snapshot(path, document)
+    write_document(document, [os.path.join(data_dir, "data.json")])
+    return os.path.getsize(path)
+
+
+async def run_scenario(client, token, mix, concurrency, duration, seed):
+    rng = random.Random(seed)
+    state = {"token": token}
+    meta = await client.get("/api/data/meta", headers=_auth(state))
+    meta.raise_for_status()
+    state["meta_etag"] = meta.headers["etag"]
+    kinds, weights = list(mix), list(mix.values())
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    transferred = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(user_rng):
+        nonlocal transferred
+        while time.perf_counter() < deadline:
+            kind = user_rng.choices(kinds, weights)[0]
+            path, headers = REQUESTS[kind](user_rng, state)
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                body = response.content
+            except Exception:
+                errors[kind] += 1
+                continue
+            latencies[kind].append(time.perf_counter() - started)
+            transferred += len(body)
+            if response.status_code >= 400:
+                errors[kind] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(random.Random(rng.random())) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    overall = summarize([value for values in latencies.values() for value in values], elapsed)
+    overall["errors"] = sum(errors.values())
+    overall["mb_transferred"] = round(transferred / 1e6, 1)
+    overall["endpoints"] = {kind: dict(summarize(values), errors=errors[kind])
+                            for kind, values in sorted(latencies.items())}
+    return overall
+
+
+async def run_asgi(args, data_dir, token, mix):
+    import httpx
+    from .. import main as api
+
+    api.DATA_DIR = data_dir
+    # 前のシナリオ（別の大きさのデータ）のキャッシュを持ち越さない
+    api.data_cache = api.DataDocumentCache()
+    api.archive_index = api.ArchiveIndexCache()
+    rss_before = rss_mb(os.getpid())
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=60) as client:
+        result = await run_scenario(client, token, mix, args.concurrency, args.duration, args.seed)
+    result["rss_mb"] = round(rss_mb(os.getpid()), 1)
+    result["rss_growth_mb"] = round(result["rss_mb"] - rss_before, 1)
+    return result
+
+
+async def run_uvicorn(args, data_dir, token, mix):
+    import httpx
+
+    port = free_port()
+    env = dict(os.environ, JWT_SECRET_KEY="benchmark-secret", VAPID_PUBLIC_KEY="benchmark",
+               VAPID_PRIVATE_KEY="benchmark")
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, data_dir, str(port)], cwd=repo_root, env=env)
+    try:
+        await wait_until_up(port)
+        rss_before = rss_mb(server.pid)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            result = await run_scenario(client, token, mix, args.concurrency, args.duration, args.seed)
+        result["rss_mb"] = round(rss_mb(server.pid), 1)
+        result["rss_growth_mb"] = round(result["rss_mb"] - rss_before, 1)
+        return result
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def compare(results, baseline, tolerance):
+    """Returns the metrics of results that are more than tolerance worse than the stored baseline."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, worse in BASELINE_METRICS.items():
+            if metric not in reference:
+                continue
+            limit = reference[metric] * (1 - tolerance if worse == "lower" else 1 + tolerance)
+            if (result[metric] < limit) if worse == "lower" else (result[metric] > limit):
+                regressions.append({"scenario": key, "metric": metric, "baseline": reference[metric],
+                                    "current": result[metric], "limit": round(limit, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test backend.main:app with a dashboard-like request mix")
+    parser.add_argument("--tickers", default="100,600", help="comma-separated sizes of the synthetic documents")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users (no think time)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"request kinds and weights (default {DEFAULT_MIX})")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi",
+                        help="in-process httpx ASGI client, or a uvicorn subprocess over real sockets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="JSON file of a previous --save-baseline run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    from .. import main as api
+
+    api.security_manager.jwt_secret = "benchmark-secret"
+    token = api.create_access_token({"sub": "user", "type": "main"}, timedelta(hours=1))
+    runner = run_asgi if args.transport == "asgi" else run_uvicorn
+
+    results = {}
+    for tickers in (int(value) for value in args.tickers.split(',')):
+        with tempfile.TemporaryDirectory() as data_dir:
+            document_bytes = prepare_data(data_dir, tickers)
+            result = asyncio.run(runner(args, data_dir, token, args.mix))
+        key = f"{args.transport}:tickers={tickers}:concurrency={args.concurrency}"
+        results[key] = dict({"document_bytes": document_bytes}, **result)
+        print(json.dumps(dict({"scenario": key}, **results[key])))
+    print(json.dumps({"peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(json.dumps({"regressions": regressions}))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# OpenAI互換のモックサーバー（APIキー不要でAIステージのベンチマーク・負荷試験を行うため）
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# All AI sections read either "response" or "summary"/"topics", so one body serves every prompt.
+DEFAULT_BODY = {
+    "response": "モックサーバーによるAI解説です。市場は落ち着いた動きとなっています。",
+    "summary": "モックサーバーによるサマリーです。",
+    "topics": [
+        {"title": "モックトピック", "analysis": "モックサーバーが生成した分析です。", "url": "https://example.com/"}
+    ],
+}
+
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution spec into a sampler returning seconds.
+    Supported: "fixed:S", "uniform:LO,HI", "normal:MEAN,SD", "lognormal:MU,SIGMA", "exp:MEAN".
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(values[0], values[1])
+    if kind == 'exp':
+        return lambda: random.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class MockScenario:
+    """Behaviour of the mock server: scripted bodies, latency, rate limits and truncation."""
+
+    def __init__(self, bodies=None, latency="fixed:0", rate_limit=0.0, truncate=0.0, retry_after_ms=200, seed=None):
+        self.bodies = bodies or [DEFAULT_BODY]
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.rate_limit = rate_limit
+        self.truncate = truncate
+        self.retry_after_ms = retry_after_ms
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._next_body = 0
+
+    def next_body(self):
+        with self._lock:
+            body = self.bodies[self._next_body % len(self.bodies)]
+            self._next_body += 1
+        return json.dumps(body, ensure_ascii=False)
+
+    def record(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self._next_body = 0
+
+
+def _completion(model, content, finish_reason):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason,
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content), "total_tokens": len(content)},
+    }
+
+
+def _stream_chunks(model, content, finish_reason, chunk_size=16):
+    base = {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+    }
+    first = dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    yield f"data: {json.dumps(first)}\n\n"
+    for i in range(0, len(content), chunk_size):
+        chunk = dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + chunk_size]}, "finish_reason": None}])
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    last = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+    yield f"data: {json.dumps(last)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_app(scenario):
+    """Creates the FastAPI app serving /v1/chat/completions for the given scenario."""
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        scenario.record("requests")
+        await asyncio.sleep(scenario.sample_latency())
+
+        if scenario.random.random() < scenario.rate_limit:
+            scenario.record("rate_limited")
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(scenario.retry_after_ms)},
+                content={"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+
+        content = scenario.next_body()
+        finish_reason = "stop"
+        if scenario.random.random() < scenario.truncate:
+            # max_tokens到達を模して途中で切れたJSONを返す
+            scenario.record("truncated")
+            content = content[:max(1, len(content) // 2)]
+            finish_reason = "length"
+
+        model = payload.get("model", "mock-model")
+        scenario.record("completed")
+        if payload.get("stream"):
+            return StreamingResponse(_stream_chunks(model, content, finish_reason), media_type="text/event-stream")
+        return _completion(model, content, finish_reason)
+
+    @app.get("/_stats")
+    def stats():
+        return scenario.snapshot()
+
+    return app
+
+
+def load_bodies(path):
+    """Loads scripted response bodies from a JSON file (a single object or a list of objects)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        bodies = json.load(f)
+    return bodies if isinstance(bodies, list) else [bodies]
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock server for HanaView benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with the response bodies to serve in order")
+    parser.add_argument("--latency", default="fixed:0", help="e.g. fixed:0.5, uniform:0.2,1.5, lognormal:-0.5,0.4")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probability of answering 429")
+    parser.add_argument("--truncate", type=float, default=0.0, help="probability of finish_reason == 'length'")
+    parser.add_argument("--retry-after-ms", type=int, default=200)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    scenario = MockScenario(
+        bodies=load_bodies(args.script) if args.script else None,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        truncate=args.truncate,
+        retry_after_ms=args.retry_after_ms,
+        seed=args.seed,
+    )
+    print(f"Mock OpenAI server: set OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(scenario), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# ローカルのモックプッシュサービスに向けて通知を一斉送信し、従来の逐次送信と PushSender の並列送信を比較する
+# モックは新しい接続ごとに --connect-ms 待つ（実際のプッシュサービスへのTLSハンドシェイクの代わり）
+#
+#   python -m backend.benchmarks.push_benchmark --subscriptions 500 --workers 16
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from pywebpush import webpush, WebPushException
+
+from ..push_sender import PushSender
+from ..subscription_store import subscription_id
+
+VAPID_SUBJECT = "mailto:benchmark@hanaview.local"
+NOTIFICATION = {"title": "朝の市況データ更新完了", "body": "06:30の最新データが準備できました", "type": "data-update"}
+
+
+def b64(raw):
+    return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+
+
+def make_vapid_private_key():
+    """The same base64url DER format as security_manager.generate_vapid_keys."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    return b64(key.private_bytes(serialization.Encoding.DER, serialization.PrivateFormat.PKCS8,
+                                 serialization.NoEncryption()))
+
+
+def make_subscriptions(count, base_url, expired_every=0):
+    """Subscriptions with real P-256 keys spread over three fake push-service origins of base_url."""
+    p256dh = b64(ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint))
+    subscriptions = {}
+    for i in range(count):
+        service = ("fcm", "mozilla", "apple")[i % 3]
+        state = "expired" if expired_every and i % expired_every == 0 else "active"
+        endpoint = f"{base_url}/{service}/{state}/{i}"
+        subscriptions[subscription_id(endpoint)] = {
+            "endpoint": endpoint,
+            "keys": {"p256dh": p256dh, "auth": b64(os.urandom(16))},
+        }
+    return subscriptions
+
+
+class MockPushService(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, connect_ms, latency_ms):
+        self.connect_ms = connect_ms
+        self.latency_ms = latency_ms
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), MockPushHandler)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockPushHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: 接続を使い回すクライアントはハンドシェイクを1回で済ませる
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_ms / 1000)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency_ms / 1000)
+        status = 410 if "/expired/" in self.path else 201
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def sequential(subscriptions, vapid_private_key):
+    """The loop of send_push_notifications before PushSender: one webpush() (and connection) per subscription."""
+    sent, expired = 0, []
+    for subscription in subscriptions.values():
+        try:
+            webpush(subscription_info=subscription, data=json.dumps(NOTIFICATION),
+                    vapid_private_key=vapid_private_key, vapid_claims={"sub": VAPID_SUBJECT})
+            sent += 1
+        except WebPushException as ex:
+            if ex.response is not None and ex.response.status_code in (404, 410):
+                expired.append(subscription["endpoint"])
+    return {"sent": sent, "expired": len(expired)}
+
+
+def fan_out(subscriptions, vapid_private_key, workers):
+    sender = PushSender(vapid_private_key, VAPID_SUBJECT, max_workers=workers)
+    try:
+        report = sender.send(subscriptions, NOTIFICATION)
+    finally:
+        sender.close()
+    return {"sent": report["sent"], "expired": len(report["expired"]), "latency_ms": report["latency_ms"]}
+
+
+def run(variant, args, vapid_private_key):
+    server = MockPushService(args.connect_ms, args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        subscriptions = make_subscriptions(args.subscriptions, server.base_url, args.expired_every)
+        started = time.perf_counter()
+        if variant == "sequential":
+            result = sequential(subscriptions, vapid_private_key)
+        else:
+            result = fan_out(subscriptions, vapid_private_key, args.workers)
+        elapsed = time.perf_counter() - started
+        return dict({"variant": variant, "subscriptions": args.subscriptions,
+                     "elapsed_s": round(elapsed, 2),
+                     "per_s": round(args.subscriptions / elapsed, 1),
+                     "connections_opened": server.connections}, **result)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push fan-out benchmark against a local mock push service")
+    parser.add_argument("--subscriptions", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--connect-ms", type=float, default=30, help="simulated TLS handshake per new connection")
+    parser.add_argument("--latency-ms", type=float, default=20, help="push service response time")
+    parser.add_argument("--expired-every", type=int, default=50, help="every Nth subscription answers 410")
+    parser.add_argument("--variants", default="sequential,fan_out")
+    args = parser.parse_args()
+    vapid_private_key = make_vapid_private_key()
+    for variant in args.variants.split(','):
+        print(json.dumps(run(variant, args, vapid_private_key)))
+
+
+if __name__ == '__main__':
+    main()
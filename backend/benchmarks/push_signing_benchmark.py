@@ -0,0 +1,118 @@
+# 送信前の処理（VAPID鍵の解析・JWT署名・データの直列化・暗号化）だけを、ネットワークなしで1件ずつ計測する
+# webpush() を毎回呼ぶ従来の方法と、VapidSigner で署名を使い回す PushSender の方法を比較する
+#
+#   python -m backend.benchmarks.push_signing_benchmark --subscriptions 10000
+import argparse
+import json
+import time
+
+from pywebpush import Vapid, WebPusher, webpush
+
+from ..push_sender import PushSender, push_origin
+from ..push_signing import VapidSigner, serialize_payload
+from .push_benchmark import NOTIFICATION, VAPID_SUBJECT, make_subscriptions, make_vapid_private_key
+
+# 3つのプッシュサービス（= 3つの audience）に分散させる
+PUSH_SERVICE_URLS = ["https://fcm.googleapis.com/fcm/send", "https://updates.push.services.mozilla.com/wpush/v2",
+                     "https://web.push.apple.com"]
+
+
+class NullResponse:
+    status_code = 201
+    reason = "Created"
+    text = ""
+
+
+class NullSession:
+    """Stands in for requests.Session so that only the work done before the request is timed."""
+
+    def post(self, *args, **kwargs):
+        return NullResponse()
+
+    def close(self):
+        pass
+
+
+class OfflinePushSender(PushSender):
+    def _session(self, origin):
+        return NullSession()
+
+
+def synthetic_subscriptions(count):
+    subscriptions = {}
+    for i, base_url in enumerate(PUSH_SERVICE_URLS):
+        subscriptions.update(make_subscriptions(count // len(PUSH_SERVICE_URLS) + (i < count % len(PUSH_SERVICE_URLS)),
+                                                f"{base_url}/{i}"))
+    return subscriptions
+
+
+def legacy(subscriptions, vapid_private_key):
+    """What send_push_notifications did per subscription: dumps, parse the key, sign a JWT, encrypt."""
+    session = NullSession()
+    for subscription in subscriptions.values():
+        webpush(subscription_info=subscription, data=json.dumps(NOTIFICATION), vapid_private_key=vapid_private_key,
+                vapid_claims={"sub": VAPID_SUBJECT}, requests_session=session)
+
+
+def precomputed(subscriptions, vapid_private_key):
+    """Per subscription only the ECDH encryption; the headers and the payload are shared."""
+    signer = VapidSigner(vapid_private_key, VAPID_SUBJECT)
+    data = serialize_payload(NOTIFICATION)
+    session = NullSession()
+    for subscription in subscriptions.values():
+        WebPusher(subscription, requests_session=session).send(
+            data, dict(signer.headers(push_origin(subscription["endpoint"]))))
+    return {"jwts_signed": len(signer._tokens)}
+
+
+def push_sender(subscriptions, vapid_private_key, workers):
+    sender = OfflinePushSender(vapid_private_key, VAPID_SUBJECT, max_workers=workers)
+    report = sender.send(subscriptions, NOTIFICATION)
+    return {"sent": report["sent"]}
+
+
+def timed(name, count, func, *args):
+    started = time.perf_counter()
+    extra = func(*args) or {}
+    elapsed = time.perf_counter() - started
+    return dict({"variant": name, "subscriptions": count, "elapsed_s": round(elapsed, 3),
+                 "us_per_subscription": round(elapsed / count * 1e6, 1)}, **extra)
+
+
+def component_costs(vapid_private_key, subscription, runs=1000):
+    """Average cost of each step that legacy repeats per subscription."""
+    vapid = Vapid.from_string(private_key=vapid_private_key)
+    claims = {"sub": VAPID_SUBJECT, "aud": "https://fcm.googleapis.com", "exp": int(time.time()) + 3600}
+    data = serialize_payload(NOTIFICATION)
+    steps = {
+        "parse_key": lambda: Vapid.from_string(private_key=vapid_private_key),
+        "sign_jwt": lambda: vapid.sign(claims),
+        "serialize_payload": lambda: json.dumps(NOTIFICATION),
+        "encrypt": lambda: WebPusher(subscription).encode(data),
+    }
+    costs = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        for _ in range(runs):
+            step()
+        costs[name] = round((time.perf_counter() - started) / runs * 1e6, 1)
+    return {"component_us": costs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-subscription push preparation cost without network")
+    parser.add_argument("--subscriptions", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    vapid_private_key = make_vapid_private_key()
+    subscriptions = synthetic_subscriptions(args.subscriptions)
+    print(json.dumps(component_costs(vapid_private_key, next(iter(subscriptions.values())))))
+    print(json.dumps(timed("legacy_webpush", len(subscriptions), legacy, subscriptions, vapid_private_key)))
+    print(json.dumps(timed("precomputed", len(subscriptions), precomputed, subscriptions, vapid_private_key)))
+    print(json.dumps(timed("push_sender", len(subscriptions), push_sender, subscriptions, vapid_private_key,
+                           args.workers)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# fetch → generate の受け渡しを、以前の data_raw.json（indent=2 を json.load で全体読み込み）と
+# data_raw.bin（トップレベルのキーごとに圧縮したコンテナを mmap し、必要なメンバーだけ展開）で比較する。
+# ファイルサイズ、generate が使うメンバーを読むまでの時間とピークRSSの増分、読み込んだ文書の公開（write_document）時間
+#
+#   python -m backend.benchmarks.raw_handoff_benchmark --tickers 3000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .. import raw_store
+from ..data_publisher import write_document
+from ..raw_store import LazyDocument, write_raw_document
+from .json_writer_benchmark import measure
+from .synthetic_data import make_raw_document
+
+# AIセクションの生成で読むトップレベルのキー（data_fetcher の generate ステージ）
+GENERATE_READS = ["market", "news_raw", "indicators", "nasdaq_heatmap_1d", "sp500_heatmap_1d",
+                  "sector_etf_heatmap_1d", "sector_etf_heatmap_1w", "sector_etf_heatmap_1m"]
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def with_document(path, fn):
+    """Calls fn with the loaded document; a LazyDocument is closed afterwards, as generate_report does."""
+    if not path.endswith(".bin"):
+        return fn(load_json(path))
+    with LazyDocument(path) as document:
+        return fn(document)
+
+
+def read_for_generate(document):
+    for key in GENERATE_READS:
+        document.get(key)
+    return document
+
+
+def measure_format(path, runs):
+    """Runs in a fresh process per format, so one format's heap does not hide the next one's peak RSS."""
+    publish_path = os.path.join(os.path.dirname(path), "data_2025-09-01.json")
+    load_ms, growth = measure(lambda: with_document(path, read_for_generate), runs)
+    full_ms, full_growth = measure(lambda: with_document(path, dict), runs)
+    publish_ms, publish_growth = measure(
+        lambda: with_document(path, lambda document: write_document(read_for_generate(document), [publish_path])), runs)
+    return {
+        "file_mb": round(os.path.getsize(path) / 1e6, 2),
+        "load_generate_members_ms": load_ms, "load_peak_rss_growth_mb": growth,
+        "load_everything_ms": full_ms, "load_everything_peak_rss_growth_mb": full_growth,
+        "load_and_publish_ms": publish_ms, "publish_peak_rss_growth_mb": publish_growth,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="data_raw.json vs the sectioned, compressed data_raw.bin")
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_format(args.measure, args.runs)))
+        return
+
+    document = make_raw_document(args.tickers, nan_ratio=0.02)
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, "data_raw.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+        formats = [("data_raw.json (indent=2)", json_path)]
+        for codec in ["zlib"] + (["zstd"] if raw_store.zstandard is not None else []):
+            path = os.path.join(workdir, f"data_raw.{codec}.bin")
+            write_raw_document(document, path, codec=codec)
+            formats.append((f"data_raw.bin ({codec})", path))
+
+        for name, path in formats:
+            output = subprocess.run([sys.executable, "-m", __spec__.name, "--measure", path, "--runs", str(args.runs)],
+                                    check=True, capture_output=True, text=True).stdout
+            print(json.dumps(dict({"format": name, "tickers": args.tickers}, **json.loads(output)), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
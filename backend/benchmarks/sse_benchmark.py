@@ -0,0 +1,171 @@
+# /api/events（Server-Sent Events）に多数のアイドル接続を張り、サーバーのメモリと更新通知の配信時間を測る
+#
+#   python -m backend.benchmarks.sse_benchmark --connections 2000
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from ..data_publisher import write_document
+from .synthetic_data import make_raw_document
+
+# DATA_DIR を一時ディレクトリに向けて uvicorn を起動する
+SERVER_SCRIPT = """
+import sys, uvicorn
+from backend import main
+main.DATA_DIR = sys.argv[1]
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[2]), log_level="warning", backlog=4096,
+            timeout_graceful_shutdown=2)
+"""
+EVENT_MARKER = b"event: data-update"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+
+
+async def wait_until_up(port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /api/health HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            if b"200" in await reader.readline():
+                writer.close()
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+class Client:
+    """One idle EventSource-like connection that records when each data-update event arrives."""
+
+    def __init__(self):
+        self.events = []
+        self.reader = self.writer = None
+
+    async def connect(self, port, token):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(f"GET /api/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n"
+                          f"Authorization: Bearer {token}\r\n\r\n".encode())
+        await self.writer.drain()
+
+    async def read_events(self):
+        buffer = b""
+        while True:
+            chunk = await self.reader.read(4096)
+            if not chunk:
+                return
+            buffer += chunk
+            for _ in range(buffer.count(EVENT_MARKER)):
+                self.events.append(time.perf_counter())
+            buffer = buffer[buffer.rfind(EVENT_MARKER) + len(EVENT_MARKER):] if EVENT_MARKER in buffer else buffer[-64:]
+
+    async def wait_for_events(self, count, timeout):
+        deadline = time.monotonic() + timeout
+        while len(self.events) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return len(self.events) >= count
+
+
+async def run(args, data_dir, document, token):
+    port = free_port()
+    env = dict(os.environ, JWT_SECRET_KEY="benchmark-secret", VAPID_PUBLIC_KEY="benchmark",
+               VAPID_PRIVATE_KEY="benchmark", DATA_CACHE_CHECK_SECONDS=str(args.check_interval))
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, data_dir, str(port)], cwd=repo_root, env=env)
+    clients = []
+    try:
+        await wait_until_up(port)
+        idle_rss = rss_mb(server.pid)
+
+        readers = []
+        for start in range(0, args.connections, 200):
+            batch = [Client() for _ in range(min(200, args.connections - start))]
+            await asyncio.gather(*(client.connect(port, token) for client in batch))
+            readers += [asyncio.create_task(client.read_events()) for client in batch]
+            clients += batch
+        # 接続直後に現在の版が1回届く
+        connected = await asyncio.gather(*(client.wait_for_events(1, 30) for client in clients))
+        await asyncio.sleep(1)
+        connected_rss = rss_mb(server.pid)
+
+        publish_latencies = []
+        for _ in range(args.updates):
+            before = [len(client.events) for client in clients]
+            published = time.perf_counter()
+            write_document(document, [os.path.join(data_dir, "data_2025-09-01.json")])
+            await asyncio.gather(*(client.wait_for_events(n + 1, 30) for client, n in zip(clients, before)))
+            arrivals = sorted(client.events[n] - published for client, n in zip(clients, before)
+                              if len(client.events) > n)
+            publish_latencies.append({
+                "received": len(arrivals),
+                "first_ms": round(arrivals[0] * 1000, 1),
+                "p50_ms": round(statistics.median(arrivals) * 1000, 1),
+                "last_ms": round(arrivals[-1] * 1000, 1),
+                "fan_out_ms": round((arrivals[-1] - arrivals[0]) * 1000, 1),
+            })
+
+        for task in readers:
+            task.cancel()
+        return {
+            "connections": args.connections,
+            "connected": sum(connected),
+            "server_rss_idle_mb": round(idle_rss, 1),
+            "server_rss_connected_mb": round(connected_rss, 1),
+            "kb_per_connection": round((connected_rss - idle_rss) * 1024 / max(1, args.connections), 1),
+            "updates": publish_latencies,
+        }
+    finally:
+        for client in clients:
+            if client.writer is not None:
+                client.writer.close()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hold many idle /api/events connections and time update fan-out")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=3, help="number of publishes to time")
+    parser.add_argument("--tickers", type=int, default=100, help="size of the synthetic document")
+    parser.add_argument("--check-interval", type=float, default=1.0, help="DATA_CACHE_CHECK_SECONDS of the server")
+    args = parser.parse_args()
+
+    import resource
+    # クライアント側だけで --connections 個のソケットを開くため、ファイルディスクリプタ上限を引き上げる
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    from .. import main as api
+
+    api.security_manager.jwt_secret = "benchmark-secret"
+    token = api.create_access_token({"sub": "user", "type": "main"}, timedelta(hours=1))
+    with tempfile.TemporaryDirectory() as data_dir:
+        document = make_raw_document(args.tickers)
+        write_document(document, [os.path.join(data_dir, "data_2025-09-01.json")])
+        print(json.dumps(asyncio.run(run(args, data_dir, document, token))))
+
+
+if __name__ == '__main__':
+    main()
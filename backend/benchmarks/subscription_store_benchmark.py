@@ -0,0 +1,94 @@
+# 複数プロセス（uvicornワーカー相当）から同時にサブスクリプションを登録し、
+# 従来のJSONファイルの読み書きとSQLiteストアで、登録速度と失われた登録の数を比較する
+#
+#   python -m backend.benchmarks.subscription_store_benchmark --processes 4 --per-process 500
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from ..subscription_store import SubscriptionStore, subscription_id
+
+
+def make_subscription(worker, i):
+    return {
+        "endpoint": f"https://fcm.googleapis.com/fcm/send/worker{worker}-{i}",
+        "keys": {"p256dh": "B" + "x" * 86, "auth": "y" * 22},
+        "expirationTime": None,
+    }
+
+
+def legacy_subscribe(data_dir, subscription):
+    """The /api/subscribe file handling before SubscriptionStore: read, modify and rewrite the whole JSON."""
+    subscriptions_file = os.path.join(data_dir, 'push_subscriptions.json')
+    existing = {}
+    if os.path.exists(subscriptions_file):
+        try:
+            with open(subscriptions_file, 'r') as f:
+                existing = json.load(f)
+        except ValueError:
+            existing = {}  # 他のプロセスが書き込み途中のファイルを読んだ
+    existing[subscription_id(subscription["endpoint"])] = subscription
+    with open(subscriptions_file, 'w') as f:
+        json.dump(existing, f)
+
+
+def worker(variant, data_dir, worker_id, count, start_at):
+    while time.time() < start_at:
+        time.sleep(0.001)
+    store = SubscriptionStore(data_dir)
+    for i in range(count):
+        subscription = make_subscription(worker_id, i)
+        if variant == "legacy_json":
+            legacy_subscribe(data_dir, subscription)
+        else:
+            store.upsert(subscription)
+
+
+def stored_count(variant, data_dir):
+    if variant == "sqlite":
+        return SubscriptionStore(data_dir).count()
+    try:
+        with open(os.path.join(data_dir, 'push_subscriptions.json'), 'r') as f:
+            return len(json.load(f))
+    except (OSError, ValueError):
+        return 0
+
+
+def run(variant, processes, per_process):
+    with tempfile.TemporaryDirectory() as data_dir:
+        if variant == "sqlite":
+            SubscriptionStore(data_dir).count()  # スキーマ作成は計測に含めない
+        start_at = time.time() + 0.5
+        jobs = [multiprocessing.Process(target=worker, args=(variant, data_dir, w, per_process, start_at))
+                for w in range(processes)]
+        for job in jobs:
+            job.start()
+        for job in jobs:
+            job.join()
+        elapsed = time.time() - start_at
+        expected = processes * per_process
+        stored = stored_count(variant, data_dir)
+        return {
+            "variant": variant,
+            "processes": processes,
+            "subscribes": expected,
+            "subscribes_per_s": round(expected / elapsed, 1),
+            "stored": stored,
+            "lost": expected - stored,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent subscribe benchmark: legacy JSON file vs SQLite store")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--per-process", type=int, default=500)
+    args = parser.parse_args()
+    for variant in ("legacy_json", "sqlite"):
+        print(json.dumps(run(variant, args.processes, args.per_process)))
+
+
+if __name__ == '__main__':
+    main()
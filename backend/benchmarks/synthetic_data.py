@@ -0,0 +1,108 @@
+# ベンチマーク用の合成データ（data_raw.json と同じ構造）を生成する
+import random
+from datetime import datetime, timedelta
+
+SECTORS = {
+    "Technology": ["Software", "Semiconductors", "Consumer Electronics"],
+    "Financial Services": ["Banks", "Asset Management", "Insurance"],
+    "Healthcare": ["Biotechnology", "Medical Devices", "Drug Manufacturers"],
+    "Consumer Cyclical": ["Internet Retail", "Auto Manufacturers", "Restaurants"],
+    "Energy": ["Oil & Gas Integrated", "Oil & Gas E&P"],
+    "Industrials": ["Aerospace & Defense", "Railroads", "Specialty Machinery"],
+}
+SECTOR_ETFS = ["XLK", "XLY", "XLV", "XLP", "XLB", "XLU", "XLI", "XLC", "XLRE", "XLF", "XLE"]
+
+
+def _ticker(i):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    name = ""
+    i += 26
+    while i:
+        i, r = divmod(i, 26)
+        name = letters[r] + name
+    return name
+
+
+def _candles(rng, start_value, count):
+    start = datetime(2025, 9, 1, 9, 0, 0)
+    value = start_value
+    history = []
+    for i in range(count):
+        o = value
+        c = max(0.1, o + rng.gauss(0, o * 0.01))
+        history.append({
+            "time": (start + timedelta(hours=4 * i)).strftime('%Y-%m-%dT%H:%M:%S'),
+            "open": round(o, 2),
+            "high": round(max(o, c) * 1.003, 2),
+            "low": round(min(o, c) * 0.997, 2),
+            "close": round(c, 2),
+        })
+        value = c
+    return {"current": history[-1]["close"], "history": history}
+
+
+def _stock_heatmaps(rng, tickers, nan_ratio):
+    heatmaps = {"1d": {"stocks": []}, "1w": {"stocks": []}, "1m": {"stocks": []}}
+    sector_names = list(SECTORS)
+    for ticker in tickers:
+        sector = rng.choice(sector_names)
+        base = {
+            "ticker": ticker,
+            "sector": sector,
+            "industry": rng.choice(SECTORS[sector]),
+            "market_cap": rng.randint(5_000_000_000, 3_000_000_000_000),
+        }
+        for period, scale in (("1d", 1.5), ("1w", 3.0), ("1m", 6.0)):
+            perf = float('nan') if rng.random() < nan_ratio else round(rng.gauss(0, scale), 2)
+            heatmaps[period]["stocks"].append(dict(base, performance=perf))
+    return heatmaps
+
+
+def make_raw_document(n_tickers=600, seed=0, nan_ratio=0.0):
+    """Builds a raw market document shaped like data_raw.json with n_tickers S&P-style stocks."""
+    rng = random.Random(seed)
+    tickers = [_ticker(i) for i in range(n_tickers)]
+    nasdaq_tickers = tickers[:max(1, n_tickers // 6)]
+
+    data = {
+        "market": {
+            "vix": _candles(rng, 16.0, 360),
+            "t_note_future": _candles(rng, 4.2, 360),
+            "fear_and_greed": {
+                "now": 55, "previous_close": 52, "prev_week": 48, "prev_month": 40, "prev_year": 70,
+                "category": "Neutral",
+            },
+        },
+        "news": [],
+        "indicators": {
+            "economic": [
+                {"datetime": f"09/1{i % 10} 21:30", "name": f"🇺🇸 経済指標{i}", "importance": "★" * (1 + i % 3),
+                 "previous": "0.2%", "forecast": "0.3%", "type": "economic"}
+                for i in range(12)
+            ],
+            "us_earnings": [
+                {"datetime": "09/11 05:00", "ticker": t, "company": f"({t} Inc.)", "type": "us_earnings"}
+                for t in tickers[:8]
+            ],
+            "jp_earnings": [],
+        },
+        "news_raw": [
+            {"title": f"Market headline {i}", "link": f"https://example.com/news/{i}", "publisher": "Example",
+             "summary": "Stocks moved as investors weighed the latest economic data. " * 3,
+             "source_icon_url": "https://www.google.com/s2/favicons?domain=example.com&sz=64"}
+            for i in range(30)
+        ],
+    }
+
+    for index_name, index_tickers in (("sp500", tickers), ("nasdaq", nasdaq_tickers)):
+        heatmaps = _stock_heatmaps(rng, index_tickers, nan_ratio)
+        for period in ("1d", "1w", "1m"):
+            data[f"{index_name}_heatmap_{period}"] = heatmaps[period]
+        data[f"{index_name}_heatmap"] = data[f"{index_name}_heatmap_1d"]
+
+    for period, scale in (("1d", 1.0), ("1w", 2.0), ("1m", 4.0)):
+        etfs = [{"ticker": t, "performance": round(rng.gauss(0, scale), 2)} for t in SECTOR_ETFS]
+        data[f"sector_etf_heatmap_{period}"] = {"etfs": etfs}
+        data[f"sp500_combined_heatmap_{period}"] = {"items": data[f"sp500_heatmap_{period}"]["stocks"] + etfs}
+
+    return data
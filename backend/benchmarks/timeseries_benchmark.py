@@ -0,0 +1,75 @@
+# 日ごとのデータ文書（data_YYYY-MM-DD.json、indent=2）と時系列ストア（data/timeseries.db）で、
+# 保存サイズと「ある銘柄の N 日分の騰落率」「過去のある日のヒートマップ」の取得時間を比較する
+#
+#   python -m backend.benchmarks.timeseries_benchmark --days 90 --tickers 600
+import argparse
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+from ..data_archive import DATED_FILE_PATTERN
+from ..timeseries_store import TIMESERIES_DB_NAME, TimeSeriesStore
+from .archive_benchmark import timed
+from .synthetic_data import make_raw_document
+
+
+def ticker_history_by_parsing(data_dir, ticker, period):
+    """The only way to get a series from the dated files: load every whole document."""
+    series = []
+    for filename in sorted(os.listdir(data_dir)):
+        if DATED_FILE_PATTERN.match(filename):
+            with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+                etfs = json.load(f)[f"sector_etf_heatmap_{period}"]["etfs"]
+            series.append([filename[5:15], next(e["performance"] for e in etfs if e["ticker"] == ticker)])
+    return series
+
+
+def heatmap_by_parsing(path, key):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)[key]
+
+
+def directory_bytes(data_dir, predicate):
+    return sum(os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir) if predicate(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dated JSON documents vs the SQLite time-series store")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--tickers", type=int, default=600, help="size of the synthetic heatmaps")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = TimeSeriesStore(workdir)
+        first_day = date(2025, 6, 1)
+        for i in range(args.days):
+            day = (first_day + timedelta(days=i)).isoformat()
+            document = make_raw_document(args.tickers, seed=i)
+            with open(os.path.join(workdir, f"data_{day}.json"), 'w', encoding='utf-8') as f:
+                json.dump(dict(document, date=day), f, indent=2, ensure_ascii=False)
+            store.record(day, document)
+        store._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        json_bytes = directory_bytes(workdir, lambda name: DATED_FILE_PATTERN.match(name))
+        db_bytes = directory_bytes(workdir, lambda name: name.startswith(TIMESERIES_DB_NAME))
+        print(json.dumps({"days": args.days, "tickers": args.tickers,
+                          "dated_json_mb": round(json_bytes / 1e6, 1), "timeseries_db_mb": round(db_bytes / 1e6, 2),
+                          "json_kb_per_day": round(json_bytes / args.days / 1e3, 1),
+                          "db_kb_per_day": round(db_bytes / args.days / 1e3, 1)}))
+
+        parsed, parse_ms = timed(lambda: ticker_history_by_parsing(workdir, "XLK", "1m"), args.runs)
+        stored, store_ms = timed(lambda: store.ticker_history("XLK", "1m"), args.runs)
+        assert parsed == stored
+        print(json.dumps({"query": f"XLK 1m over {args.days} days", "parse_files_ms": parse_ms, "store_ms": store_ms}))
+
+        path = os.path.join(workdir, f"data_{day}.json")
+        parsed, parse_ms = timed(lambda: heatmap_by_parsing(path, "sp500_heatmap_1d"), args.runs)
+        stored, store_ms = timed(lambda: store.heatmap(day, "sp500", "1d"), args.runs)
+        assert sorted(s["ticker"] for s in parsed["stocks"]) == sorted(s["ticker"] for s in stored["stocks"])
+        print(json.dumps({"query": "one day's sp500 1d heatmap", "parse_file_ms": parse_ms, "store_ms": store_ms}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from .data_publisher import ENCODING_SUFFIXES, compress
+from .image_generator import ASSET_HASH_LENGTH
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND_DIR = os.path.join(PROJECT_ROOT, 'frontend')
+# ビルド結果。main.py はここを frontend/ より優先して配信する
+FRONTEND_BUILD_DIR = os.getenv('FRONTEND_BUILD_DIR', os.path.join(PROJECT_ROOT, 'build', 'frontend'))
+# index.html から参照され、内容ハッシュ付きの名前で配信するファイル
+HASHED_ASSETS = ["app.js", "style.css"]
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+# これより小さいファイルは圧縮版を作らない
+PRECOMPRESS_MIN_BYTES = 512
+
+
+def hashed_name(name, payload):
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(payload).hexdigest()[:ASSET_HASH_LENGTH]}{extension}"
+
+
+def rewrite_references(html, names):
+    """Points src/href attributes of index.html at the hashed file names."""
+    def replace(match):
+        attribute, quote, prefix, name = match.groups()
+        return f"{attribute}={quote}{prefix or ''}{names[name]}{quote}"
+    pattern = r'\b(src|href)=(["\'])(\./|/)?(' + '|'.join(re.escape(name) for name in names) + r')\2'
+    return re.sub(pattern, replace, html)
+
+
+def precompress(path):
+    """Writes path.gz / path.br next to a file when they are smaller than it. Returns {coding: bytes written}."""
+    with open(path, 'rb') as f:
+        body = f.read()
+    written = {}
+    if len(body) < PRECOMPRESS_MIN_BYTES:
+        return written
+    for encoding, payload in compress(body).items():
+        if len(payload) < len(body):
+            with open(path + ENCODING_SUFFIXES[encoding], 'wb') as f:
+                f.write(payload)
+            written[encoding] = len(payload)
+    return written
+
+
+def build(source_dir=FRONTEND_DIR, build_dir=FRONTEND_BUILD_DIR):
+    """
+    Writes the content-hashed assets, an index.html that references them and the precompressed siblings
+    of both to build_dir. Files that are not rebuilt (icons, sw.js, generated gauge images) keep being
+    served from source_dir. Returns the asset manifest {source name: hashed name}.
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    names = {}
+    for name in HASHED_ASSETS:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            payload = f.read()
+        names[name] = hashed_name(name, payload)
+        with open(os.path.join(build_dir, names[name]), 'wb') as f:
+            f.write(payload)
+
+    with open(os.path.join(source_dir, 'index.html'), 'r', encoding='utf-8') as f:
+        html = rewrite_references(f.read(), names)
+    with open(os.path.join(build_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+    with open(os.path.join(build_dir, ASSET_MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(names, f, indent=2)
+
+    for name in ['index.html'] + list(names.values()):
+        path = os.path.join(build_dir, name)
+        sizes = precompress(path)
+        print(f"{name}: {os.path.getsize(path)} bytes"
+              + ''.join(f", {encoding} {size}" for encoding, size in sizes.items()))
+    return names
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m backend.build_frontend",
+                                     description="Fingerprint and precompress the frontend assets")
+    parser.add_argument("--source", default=FRONTEND_DIR)
+    parser.add_argument("--output", default=FRONTEND_BUILD_DIR)
+    args = parser.parse_args()
+    build(args.source, args.output)
+    print(f"Frontend built into {args.output}")
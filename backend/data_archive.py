@@ -0,0 +1,134 @@
+import json
+import os
+import re
+from collections.abc import Mapping
+
+from . import data_publisher
+
+ARCHIVE_INDEX_NAME = 'archive_index.json'
+DATED_FILE_PATTERN = re.compile(r'^data_(\d{4}-\d{2}-\d{2})\.json$')
+# /api/history/{metric} で取得できる系列: metric -> データ文書内のキーのパス
+ARCHIVE_METRICS = {
+    "fear_greed": ("market", "fear_and_greed", "now"),
+    "vix": ("market", "vix", "current"),
+    "t_note": ("market", "t_note_future", "current"),
+}
+
+
+def index_path_for(data_dir):
+    return os.path.join(data_dir, ARCHIVE_INDEX_NAME)
+
+
+def metric_values(data):
+    """Returns {metric: value} for every ARCHIVE_METRICS value present (and numeric) in a data document."""
+    values = {}
+    for metric, keys in ARCHIVE_METRICS.items():
+        value = data
+        for key in keys:
+            # generate の文書は raw_store.LazyDocument（dict ではない Mapping）のこともある
+            value = value.get(key) if isinstance(value, Mapping) else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[metric] = value
+    return values
+
+
+def _read_meta(path):
+    try:
+        with open(path + data_publisher.META_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _entry(path, data):
+    """Index entry of one dated file: its name, signature, member offsets and metric values."""
+    signature = data_publisher.file_signature(path)
+    meta = _read_meta(path)
+    # オフセットはこのファイルを書いた write_document のものだけが信頼できる
+    current = meta.get("source") == signature
+    return {
+        "file": os.path.basename(path),
+        "version": meta.get("version") if current else data.get("version"),
+        "source": signature,
+        "offsets": meta.get("offsets") if current else None,
+        "metrics": metric_values(data),
+    }
+
+
+def load_index(data_dir):
+    """Returns the archive index ({"dates": {...}, "series": {...}}), or an empty one when it does not exist."""
+    try:
+        with open(index_path_for(data_dir), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index.get("dates"), dict):
+            return index
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"dates": {}, "series": {}}
+
+
+def save_index(data_dir, index):
+    """Rebuilds the per-metric series from the entries and atomically replaces the index file."""
+    dates = dict(sorted(index["dates"].items()))
+    series = {
+        metric: [[date, entry["metrics"][metric]] for date, entry in dates.items() if metric in entry.get("metrics", {})]
+        for metric in ARCHIVE_METRICS
+    }
+    index = {"dates": dates, "series": series}
+    path = index_path_for(data_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return index
+
+
+def rebuild_index(data_dir):
+    """Indexes every data_YYYY-MM-DD.json in data_dir (parses each file once)."""
+    index = {"dates": {}}
+    for filename in os.listdir(data_dir):
+        match = DATED_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        path = os.path.join(data_dir, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            index["dates"][match.group(1)] = _entry(path, data)
+        except (OSError, ValueError):
+            continue
+    return save_index(data_dir, index)
+
+
+def record_snapshot(path, data):
+    """Adds (or replaces) the entry of a dated file that was just published with write_document."""
+    match = DATED_FILE_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None
+    data_dir = os.path.dirname(path) or '.'
+    if not os.path.exists(index_path_for(data_dir)):
+        # 索引が無い（導入直後など）場合は既存の日付ファイルもまとめて索引に入れる
+        rebuild_index(data_dir)
+    index = load_index(data_dir)
+    index["dates"][match.group(1)] = _entry(path, data)
+    return save_index(data_dir, index)
+
+
+def prune_index(data_dir):
+    """Drops the entries whose dated file no longer exists."""
+    index = load_index(data_dir)
+    dates = {date: entry for date, entry in index["dates"].items()
+             if os.path.exists(os.path.join(data_dir, entry["file"]))}
+    if len(dates) != len(index["dates"]):
+        save_index(data_dir, {"dates": dates})
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m backend.data_archive",
+                                     description="Rebuild data/archive_index.json from the dated data files")
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+    rebuilt = rebuild_index(args.data_dir)
+    print(f"Indexed {len(rebuilt['dates'])} dated data files into {index_path_for(args.data_dir)}")
@@ -3,11 +3,11 @@ import logging
 import logging.handlers
 import os
 import re
+import sqlite3
 import sys
 from datetime import datetime, timedelta, timezone
 import pytz
 import time
-import math
 import pandas as pd
 import yfinance as yf
 from bs4 import BeautifulSoup
@@ -16,7 +16,13 @@ import openai
 import httpx
 from io import StringIO
 from urllib.parse import urlparse
-from .image_generator import generate_fear_greed_chart
+from .data_archive import DATED_FILE_PATTERN, prune_index, record_snapshot
+from .data_publisher import ENCODING_SUFFIXES, META_SUFFIX, write_document
+from .image_generator import generate_fear_greed_chart, publish_gauge_assets
+from .push_queue import PushQueue, drain
+from .raw_store import LazyDocument, write_raw_document
+from .subscription_store import SubscriptionStore
+from .timeseries_store import TimeSeriesStore
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,8 +30,13 @@ load_dotenv()
 
 # --- Constants ---
 DATA_DIR = 'data'
-RAW_DATA_PATH = os.path.join(DATA_DIR, 'data_raw.json')
+# fetch → generate の受け渡し（トップレベルのキーごとに圧縮したコンテナ、backend/raw_store.py）
+RAW_DATA_PATH = os.path.join(DATA_DIR, 'data_raw.bin')
+# 以前の形式。更新直後に generate が前回の fetch の結果を読めるように残す
+LEGACY_RAW_DATA_PATH = os.path.join(DATA_DIR, 'data_raw.json')
 FINAL_DATA_PATH_PREFIX = os.path.join(DATA_DIR, 'data_')
+# 日付ごとのデータファイルを残す日数（0以下なら削除しない）
+DATA_RETENTION_DAYS = int(os.getenv('DATA_RETENTION_DAYS', 7))
 
 # URLs
 CNN_FEAR_GREED_URL = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata/"
@@ -93,6 +104,11 @@ JP_TICKER_LIST = ["7203", "8306", "6501", "6861", "6758", "9983", "6098", "9984"
                   "3402", "7272", "9532", "9697", "4911", "9021", "8795", "3064", "7259", "1812", 
                   "2897", "7912", "4324", "6504", "7013", "7550", "6645", "5713", "5411", "4188"]
 
+# Stage names accepted by `fetch --only` / `generate --only`
+FETCH_STAGES = ["vix", "t_note", "fear_greed", "calendar", "news", "heatmap"]
+# AI sections published progressively by generate_report (key in the "ready" flags)
+AI_SECTIONS = ["market_commentary", "news", "heatmap_commentary", "indicators_commentary", "column"]
+
 # --- Error Handling ---
 class MarketDataError(Exception):
     """Custom exception for data fetching and processing errors."""
@@ -145,19 +161,19 @@ class MarketDataFetcher:
             self.openai_client = None
             self.openai_model = None
         else:
-            http_client = httpx.Client(trust_env=False)
-            self.openai_client = openai.OpenAI(api_key=api_key, http_client=http_client)
+            # タイムアウトとリトライ回数は環境変数で調整可能（OPENAI_BASE_URLで互換サーバーも指定可能）
+            timeout = float(os.getenv("OPENAI_TIMEOUT", "120"))
+            max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+            http_client = httpx.Client(trust_env=False, timeout=timeout)
+            self.openai_client = openai.OpenAI(
+                api_key=api_key,
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                http_client=http_client,
+                timeout=timeout,
+                max_retries=max_retries,
+            )
             self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4-turbo") # Fallback for safety
 
-    def _clean_non_compliant_floats(self, obj):
-        if isinstance(obj, dict):
-            return {k: self._clean_non_compliant_floats(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [self._clean_non_compliant_floats(elem) for elem in obj]
-        if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
-            return None
-        return obj
-
     def _get_favicon_url(self, url):
         """Extracts the base URL and returns a potential favicon URL."""
         try:
@@ -291,7 +307,13 @@ class MarketDataFetcher:
 
             # Generate the chart
             logger.info("Generating Fear & Greed gauge chart...")
-            generate_fear_greed_chart(chart_data)
+            gauge_path = generate_fear_greed_chart(chart_data)
+            self.data['market']['fear_and_greed']['gauge_image'] = '/' + os.path.basename(gauge_path)
+            try:
+                self.data['market']['fear_and_greed']['gauge_assets'] = publish_gauge_assets(chart_data, gauge_path)
+            except (OSError, ValueError) as e:
+                # ハッシュ付き画像が作れなくても従来の画像で表示できる
+                logger.warning(f"Could not publish hashed gauge assets: {e}")
 
         except Exception as e:
             logger.error(f"Error fetching or generating Fear & Greed Index: {e}")
@@ -860,15 +882,10 @@ class MarketDataFetcher:
                 logger.error("Empty content in OpenAI API response")
                 raise MarketDataError("E005", "Empty content in OpenAI API response")
 
-            content = content.strip()
-            logger.debug(f"Received response (first 200 chars): {content[:200]}")
-
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError as je:
-                logger.error(f"Failed to parse JSON response: {content[:500]}")
-                raise MarketDataError("E005", f"Invalid JSON response: {je}") from je
+            return self._parse_openai_json(content)
 
+        except MarketDataError:
+            raise
         except openai.APIError as api_error:
             logger.error(f"OpenAI API error: {api_error}")
             raise MarketDataError("E005", f"API error: {api_error}") from api_error
@@ -876,6 +893,17 @@ class MarketDataFetcher:
             logger.error(f"Error calling OpenAI API: {e}")
             raise MarketDataError("E005", str(e)) from e
 
+    def _parse_openai_json(self, content):
+        """Parses the JSON body returned by the model."""
+        content = content.strip()
+        logger.debug(f"Received response (first 200 chars): {content[:200]}")
+
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError as je:
+            logger.error(f"Failed to parse JSON response: {content[:500]}")
+            raise MarketDataError("E005", f"Invalid JSON response: {je}") from je
+
     def generate_market_commentary(self):
         logger.info("Generating AI commentary...")
 
@@ -1448,37 +1476,94 @@ class MarketDataFetcher:
             self.data['indicators']['earnings_commentary'] = "注目決算のAI解説生成中にエラーが発生しました。"
 
     def cleanup_old_data(self):
-        """Deletes data files older than 7 days."""
+        """Deletes data files older than DATA_RETENTION_DAYS and drops them from the archive index."""
+        if DATA_RETENTION_DAYS <= 0:
+            return
         logger.info("Cleaning up old data files...")
         try:
             today = datetime.now()
-            seven_days_ago = today - timedelta(days=7)
+            cutoff = today - timedelta(days=DATA_RETENTION_DAYS)
 
+            sibling_suffixes = list(ENCODING_SUFFIXES.values()) + [META_SUFFIX]
             for filename in os.listdir(DATA_DIR):
-                match = re.match(r'data_(\d{4}-\d{2}-\d{2})\.json', filename)
+                match = DATED_FILE_PATTERN.match(filename)
                 if match:
                     file_date_str = match.group(1)
                     file_date = datetime.strptime(file_date_str, '%Y-%m-%d')
-                    if file_date < seven_days_ago:
+                    if file_date < cutoff:
                         file_path = os.path.join(DATA_DIR, filename)
                         os.remove(file_path)
+                        # 圧縮ファイル・メタ情報 (.gz/.br/.meta.json) も削除する
+                        for suffix in sibling_suffixes:
+                            if os.path.exists(file_path + suffix):
+                                os.remove(file_path + suffix)
                         logger.info(f"Deleted old data file: {filename}")
+            prune_index(DATA_DIR)
         except Exception as e:
             logger.error(f"Error during data cleanup: {e}")
 
     # --- Main Execution Methods ---
-    def fetch_all_data(self):
-        os.makedirs(DATA_DIR, exist_ok=True)
-        logger.info("--- Starting Raw Data Fetch ---")
+    def _fetch_stages(self):
+        """Fetch stages in run order, keyed by the names accepted by `fetch --only`."""
+        return {
+            "vix": self.fetch_vix,
+            "t_note": self.fetch_t_note_future,
+            "fear_greed": self.fetch_fear_greed_index,
+            "calendar": self.fetch_calendar_data,
+            "news": self.fetch_yahoo_finance_news,
+            "heatmap": self.fetch_heatmap_data,
+        }
+
+    def _generate_stages(self):
+        """AI stages in run order as (generator, fallback on MarketDataError), keyed by AI_SECTIONS."""
+        return {
+            "market_commentary": (self.generate_market_commentary, self._market_commentary_fallback),
+            "news": (self.generate_news_analysis, self._news_fallback),
+            "heatmap_commentary": (self.generate_heatmap_commentary, self._heatmap_commentary_fallback),
+            "indicators_commentary": (self.generate_indicators_commentary, self._indicators_commentary_fallback),
+            "column": (self.generate_column, self._column_fallback),
+        }
+
+    def _market_commentary_fallback(self, e):
+        logger.error(f"Could not generate AI commentary: {e}")
+        self.data['market']['ai_commentary'] = "現在、AI解説に不具合が生じております。"
+
+    def _news_fallback(self, e):
+        logger.error(f"Could not generate AI news: {e}")
+        self.data['news'] = {"summary": f"Error: {e}", "topics": []}
 
-        fetch_tasks = [
-            self.fetch_vix,
-            self.fetch_t_note_future,
-            self.fetch_fear_greed_index,
-            self.fetch_calendar_data,  # Changed from fetch_economic_indicators
-            self.fetch_yahoo_finance_news,
-            self.fetch_heatmap_data
-        ]
+    def _heatmap_commentary_fallback(self, e):
+        logger.error(f"Could not generate heatmap AI commentary: {e}")
+        self.data['sp500_heatmap']['ai_commentary'] = f"Error: {e}"
+        self.data['nasdaq_heatmap']['ai_commentary'] = f"Error: {e}"
+
+    def _indicators_commentary_fallback(self, e):
+        logger.error(f"Could not generate indicators AI commentary: {e}")
+        self.data['indicators']['economic_commentary'] = f"Error: {e}"
+        self.data['indicators']['earnings_commentary'] = f"Error: {e}"
+
+    def _column_fallback(self, e):
+        logger.error(f"Could not generate weekly column: {e}")
+        self.data['column'] = {}
+
+    def fetch_all_data(self, only=None):
+        """Fetches raw data. With `only`, re-runs just those stages and merges them into the existing raw file."""
+        os.makedirs(DATA_DIR, exist_ok=True)
+        stages = self._fetch_stages()
+
+        if only:
+            logger.info(f"--- Starting Partial Raw Data Fetch ({', '.join(only)}) ---")
+            raw = self._load_raw_data()
+            if raw is not None:
+                self.data.update(raw)
+                if isinstance(raw, LazyDocument):
+                    raw.close()
+            else:
+                logger.warning(f"{RAW_DATA_PATH} not found. Starting from an empty raw document.")
+            fetch_tasks = [task for name, task in stages.items() if name in only]
+        else:
+            logger.info("--- Starting Raw Data Fetch ---")
+            fetch_tasks = list(stages.values())
 
         for task in fetch_tasks:
             try:
@@ -1486,94 +1571,122 @@ class MarketDataFetcher:
             except MarketDataError as e:
                 logger.error(f"Failed to execute fetch task '{task.__name__}': {e}")
 
-        # Clean the data before writing to file
-        self.data = self._clean_non_compliant_floats(self.data)
-
-        with open(RAW_DATA_PATH, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        # NaN・Infinity は書き込み時に null にする（データ全体を複製して置き換えない）
+        write_raw_document(self.data, RAW_DATA_PATH)
+        if os.path.exists(LEGACY_RAW_DATA_PATH):
+            os.remove(LEGACY_RAW_DATA_PATH)
         logger.info(f"--- Raw Data Fetch Completed. Saved to {RAW_DATA_PATH} ---")
+        self._record_timeseries()
         return self.data
 
-    def generate_report(self):
-        logger.info("--- Starting Report Generation ---")
-        if not os.path.exists(RAW_DATA_PATH):
-            logger.error(f"{RAW_DATA_PATH} not found. Run fetch first.")
-            return
-        with open(RAW_DATA_PATH, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
+    def _load_raw_data(self):
+        """Returns the raw document of the last fetch (decoded lazily, section by section), or None."""
+        if os.path.exists(RAW_DATA_PATH):
+            return LazyDocument(RAW_DATA_PATH)
+        if os.path.exists(LEGACY_RAW_DATA_PATH):
+            with open(LEGACY_RAW_DATA_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
 
-        # AI Generation Steps
+    def _record_timeseries(self):
+        """Adds today's heatmaps, candles and market values to data/timeseries.db."""
+        date = datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d')
         try:
-            self.generate_market_commentary()
-        except MarketDataError as e:
-            logger.error(f"Could not generate AI commentary: {e}")
-            self.data['market']['ai_commentary'] = "現在、AI解説に不具合が生じております。"
+            count = TimeSeriesStore(DATA_DIR).record(date, self.data)
+            logger.info(f"Recorded {count} ticker rows for {date} into the time-series store")
+        except (OSError, sqlite3.Error) as e:
+            # 日付ファイルからは python -m backend.timeseries_store で後から取り込める
+            logger.warning(f"Failed to record the time series for {date}: {e}")
 
-        try:
-            self.generate_news_analysis()
-        except MarketDataError as e:
-            logger.error(f"Could not generate AI news: {e}")
-            self.data['news'] = {"summary": f"Error: {e}", "topics": []}
+    def generate_report(self, only=None):
+        """
+        Generates the AI sections and publishes the final report.
+        With `only`, re-runs just those sections on top of the published data.json and merges them back.
+        """
+        jst = timezone(timedelta(hours=9))
+        published_path = os.path.join(DATA_DIR, 'data.json')
 
-        try:
-            self.generate_heatmap_commentary()
-        except MarketDataError as e:
-            logger.error(f"Could not generate heatmap AI commentary: {e}")
-            self.data['sp500_heatmap']['ai_commentary'] = f"Error: {e}"
-            self.data['nasdaq_heatmap']['ai_commentary'] = f"Error: {e}"
+        if only and os.path.exists(published_path):
+            logger.info(f"--- Starting Partial Report Generation ({', '.join(only)}) ---")
+            with open(published_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+            self.data.setdefault('ready', {section: True for section in AI_SECTIONS})
+        else:
+            logger.info("--- Starting Report Generation ---")
+            if only:
+                logger.warning(f"{published_path} not found. Running all AI stages.")
+                only = None
+            raw = self._load_raw_data()
+            if raw is None:
+                logger.error(f"{RAW_DATA_PATH} not found. Run fetch first.")
+                return
+            # AIセクションが使うメンバーだけを展開し、ヒートマップの大半は圧縮を解くだけでそのまま公開する
+            self.data = raw
+            self.data['date'] = datetime.now(jst).strftime('%Y-%m-%d')
+            self.data['ready'] = {section: False for section in AI_SECTIONS}
 
-        try:
-            self.generate_indicators_commentary()
-        except MarketDataError as e:
-            logger.error(f"Could not generate indicators AI commentary: {e}")
-            self.data['indicators']['economic_commentary'] = f"Error: {e}"
-            self.data['indicators']['earnings_commentary'] = f"Error: {e}"
+        self.data['last_updated'] = datetime.now(jst).isoformat()
+        final_path = f"{FINAL_DATA_PATH_PREFIX}{self.data['date']}.json"
 
-        try:
-            self.generate_column()
-        except MarketDataError as e:
-            logger.error(f"Could not generate weekly column: {e}")
-            self.data['column'] = {}
+        # 市況データを先に公開し、AIセクションは完了した順に公開する
+        if not only:
+            self._publish_live_data(final_path, draft=True)
 
-        jst = timezone(timedelta(hours=9))
-        self.data['date'] = datetime.now(jst).strftime('%Y-%m-%d')
-        self.data['last_updated'] = datetime.now(jst).isoformat()
+        # AI Generation Steps
+        stages = [(name, stage) for name, stage in self._generate_stages().items() if not only or name in only]
+        for i, (section, (generator, fallback)) in enumerate(stages):
+            try:
+                generator()
+            except MarketDataError as e:
+                fallback(e)
+            self.data['ready'][section] = True
+            # 最後のセクションは下の最終書き込みで公開する
+            if i < len(stages) - 1:
+                self._publish_section(section, final_path)
 
-        # Clean the data before writing to file
-        self.data = self._clean_non_compliant_floats(self.data)
+        self.data['last_updated'] = datetime.now(jst).isoformat()
 
-        final_path = f"{FINAL_DATA_PATH_PREFIX}{self.data['date']}.json"
-        with open(final_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
-        with open(os.path.join(DATA_DIR, 'data.json'), 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        # NaN・Infinity は write_document が直列化の際に null として書く
+        self._publish_live_data(final_path)
         logger.info(f"--- Report Generation Completed. Saved to {final_path} ---")
+        # 公開後は data_raw.bin の mmap を解放する（読み込み済み・代入済みのメンバーはそのまま使える）
+        if isinstance(self.data, LazyDocument):
+            self.data.close()
 
         self.cleanup_old_data()
 
         return self.data
 
-
-    def send_push_notifications(self):
-        """レポート生成完了後にPush通知を送信"""
-        logger.info("Sending push notifications for 6:30 AM update...")
-
+    def _publish_live_data(self, final_path, draft=False):
+        """
+        Atomically replaces the dated data file and data.json (with their .gz/.br/ETag siblings) with the current self.data.
+        Intermediate publications pass draft=True so only the final one pays for maximum compression.
+        """
+        # 読み込み中のAPIが書きかけのファイルを見ないようにリネームで置き換える
+        write_document(self.data, [final_path, os.path.join(DATA_DIR, 'data.json')], draft=draft)
         try:
-            # セキュリティマネージャーの初期化
-            from .security_manager import security_manager
-            security_manager.data_dir = DATA_DIR
-            security_manager.initialize()
+            record_snapshot(final_path, self.data)
+        except (OSError, ValueError) as e:
+            # 索引は次回の公開（または python -m backend.data_archive）で作り直せる
+            logger.warning(f"Failed to update the archive index: {e}")
 
-            from pywebpush import webpush, WebPushException
+    def _publish_section(self, section, final_path):
+        """Publishes the partial report after an AI section has finished."""
+        try:
+            self._publish_live_data(final_path, draft=True)
+            logger.info(f"Published AI section '{section}' to {final_path}")
+        except OSError as e:
+            # 途中公開の失敗は最終書き込みで回復できるため処理を継続する
+            logger.error(f"Failed to publish AI section '{section}': {e}")
 
-            # サブスクリプション読み込み
-            subscriptions_file = os.path.join(DATA_DIR, 'push_subscriptions.json')
-            if not os.path.exists(subscriptions_file):
-                logger.info("No push subscriptions found")
-                return 0
+    def send_push_notifications(self):
+        """レポート生成完了後にPush通知を配信キューに登録し、そのまま配信する"""
+        logger.info("Queueing push notifications for 6:30 AM update...")
 
-            with open(subscriptions_file, 'r') as f:
-                subscriptions = json.load(f)
+        try:
+            # サブスクリプション読み込み（APIサーバーと共有するSQLite）
+            store = SubscriptionStore(DATA_DIR)
+            subscriptions = store.all()
 
             if not subscriptions:
                 logger.info("No active push subscriptions")
@@ -1589,40 +1702,48 @@ class MarketDataFetcher:
                 "type": "data-update"
             }
 
-            sent_count = 0
-            failed_subscriptions = []
+            # 同じ日付のレポートの通知は1回だけ登録する（generate の再実行で二重に送らない）
+            queue = PushQueue(DATA_DIR)
+            notification_id, queued = queue.enqueue(
+                notification_data, subscriptions, dedupe_key=f"data-update:{self.data.get('date')}")
+            if queued:
+                logger.info(f"Queued notification {notification_id} for {queued} subscriptions")
+            else:
+                logger.info(f"Notification for {self.data.get('date')} was already queued; resuming its delivery")
 
-            # 各サブスクリプションに送信
-            for sub_id, subscription in subscriptions.items():
-                try:
-                    webpush(
-                        subscription_info=subscription,
-                        data=json.dumps(notification_data),
-                        vapid_private_key=security_manager.vapid_private_key,
-                        vapid_claims={
-                            "sub": security_manager.vapid_subject,
-                        }
-                    )
-                    sent_count += 1
-                    logger.debug(f"Notification sent to subscription {sub_id}")
-                except WebPushException as ex:
-                    logger.error(f"Failed to send notification to {sub_id}: {ex}")
-                    # 410エラーは無効なサブスクリプション
-                    if ex.response and ex.response.status_code == 410:
-                        failed_subscriptions.append(sub_id)
-                except Exception as e:
-                    logger.error(f"Unexpected error sending notification to {sub_id}: {e}")
+            # 配信はキューから行う。失敗分は push-worker（cron）が再試行する
+            return self.run_push_worker()
+
+        except Exception as e:
+            logger.error(f"Unexpected error queueing push notifications: {e}")
+            return 0
 
-            # 無効なサブスクリプションを削除
-            if failed_subscriptions:
-                for sub_id in failed_subscriptions:
-                    del subscriptions[sub_id]
-                with open(subscriptions_file, 'w') as f:
-                    json.dump(subscriptions, f)
-                logger.info(f"Removed {len(failed_subscriptions)} invalid subscriptions")
+    def run_push_worker(self, max_wait=0):
+        """
+        配信キューの送信待ち（新しい通知・再試行・中断された配信）を送信する。
+        再試行待ちの配信は、max_wait 秒以内に送信時刻になるものだけ待って送る
+        """
+        try:
+            # セキュリティマネージャーの初期化
+            from .security_manager import security_manager
+            security_manager.data_dir = DATA_DIR
+            security_manager.initialize()
 
-            logger.info(f"Push notifications sent successfully: {sent_count} sent")
-            return sent_count
+            from .push_sender import PushSender
+
+            # プッシュサービスごとに接続を使い回しながら、PUSH_MAX_WORKERS 件ずつ並列に送信
+            queue = PushQueue(DATA_DIR)
+            sender = PushSender(security_manager.vapid_private_key, security_manager.vapid_subject)
+            try:
+                # 無効なサブスクリプション（404/410）はバッチごとに1回の書き込みで削除される
+                totals = drain(queue, sender, SubscriptionStore(DATA_DIR), max_wait=max_wait)
+            finally:
+                sender.close()
+
+            logger.info(f"Push notifications: {totals['sent']} sent, {totals['retry']} to retry, "
+                        f"{totals['dead']} dead-lettered, {totals['removed']} invalid subscriptions removed "
+                        f"(queue: {queue.stats()})")
+            return totals["sent"]
 
         except ImportError as e:
             logger.error(f"Failed to import required modules for push notifications: {e}")
@@ -1648,21 +1769,56 @@ class MarketDataFetcher:
             # 通知失敗してもレポート生成は成功とする
 
 
+def _parse_only(value, valid_stages):
+    """Parses a comma-separated --only value and validates the stage names."""
+    import argparse
+    stages = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in stages if name not in valid_stages]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(valid_stages)})")
+    return stages
+
+
 if __name__ == '__main__':
+    import argparse
+
     # For running the script directly, load .env file.
     from dotenv import load_dotenv
     load_dotenv()
 
     if os.path.basename(os.getcwd()) == 'backend':
         os.chdir('..')
-    if len(sys.argv) > 1:
+
+    parser = argparse.ArgumentParser(prog="python -m backend.data_fetcher")
+    subparsers = parser.add_subparsers(dest="command")
+    fetch_parser = subparsers.add_parser("fetch", help="fetch raw market data into data_raw.bin")
+    fetch_parser.add_argument(
+        "--only", type=lambda v: _parse_only(v, FETCH_STAGES),
+        help=f"re-run only these stages and merge into the existing raw data ({','.join(FETCH_STAGES)})")
+    generate_parser = subparsers.add_parser("generate", help="generate AI sections and publish the report")
+    generate_parser.add_argument(
+        "--only", type=lambda v: _parse_only(v, AI_SECTIONS),
+        help=f"re-run only these AI sections and merge into the published report ({','.join(AI_SECTIONS)})")
+    push_worker_parser = subparsers.add_parser(
+        "push-worker", help="send queued push notifications (new, retries and interrupted deliveries)")
+    push_worker_parser.add_argument(
+        "--max-wait", type=float, default=0,
+        help="also wait for retries that become due within this many seconds")
+    args = parser.parse_args()
+
+    if args.command == 'fetch':
+        fetcher = MarketDataFetcher()
+        fetcher.fetch_all_data(only=args.only)
+    elif args.command == 'generate':
         fetcher = MarketDataFetcher()
-        if sys.argv[1] == 'fetch':
-            fetcher.fetch_all_data()
-        elif sys.argv[1] == 'generate':
+        if args.only:
+            # 部分再生成では通知を送らない（既に配信済みのレポートの修正のため）
+            fetcher.generate_report(only=args.only)
+        else:
             # generateコマンドの場合は通知も送信
             fetcher.generate_report_with_notification()
-        else:
-            print("Usage: python backend/data_fetcher.py [fetch|generate]")
+    elif args.command == 'push-worker':
+        MarketDataFetcher().run_push_worker(max_wait=args.max_wait)
     else:
-        print("Usage: python backend/data_fetcher.py [fetch|generate]")
+        parser.print_usage()
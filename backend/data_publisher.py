@@ -0,0 +1,314 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # brotliが無い環境ではgzipのみ作成する
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjsonが無い環境では標準のjsonで書く
+    orjson = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# 途中の公開（市況データのみ・AIセクションごと）は数十秒で置き換わるため、軽い圧縮で済ませる
+DRAFT_GZIP_LEVEL = 6
+DRAFT_BROTLI_QUALITY = 5
+# Content-Encoding -> file suffix of the precompressed sibling
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+META_SUFFIX = ".meta.json"
+# 公開のたびに版番号を振り、差分配信のため直近の版をgzipで残す
+VERSIONS_DIR_NAME = 'versions'
+VERSION_HISTORY_LIMIT = int(os.getenv('DATA_VERSION_HISTORY', 20))
+
+
+class RawJSON(bytes):
+    """Compact JSON bytes of a value that is already serialized; top-level members of this type are published as is."""
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _orjson_default(value):
+    # numpy.float64 など float のサブクラスは標準のjsonと同じく数値として書く
+    if isinstance(value, float):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_stdlib(value):
+    try:
+        return _ENCODER.encode(value)
+    except ValueError:
+        if not isinstance(value, (float, dict, list, tuple)):
+            raise
+    # NaN・Infinity を含む部分だけを分解して null にする
+    if isinstance(value, float):
+        return 'null'
+    if isinstance(value, dict):
+        return '{' + ','.join(_ENCODER.encode(key if isinstance(key, str) else _ENCODER.encode(key)) + ':'
+                              + _encode_stdlib(item) for key, item in value.items()) + '}'
+    return '[' + ','.join(_encode_stdlib(item) for item in value) + ']'
+
+
+def serialize(data):
+    """Serializes a document exactly as the API sends it (compact UTF-8 JSON, NaN and ±Infinity as null)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # 64ビットを超える整数など、orjsonが扱えない値は標準のjsonで書く
+    return _encode_stdlib(data).encode('utf-8')
+
+
+def _members(data):
+    """Yields (head, member) bytes of each top-level member of a dict; their concatenation is serialize(data)."""
+    for i, (key, value) in enumerate(data.items()):
+        yield (b',' if i else b'') + serialize(key) + b':', value if isinstance(value, RawJSON) else serialize(value)
+
+
+def serialize_with_offsets(data):
+    """
+    Returns (bytes, offsets) where bytes is exactly serialize(data) and offsets maps each top-level key to the
+    [start, length] of its value in the bytes. The archive index uses them to read one member of a dated file
+    without parsing the whole file.
+    """
+    if not isinstance(data, dict) or not data:
+        return serialize(data), {}
+    parts = [b'{']
+    position = 1
+    offsets = {}
+    for key, (head, member) in zip(data, _members(data)):
+        offsets[key] = [position + len(head), len(member)]
+        parts += [head, member]
+        position += len(head) + len(member)
+    parts.append(b'}')
+    return b''.join(parts), offsets
+
+
+def write_json(data, fp):
+    """
+    Writes serialize(data) to the binary file fp one top-level member at a time. Nothing is copied to sanitize
+    NaN/Infinity and only one member is encoded in memory at once, however large the whole document is.
+    """
+    if not isinstance(data, dict) or not data:
+        fp.write(serialize(data))
+        return
+    fp.write(b'{')
+    for head, member in _members(data):
+        fp.write(head)
+        fp.write(member)
+    fp.write(b'}')
+
+
+def compute_etag(body):
+    """Strong ETag of the identity representation."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def encoded_etag(etag, encoding):
+    """Each content-coding is a different representation, so it gets its own strong ETag."""
+    return etag if encoding == "identity" else f'{etag[:-1]}-{encoding}"'
+
+
+def available_encodings():
+    return ["gzip", "br"] if brotli is not None else ["gzip"]
+
+
+def encode(body, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    """Compresses body with one content-coding ("br" or "gzip")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def compress(body, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    """Returns {content-coding: bytes} for every available precompressed variant."""
+    return {encoding: encode(body, encoding, gzip_level, brotli_quality) for encoding in available_encodings()}
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return {"ino": st.st_ino, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _write_file(path, payload, sync=False):
+    with open(path, 'wb') as f:
+        f.write(payload)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _replace(path, payload, sync=False):
+    tmp_path = f"{path}.tmp"
+    _write_file(tmp_path, payload, sync)
+    os.replace(tmp_path, path)
+
+
+def _link_replace(source, path):
+    """Makes path another name of source (a hardlink placed with os.replace). Returns False when links are unsupported."""
+    tmp_path = f"{path}.tmp"
+    try:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        os.link(source, tmp_path)
+    except OSError:
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def _fsync_dir(directory):
+    # リネームそのものを永続化する（ディレクトリのfsyncが使えない環境では何もしない）
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def versions_dir_for(path):
+    return os.path.join(os.path.dirname(path) or '.', VERSIONS_DIR_NAME)
+
+
+def _snapshot_versions(versions_dir):
+    try:
+        names = os.listdir(versions_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-len(".json.gz")]) for name in names
+                  if name.endswith(".json.gz") and name[:-len(".json.gz")].isdigit())
+
+
+def latest_version(versions_dir):
+    versions = _snapshot_versions(versions_dir)
+    return versions[-1] if versions else 0
+
+
+def _meta_version(path):
+    try:
+        with open(path + META_SUFFIX, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get("version", 0))
+    except (OSError, ValueError, TypeError):
+        return 0
+
+
+def load_snapshot(versions_dir, version):
+    """Returns the document published as the given version, or None when it is no longer kept."""
+    try:
+        with open(os.path.join(versions_dir, f"{version}.json.gz"), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+    except (OSError, ValueError):
+        return None
+
+
+def _store_snapshot(versions_dir, version, gzipped_body):
+    os.makedirs(versions_dir, exist_ok=True)
+    _replace(os.path.join(versions_dir, f"{version}.json.gz"), gzipped_body)
+    for old in _snapshot_versions(versions_dir):
+        if old <= version - VERSION_HISTORY_LIMIT:
+            try:
+                os.remove(os.path.join(versions_dir, f"{old}.json.gz"))
+            except OSError:
+                pass
+
+
+def _publish_siblings(path, variants, meta):
+    for encoding, payload in variants.items():
+        _replace(path + ENCODING_SUFFIXES[encoding], payload, sync=True)
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if encoding not in variants and os.path.exists(path + suffix):
+            os.remove(path + suffix)  # 古い圧縮ファイルが残らないようにする
+    _replace(path + META_SUFFIX, json.dumps(meta).encode('utf-8'), sync=True)
+
+
+def write_document(data, paths, draft=False):
+    """
+    Publishes data under every path in one step: the document is serialized once (compact, the same bytes the API
+    sends), written to a temp file and fsynced, then renamed into place as paths[0]; the other paths become hardlinks
+    of that file. Each path gets precompressed siblings (path.gz, path.br) and a path.meta.json with the version,
+    ETag and the byte offsets of the top-level members, all written before the JSON file is renamed, so readers
+    never see a partial file or a file without its metadata. Every publication gets the next monotonic "version";
+    a snapshot of every version is kept in versions/ for /api/data/delta.
+    A draft (an intermediate publication that the next one replaces soon) is compressed with cheap levels.
+    Returns the version and ETag of the published document.
+    """
+    versions_dir = versions_dir_for(paths[0])
+    # スナップショットが消えても版番号が戻らないよう、既存ファイルのメタ情報も見る
+    version = max([latest_version(versions_dir)] + [_meta_version(path) for path in paths]) + 1
+    # 遅延読み込みの文書（raw_store.LazyDocument）は、読まれていないメンバーを直列化済みのまま公開する
+    publishable = getattr(data, 'publishable', None)
+    data = dict(publishable() if publishable is not None else data, version=version)
+    body, offsets = serialize_with_offsets(data)
+    variants = compress(body, DRAFT_GZIP_LEVEL, DRAFT_BROTLI_QUALITY) if draft else compress(body)
+    etag = compute_etag(body)
+    # 版のスナップショットは公開より先に書き、APIが差分の基準を必ず見つけられるようにする
+    _store_snapshot(versions_dir, version, variants["gzip"])
+
+    def meta_for(signature):
+        return {
+            "version": version,
+            "etag": etag,
+            "size": len(body),
+            "encodings": {encoding: len(payload) for encoding, payload in variants.items()},
+            "source": signature,
+            "offsets": offsets,
+        }
+
+    source = paths[0]
+    tmp_path = f"{source}.tmp"
+    _write_file(tmp_path, body, sync=True)
+    # os.replace・os.link はinode・サイズ・mtimeを保つため、公開後のファイルと対応付けられる
+    signature = file_signature(tmp_path)
+    _publish_siblings(source, variants, meta_for(signature))
+    os.replace(tmp_path, source)
+
+    for path in paths[1:]:
+        # 同じ内容を書き直さず、同じinodeの別名にする（シグネチャもメタ情報もそのまま使える）
+        if all(_link_replace(source + suffix, path + suffix) for suffix in
+               [ENCODING_SUFFIXES[encoding] for encoding in variants] + [META_SUFFIX]):
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                if encoding not in variants and os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            if _link_replace(source, path):
+                continue
+        # ハードリンクが使えないファイルシステムでは、同じバイト列を書いて置き換える
+        copy_path = f"{path}.tmp"
+        _write_file(copy_path, body, sync=True)
+        _publish_siblings(path, variants, meta_for(file_signature(copy_path)))
+        os.replace(copy_path, path)
+
+    for directory in {os.path.dirname(path) for path in paths}:
+        _fsync_dir(directory)
+    return {"version": version, "etag": etag}
+
+
+def read_precompressed(path, signature):
+    """
+    Returns (etag, {content-coding: bytes}) written by write_document for the file with the given signature,
+    or None when the siblings are missing or belong to another version of the file.
+    """
+    try:
+        with open(path + META_SUFFIX, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("source") != signature:
+            return None
+        variants = {}
+        for encoding, size in meta.get("encodings", {}).items():
+            with open(path + ENCODING_SUFFIXES[encoding], 'rb') as f:
+                variants[encoding] = f.read()
+            if len(variants[encoding]) != size:
+                return None  # 読み込み中に次の公開で置き換えられた
+        return meta["etag"], variants
+    except (OSError, ValueError, KeyError):
+        return None
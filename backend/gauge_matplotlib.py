@@ -0,0 +1,189 @@
+# matplotlib によるゲージ描画（GAUGE_RENDERER=matplotlib、デフォルト）
+import hashlib
+import os
+import math
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge, Polygon, Circle
+import numpy as np
+from PIL import Image
+
+from .image_generator import (
+    DPI, END_ANGLE, FIGSIZE, GAUGE_CACHE_DIR, HISTORY_KEYS, HISTORY_START_Y, HISTORY_X_CIRCLE,
+    HISTORY_X_LABEL, HISTORY_X_STATUS, HISTORY_Y_STEP, RADIUS_INNER, RADIUS_OUTER, SEGMENTS,
+    START_ANGLE, STATUS_COLORS, X_LIMITS, Y_LIMITS, _history_rows, get_fear_greed_category,
+)
+
+# Bump when the static layout changes so stale cached backgrounds are not reused
+GAUGE_TEMPLATE_VERSION = 1
+
+def _setup_axes(ax):
+    ax.set_xlim(*X_LIMITS)
+    ax.set_ylim(*Y_LIMITS)
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+def _draw_static(ax, current_category, history_labels):
+    """Draws everything that only depends on the active segment and the history row labels."""
+    for segment in SEGMENTS:
+        a2, a1 = segment["angle"]  # start and end angles for the wedge
+
+        is_active = (current_category == segment["category"])
+
+        if is_active:
+            # Use the new color scheme for the active segment
+            face, _ = STATUS_COLORS.get(current_category, ("#e0e0e0", "black"))
+            edge = 'black'
+            lw = 1.5
+        else:
+            face = '#f0f0f0'
+            edge = '#d3d3d3'
+            lw = 1.0
+
+        wedge = Wedge((0,0), RADIUS_OUTER, a2, a1, width=RADIUS_OUTER-RADIUS_INNER,
+                      facecolor=face, edgecolor=edge, linewidth=lw, zorder=1)
+        ax.add_patch(wedge)
+
+        mid_angle = math.radians((a1 + a2) / 2)
+        lx = (RADIUS_OUTER + 0.15) * math.cos(mid_angle)
+        ly = (RADIUS_OUTER + 0.15) * math.sin(mid_angle)
+        ax.text(lx, ly, segment["label"], ha='center', va='center', fontsize=11, fontweight='bold', color='#555555')
+
+    # 目盛り（数字と点、5刻み）
+    for pct in range(0, 101, 5):
+        ang = math.radians(START_ANGLE - (pct/100)*(START_ANGLE-END_ANGLE))
+        r_text = RADIUS_INNER - 0.1
+        x_text = r_text * math.cos(ang)
+        y_text = r_text * math.sin(ang)
+        if pct % 25 == 0:
+            ax.text(x_text, y_text, str(pct), ha='center', va='center', fontsize=9, color='#333333')
+        else:
+            ax.plot([x_text], [y_text], marker='.', markersize=4, color='grey', zorder=2)
+
+    for i, label in history_labels:
+        current_y = HISTORY_START_Y + i * HISTORY_Y_STEP
+        ax.text(HISTORY_X_LABEL, current_y, label, ha='left', va='center', fontsize=11, color='grey')
+
+        if i < len(HISTORY_KEYS) - 1:
+            line_y = current_y + HISTORY_Y_STEP / 2
+            ax.plot([HISTORY_X_LABEL, HISTORY_X_CIRCLE + 0.3], [line_y, line_y], color='#e0e0e0', linestyle='dotted', linewidth=1)
+
+def _draw_dynamic(ax, data):
+    """Draws the needle, the center value and the history values."""
+    value = data["center_value"]
+
+    # 針
+    needle_angle = math.radians(START_ANGLE - (value/100)*(START_ANGLE-END_ANGLE))
+    needle_length = RADIUS_OUTER - 0.05
+    w = 0.02
+    dx = w * math.cos(needle_angle + math.pi/2)
+    dy = w * math.sin(needle_angle + math.pi/2)
+    x_tip = needle_length * math.cos(needle_angle)
+    y_tip = needle_length * math.sin(needle_angle)
+    poly_coords = [(-dx, -dy*2), (x_tip, y_tip), (dx, -dy*2)]
+    needle = Polygon(poly_coords, closed=True, facecolor='black', edgecolor='black', zorder=4)
+    ax.add_patch(needle)
+
+    # 中央の数字 (枠線を削除)
+    center_pivot = Circle((0,0), 0.15, facecolor='white', zorder=5) # edgecolor and linewidth removed
+    ax.add_patch(center_pivot)
+    ax.text(0, 0, str(value), fontsize=32, fontweight='bold', ha='center', va='center', zorder=6)
+
+    # ===== 下部情報エリア (縦一列に修正) =====
+    for i, item in _history_rows(data):
+        status = item["status"]
+        # Use the new color scheme for historical data circles
+        bg, border = STATUS_COLORS.get(status, ("#cccccc", "#666666"))
+
+        current_y = HISTORY_START_Y + i * HISTORY_Y_STEP
+
+        ax.text(HISTORY_X_STATUS, current_y, status, ha='left', va='center', fontsize=11, fontweight='bold')
+
+        circle = Circle((HISTORY_X_CIRCLE, current_y), 0.1, facecolor=bg, edgecolor=border, linewidth=1.0, zorder=3)
+        ax.add_patch(circle)
+        ax.text(HISTORY_X_CIRCLE, current_y, str(item["value"]), ha='center', va='center', fontsize=11, fontweight='bold', color='black')
+
+def render_fear_greed_chart_full(data, output_path):
+    """Renders the whole gauge in a fresh figure (no caching)."""
+    fig, ax = plt.subplots(figsize=FIGSIZE, subplot_kw={'aspect':'equal'})
+    _setup_axes(ax)
+
+    history_labels = [(i, item["label"]) for i, item in _history_rows(data)]
+    _draw_static(ax, get_fear_greed_category(data["center_value"]), history_labels)
+    _draw_dynamic(ax, data)
+
+    plt.savefig(output_path, bbox_inches='tight', pad_inches=0.1)
+    plt.close(fig)
+
+class GaugeTemplateRenderer:
+    """
+    Renders the gauge by compositing the dynamic elements onto a cached static background.
+    Backgrounds are kept in memory and as base PNGs in cache_dir, keyed by the active segment and history labels.
+    """
+
+    def __init__(self, cache_dir=GAUGE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._backgrounds = {}
+        self._dynamic_fig = None
+        self._dynamic_ax = None
+
+    def _new_figure(self):
+        fig = Figure(figsize=FIGSIZE, dpi=DPI)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        _setup_axes(ax)
+        return fig, ax
+
+    def _background(self, category, history_labels):
+        key = (category, tuple(history_labels))
+        background = self._backgrounds.get(key)
+        if background is not None:
+            return background
+
+        digest = hashlib.sha1(repr((GAUGE_TEMPLATE_VERSION, key)).encode('utf-8')).hexdigest()[:12]
+        cache_path = os.path.join(self.cache_dir, f"gauge_base_{digest}.png")
+        if os.path.exists(cache_path):
+            with Image.open(cache_path) as cached:
+                background = cached.convert('RGBA')
+        else:
+            fig, ax = self._new_figure()
+            _draw_static(ax, category, history_labels)
+            fig.canvas.draw()
+            background = Image.fromarray(np.asarray(fig.canvas.buffer_rgba()).copy(), 'RGBA')
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                background.save(cache_path)
+            except OSError:
+                pass  # キャッシュに書けなくても描画は継続する
+
+        self._backgrounds[key] = background
+        return background
+
+    def _dynamic_layer(self, data):
+        if self._dynamic_fig is None:
+            self._dynamic_fig, self._dynamic_ax = self._new_figure()
+            self._dynamic_fig.patch.set_alpha(0)
+        ax = self._dynamic_ax
+        # 前回描画した針・数値を取り除く
+        for artist in list(ax.patches) + list(ax.texts):
+            artist.remove()
+        _draw_dynamic(ax, data)
+        fig = self._dynamic_fig
+        fig.canvas.draw()
+
+        # savefig(bbox_inches='tight', pad_inches=0.1) 相当の切り抜き範囲（ピクセル、左上原点）
+        tight = fig.get_tightbbox(fig.canvas.get_renderer())
+        height = fig.bbox.height
+        crop_box = (round((tight.x0 - 0.1) * DPI), round(height - (tight.y1 + 0.1) * DPI),
+                    round((tight.x1 + 0.1) * DPI), round(height - (tight.y0 - 0.1) * DPI))
+        return Image.fromarray(np.asarray(fig.canvas.buffer_rgba()), 'RGBA'), crop_box
+
+    def render(self, data, output_path):
+        history_labels = [(i, item["label"]) for i, item in _history_rows(data)]
+        background = self._background(get_fear_greed_category(data["center_value"]), history_labels)
+        layer, crop_box = self._dynamic_layer(data)
+        image = Image.alpha_composite(background, layer).convert('RGB')
+        image.crop(crop_box).save(output_path)
+
+template_renderer = GaugeTemplateRenderer()
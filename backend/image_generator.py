@@ -1,7 +1,68 @@
+import hashlib
+import logging
 import math
-import matplotlib.pyplot as plt
-from matplotlib.patches import Wedge, Polygon, Circle
 import os
+import time
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend')
+GAUGE_BASENAME = 'fear_and_greed_gauge'
+# Content-hashed copies of the gauge, served with immutable caching
+GAUGE_ASSET_DIR = os.path.join(DEFAULT_OUTPUT_DIR, 'gauge')
+GAUGE_ASSET_URL_PREFIX = '/gauge'
+GAUGE_ASSET_WIDTHS = [int(w) for w in os.getenv('GAUGE_ASSET_WIDTHS', '320,640,1280').split(',') if w.strip()]
+GAUGE_ASSET_FORMATS = ['webp', 'png']
+GAUGE_ASSET_RETENTION_HOURS = 48
+ASSET_HASH_LENGTH = 12
+# Static gauge backgrounds are cached here, one PNG per active-segment state
+GAUGE_CACHE_DIR = os.getenv('GAUGE_CACHE_DIR', os.path.join(os.path.dirname(__file__), '..', 'data', 'gauge_cache'))
+
+# New, more detailed color scheme
+STATUS_COLORS = {
+    "Extreme Fear":  ("#cc6600", "#994c00"), # bg, border
+    "Fear":          ("#f6a35c", "#cc6600"),
+    "Neutral":       ("#bfbfbf", "#666666"),
+    "Greed":         ("#66cc99", "#006633"),
+    "Extreme Greed": ("#006633", "#004c24")
+}
+
+# Define segments with their value ranges, angles, and category name
+SEGMENTS = [
+    {"label": "EXTREME FEAR",  "category": "Extreme Fear",  "angle": (135, 180)},
+    {"label": "FEAR",          "category": "Fear",          "angle": (99, 135)},
+    {"label": "NEUTRAL",       "category": "Neutral",       "angle": (81, 99)},
+    {"label": "GREED",         "category": "Greed",         "angle": (45, 81)},
+    {"label": "EXTREME GREED", "category": "Extreme Greed", "angle": (0, 45)}
+]
+HISTORY_KEYS = ["previous_close", "week_ago", "month_ago", "year_ago"]
+
+START_ANGLE = 180
+END_ANGLE = 0
+RADIUS_OUTER = 1.0
+RADIUS_INNER = 0.6
+FIGSIZE = (8, 8)
+DPI = 100
+X_LIMITS = (-1.5, 1.5)
+Y_LIMITS = (-1.3, 1.5)
+
+# 下部情報エリアのレイアウト
+HISTORY_START_Y = -0.25
+HISTORY_Y_STEP = -0.2
+HISTORY_X_LABEL = -1.4
+HISTORY_X_STATUS = 0.0
+HISTORY_X_CIRCLE = 1.0
+
+# Raster geometry of the SVG/Pillow backends, matching the matplotlib output:
+# the equal-aspect axes are 620px wide at 100 dpi, plus the 0.1in tight-bbox padding.
+PIXELS_PER_UNIT = 620 / (X_LIMITS[1] - X_LIMITS[0])
+IMAGE_PAD = 0.1 * DPI
+IMAGE_SIZE = (round((X_LIMITS[1] - X_LIMITS[0]) * PIXELS_PER_UNIT + 2 * IMAGE_PAD),
+              int((Y_LIMITS[1] - Y_LIMITS[0]) * PIXELS_PER_UNIT + 2 * IMAGE_PAD))
+FONT_FAMILY = "DejaVu Sans, Helvetica, Arial, sans-serif"
+GREY = "#808080"
+PILLOW_SUPERSAMPLE = 2
 
 def get_fear_greed_category(value):
     if value is None: return "Unknown"
@@ -11,128 +72,298 @@ def get_fear_greed_category(value):
     if value <= 75: return "Greed"
     return "Extreme Greed"
 
-def generate_fear_greed_chart(data):
+def _history_rows(data):
+    """Yields (index, item) for the history rows present in the data, keeping their fixed row positions."""
+    history = data["history"]
+    for i, key in enumerate(HISTORY_KEYS):
+        if key in history:
+            yield i, history[key]
+
+def gauge_primitives(data):
     """
-    Generates the Fear & Greed Index gauge chart and saves it as a PNG image.
-    The data structure is expected to be similar to the example provided by the user.
+    Describes the gauge as drawing primitives in paint order (the z-order of the matplotlib figure).
+    Positions are in data coordinates; font sizes and line widths are in points.
     """
-    output_path = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'fear_and_greed_gauge.png')
-
-    # New, more detailed color scheme
-    status_colors = {
-        "Extreme Fear":  ("#cc6600", "#994c00"), # bg, border
-        "Fear":          ("#f6a35c", "#cc6600"),
-        "Neutral":       ("#bfbfbf", "#666666"),
-        "Greed":         ("#66cc99", "#006633"),
-        "Extreme Greed": ("#006633", "#004c24")
-    }
-
-    # ===== ゲージ描画 =====
     value = data["center_value"]
     current_category = get_fear_greed_category(value)
+    shapes, labels = [], []
 
-    # Define segments with their value ranges, angles, and category name
-    segments = [
-        {"label": "EXTREME FEAR",  "category": "Extreme Fear",  "angle": (135, 180)},
-        {"label": "FEAR",          "category": "Fear",          "angle": (99, 135)},
-        {"label": "NEUTRAL",       "category": "Neutral",       "angle": (81, 99)},
-        {"label": "GREED",         "category": "Greed",         "angle": (45, 81)},
-        {"label": "EXTREME GREED", "category": "Extreme Greed", "angle": (0, 45)}
-    ]
-    start_angle = 180
-    end_angle = 0
-    radius_outer = 1.0
-    radius_inner = 0.6
-
-    fig, ax = plt.subplots(figsize=(8, 8), subplot_kw={'aspect':'equal'})
-    ax.set_xlim(-1.5, 1.5)
-    ax.set_ylim(-1.3, 1.5)
-    ax.axis('off')
-
-    for segment in segments:
-        a2, a1 = segment["angle"]  # start and end angles for the wedge
-
-        is_active = (current_category == segment["category"])
-
-        if is_active:
-            # Use the new color scheme for the active segment
-            face, _ = status_colors.get(current_category, ("#e0e0e0", "black"))
-            edge = 'black'
-            lw = 1.5
+    for segment in SEGMENTS:
+        a2, a1 = segment["angle"]
+        if current_category == segment["category"]:
+            face, _ = STATUS_COLORS.get(current_category, ("#e0e0e0", "black"))
+            shapes.append({"kind": "sector", "theta1": a2, "theta2": a1, "fill": face, "stroke": "#000000", "width": 1.5})
         else:
-            face = '#f0f0f0'
-            edge = '#d3d3d3'
-            lw = 1.0
-
-        wedge = Wedge((0,0), radius_outer, a2, a1, width=radius_outer-radius_inner,
-                      facecolor=face, edgecolor=edge, linewidth=lw, zorder=1)
-        ax.add_patch(wedge)
+            shapes.append({"kind": "sector", "theta1": a2, "theta2": a1, "fill": "#f0f0f0", "stroke": "#d3d3d3", "width": 1.0})
 
         mid_angle = math.radians((a1 + a2) / 2)
-        lx = (radius_outer + 0.15) * math.cos(mid_angle)
-        ly = (radius_outer + 0.15) * math.sin(mid_angle)
-        ax.text(lx, ly, segment["label"], ha='center', va='center', fontsize=11, fontweight='bold', color='#555555')
+        labels.append({"kind": "text", "x": (RADIUS_OUTER + 0.15) * math.cos(mid_angle), "y": (RADIUS_OUTER + 0.15) * math.sin(mid_angle),
+                       "text": segment["label"], "size": 11, "bold": True, "color": "#555555", "anchor": "middle"})
 
     # 目盛り（数字と点、5刻み）
     for pct in range(0, 101, 5):
-        ang = math.radians(start_angle - (pct/100)*(start_angle-end_angle))
-        r_text = radius_inner - 0.1
-        x_text = r_text * math.cos(ang)
-        y_text = r_text * math.sin(ang)
+        ang = math.radians(START_ANGLE - (pct/100)*(START_ANGLE-END_ANGLE))
+        x = (RADIUS_INNER - 0.1) * math.cos(ang)
+        y = (RADIUS_INNER - 0.1) * math.sin(ang)
         if pct % 25 == 0:
-            ax.text(x_text, y_text, str(pct), ha='center', va='center', fontsize=9, color='#333333')
+            labels.append({"kind": "text", "x": x, "y": y, "text": str(pct), "size": 9, "bold": False, "color": "#333333", "anchor": "middle"})
         else:
-            ax.plot([x_text], [y_text], marker='.', markersize=4, color='grey', zorder=2)
+            shapes.append({"kind": "dot", "x": x, "y": y, "diameter": 2.0, "fill": GREY})
+
+    rows = []
+    for i, item in _history_rows(data):
+        current_y = HISTORY_START_Y + i * HISTORY_Y_STEP
+        labels.append({"kind": "text", "x": HISTORY_X_LABEL, "y": current_y, "text": item["label"], "size": 11, "bold": False, "color": GREY, "anchor": "start"})
+        if i < len(HISTORY_KEYS) - 1:
+            line_y = current_y + HISTORY_Y_STEP / 2
+            shapes.append({"kind": "line", "x1": HISTORY_X_LABEL, "y1": line_y, "x2": HISTORY_X_CIRCLE + 0.3, "y2": line_y,
+                           "color": "#e0e0e0", "width": 1.0, "dotted": True})
+
+        bg, border = STATUS_COLORS.get(item["status"], ("#cccccc", "#666666"))
+        rows += [
+            {"kind": "text", "x": HISTORY_X_STATUS, "y": current_y, "text": item["status"], "size": 11, "bold": True, "color": "#000000", "anchor": "start"},
+            {"kind": "circle", "x": HISTORY_X_CIRCLE, "y": current_y, "r": 0.1, "fill": bg, "stroke": border, "width": 1.0},
+            {"kind": "text", "x": HISTORY_X_CIRCLE, "y": current_y, "text": str(item["value"]), "size": 11, "bold": True, "color": "#000000", "anchor": "middle"},
+        ]
 
     # 針
-    needle_angle = math.radians(start_angle - (value/100)*(start_angle-end_angle))
-    needle_length = radius_outer - 0.05
+    needle_angle = math.radians(START_ANGLE - (value/100)*(START_ANGLE-END_ANGLE))
+    needle_length = RADIUS_OUTER - 0.05
     w = 0.02
     dx = w * math.cos(needle_angle + math.pi/2)
     dy = w * math.sin(needle_angle + math.pi/2)
-    x_tip = needle_length * math.cos(needle_angle)
-    y_tip = needle_length * math.sin(needle_angle)
-    poly_coords = [(-dx, -dy*2), (x_tip, y_tip), (dx, -dy*2)]
-    needle = Polygon(poly_coords, closed=True, facecolor='black', edgecolor='black', zorder=4)
-    ax.add_patch(needle)
-
-    # 中央の数字 (枠線を削除)
-    center_pivot = Circle((0,0), 0.15, facecolor='white', zorder=5) # edgecolor and linewidth removed
-    ax.add_patch(center_pivot)
-    ax.text(0, 0, str(value), fontsize=32, fontweight='bold', ha='center', va='center', zorder=6)
-
-    # ===== 下部情報エリア (縦一列に修正) =====
-    history = data["history"]
-    history_keys = ["previous_close", "week_ago", "month_ago", "year_ago"]
+    needle = {"kind": "polygon", "fill": "#000000",
+              "points": [(-dx, -dy*2), (needle_length * math.cos(needle_angle), needle_length * math.sin(needle_angle)), (dx, -dy*2)]}
+
+    return shapes + labels + rows + [
+        needle,
+        {"kind": "circle", "x": 0, "y": 0, "r": 0.15, "fill": "#ffffff", "stroke": None, "width": 0},
+        {"kind": "text", "x": 0, "y": 0, "text": str(value), "size": 32, "bold": True, "color": "#000000", "anchor": "middle"},
+    ]
+
+def _to_px(x, y, scale=1):
+    return ((IMAGE_PAD + (x - X_LIMITS[0]) * PIXELS_PER_UNIT) * scale,
+            (IMAGE_PAD + (Y_LIMITS[1] - y) * PIXELS_PER_UNIT) * scale)
+
+def _pt_to_px(points, scale=1):
+    return points * DPI / 72 * scale
+
+def _num(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+def _svg_sector(shape):
+    r_out, r_in = RADIUS_OUTER * PIXELS_PER_UNIT, RADIUS_INNER * PIXELS_PER_UNIT
+    t1, t2 = math.radians(shape["theta1"]), math.radians(shape["theta2"])
+    ox1, oy1 = _to_px(RADIUS_OUTER * math.cos(t1), RADIUS_OUTER * math.sin(t1))
+    ox2, oy2 = _to_px(RADIUS_OUTER * math.cos(t2), RADIUS_OUTER * math.sin(t2))
+    ix1, iy1 = _to_px(RADIUS_INNER * math.cos(t1), RADIUS_INNER * math.sin(t1))
+    ix2, iy2 = _to_px(RADIUS_INNER * math.cos(t2), RADIUS_INNER * math.sin(t2))
+    return (f"M{_num(ox1)} {_num(oy1)}A{_num(r_out)} {_num(r_out)} 0 0 0 {_num(ox2)} {_num(oy2)}"
+            f"L{_num(ix2)} {_num(iy2)}A{_num(r_in)} {_num(r_in)} 0 0 1 {_num(ix1)} {_num(iy1)}Z")
+
+def render_svg(data, output_path):
+    """Writes the gauge as a self-contained SVG."""
+    width, height = IMAGE_SIZE
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" font-family="{FONT_FAMILY}">',
+        f'<rect width="{width}" height="{height}" fill="#fff"/>',
+    ]
+    for shape in gauge_primitives(data):
+        kind = shape["kind"]
+        if kind == "sector":
+            parts.append(f'<path d="{_svg_sector(shape)}" fill="{shape["fill"]}" stroke="{shape["stroke"]}" stroke-width="{_num(_pt_to_px(shape["width"]))}"/>')
+        elif kind == "dot":
+            cx, cy = _to_px(shape["x"], shape["y"])
+            parts.append(f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{_num(_pt_to_px(shape["diameter"]) / 2)}" fill="{shape["fill"]}"/>')
+        elif kind == "line":
+            x1, y1 = _to_px(shape["x1"], shape["y1"])
+            x2, _ = _to_px(shape["x2"], shape["y2"])
+            lw = _pt_to_px(shape["width"])
+            dash = f' stroke-dasharray="{_num(lw)} {_num(1.65 * lw)}"' if shape.get("dotted") else ''
+            parts.append(f'<path d="M{_num(x1)} {_num(y1)}H{_num(x2)}" stroke="{shape["color"]}" stroke-width="{_num(lw)}"{dash}/>')
+        elif kind == "circle":
+            cx, cy = _to_px(shape["x"], shape["y"])
+            stroke = f' stroke="{shape["stroke"]}" stroke-width="{_num(_pt_to_px(shape["width"]))}"' if shape["stroke"] else ''
+            parts.append(f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{_num(shape["r"] * PIXELS_PER_UNIT)}" fill="{shape["fill"]}"{stroke}/>')
+        elif kind == "polygon":
+            points = " ".join(f"{_num(px)},{_num(py)}" for px, py in (_to_px(x, y) for x, y in shape["points"]))
+            parts.append(f'<polygon points="{points}" fill="{shape["fill"]}"/>')
+        elif kind == "text":
+            x, y = _to_px(shape["x"], shape["y"])
+            weight = ' font-weight="bold"' if shape["bold"] else ''
+            parts.append(f'<text x="{_num(x)}" y="{_num(y)}" font-size="{_num(_pt_to_px(shape["size"]))}"{weight} fill="{shape["color"]}" '
+                         f'text-anchor="{shape["anchor"]}" dominant-baseline="central">{escape(shape["text"])}</text>')
+    parts.append('</svg>')
 
-    start_y = -0.25
-    y_step = -0.2
-    x_label = -1.4
-    x_status = 0.0
-    x_circle = 1.0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("".join(parts))
 
-    for i, key in enumerate(history_keys):
-        if key not in history:
+_font_cache = {}
+
+def _pillow_font(size_px, bold):
+    from PIL import ImageFont
+
+    key = (round(size_px), bold)
+    if key not in _font_cache:
+        name = os.getenv('GAUGE_FONT_BOLD', 'DejaVuSans-Bold.ttf') if bold else os.getenv('GAUGE_FONT', 'DejaVuSans.ttf')
+        try:
+            _font_cache[key] = ImageFont.truetype(name, key[0])
+        except OSError:
+            # DejaVuフォントが無い環境ではPillow同梱のフォントで代用する
+            _font_cache[key] = ImageFont.load_default(size=key[0])
+    return _font_cache[key]
+
+def _sector_outline(theta1, theta2, scale):
+    """Polygon points of an annular sector (degrees, counter-clockwise from +x)."""
+    steps = max(2, int(theta2 - theta1))
+    angles = [math.radians(theta1 + (theta2 - theta1) * k / steps) for k in range(steps + 1)]
+    points = [_to_px(RADIUS_OUTER * math.cos(a), RADIUS_OUTER * math.sin(a), scale) for a in angles]
+    points += [_to_px(RADIUS_INNER * math.cos(a), RADIUS_INNER * math.sin(a), scale) for a in reversed(angles)]
+    return points
+
+def _pillow_image(data, scale=1):
+    """Rasterizes the gauge with Pillow at scale x IMAGE_SIZE, drawing supersampled and downscaling for anti-aliasing."""
+    from PIL import Image, ImageDraw
+
+    s = PILLOW_SUPERSAMPLE * scale
+    width, height = IMAGE_SIZE
+    image = Image.new('RGB', (width * s, height * s), 'white')
+    draw = ImageDraw.Draw(image)
+
+    for shape in gauge_primitives(data):
+        kind = shape["kind"]
+        if kind == "sector":
+            draw.polygon(_sector_outline(shape["theta1"], shape["theta2"], s), fill=shape["fill"],
+                         outline=shape["stroke"], width=max(1, round(_pt_to_px(shape["width"], s))))
+        elif kind == "dot":
+            cx, cy = _to_px(shape["x"], shape["y"], s)
+            r = _pt_to_px(shape["diameter"], s) / 2
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=shape["fill"])
+        elif kind == "line":
+            x1, y1 = _to_px(shape["x1"], shape["y1"], s)
+            x2, _ = _to_px(shape["x2"], shape["y2"], s)
+            lw = _pt_to_px(shape["width"], s)
+            on, off = (lw, 1.65 * lw) if shape.get("dotted") else (x2 - x1, 0)
+            x = x1
+            while x < x2:
+                draw.line((x, y1, min(x + on, x2), y1), fill=shape["color"], width=max(1, round(lw)))
+                x += on + off
+        elif kind == "circle":
+            cx, cy = _to_px(shape["x"], shape["y"], s)
+            r = shape["r"] * PIXELS_PER_UNIT * s
+            outline_width = max(1, round(_pt_to_px(shape["width"], s))) if shape["stroke"] else 0
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=shape["fill"], outline=shape["stroke"], width=outline_width)
+        elif kind == "polygon":
+            draw.polygon([_to_px(x, y, s) for x, y in shape["points"]], fill=shape["fill"])
+        elif kind == "text":
+            draw.text(_to_px(shape["x"], shape["y"], s), shape["text"], fill=shape["color"],
+                      font=_pillow_font(_pt_to_px(shape["size"], s), shape["bold"]),
+                      anchor="mm" if shape["anchor"] == "middle" else "lm")
+
+    return image.reduce(PILLOW_SUPERSAMPLE)
+
+def render_pillow(data, output_path):
+    """Writes the gauge as a PNG rendered with Pillow."""
+    _pillow_image(data).save(output_path)
+
+def generate_fear_greed_chart(data, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Generates the Fear & Greed Index gauge chart and returns the path of the written image.
+    The backend is selected with GAUGE_RENDERER: "matplotlib" (default, PNG), "pillow" (PNG) or "svg".
+    """
+    renderer = os.getenv('GAUGE_RENDERER', 'matplotlib').lower()
+    if renderer == 'svg':
+        output_path = os.path.join(output_dir, f"{GAUGE_BASENAME}.svg")
+        render_svg(data, output_path)
+        return output_path
+
+    output_path = os.path.join(output_dir, f"{GAUGE_BASENAME}.png")
+    if renderer == 'pillow':
+        render_pillow(data, output_path)
+        return output_path
+
+    if renderer != 'matplotlib':
+        logger.warning(f"Unknown GAUGE_RENDERER '{renderer}', falling back to matplotlib.")
+    # matplotlibは読み込みが重いため、このバックエンドを使うときだけimportする
+    from .gauge_matplotlib import template_renderer
+    template_renderer.render(data, output_path)
+    return output_path
+
+# --- Content-hashed assets ---
+def _content_hash(payload):
+    return hashlib.sha256(payload).hexdigest()[:ASSET_HASH_LENGTH]
+
+def _write_asset(payload, asset_dir, stem, extension):
+    """Writes payload as <stem>.<hash>.<extension> (skipped when it already exists) and returns the file name."""
+    name = f"{stem}.{_content_hash(payload)}.{extension}"
+    path = os.path.join(asset_dir, name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    return name
+
+def _encode(image, fmt):
+    import io
+
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=90, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+def _prune_assets(asset_dir, keep):
+    """Removes superseded assets, keeping recent ones for clients that still hold an older data.json."""
+    cutoff = time.time() - GAUGE_ASSET_RETENTION_HOURS * 3600
+    for name in os.listdir(asset_dir):
+        path = os.path.join(asset_dir, name)
+        if name in keep or not name.startswith(GAUGE_BASENAME):
             continue
-        item = history[key]
-        label = item["label"]
-        status = item["status"]
-        val = item["value"]
-        # Use the new color scheme for historical data circles
-        bg, border = status_colors.get(status, ("#cccccc", "#666666"))
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
 
-        current_y = start_y + i * y_step
+def publish_gauge_assets(data, image_path, asset_dir=GAUGE_ASSET_DIR, url_prefix=GAUGE_ASSET_URL_PREFIX):
+    """
+    Publishes the rendered gauge as content-hashed files at several widths (PNG and WebP, or the SVG as is)
+    and returns their URLs for the data JSON. Identical renders map to identical URLs.
+    """
+    from PIL import Image
 
-        ax.text(x_label, current_y, label, ha='left', va='center', fontsize=11, color='grey')
-        ax.text(x_status, current_y, status, ha='left', va='center', fontsize=11, fontweight='bold')
+    os.makedirs(asset_dir, exist_ok=True)
+    assets = {}
+    names = set()
 
-        circle = Circle((x_circle, current_y), 0.1, facecolor=bg, edgecolor=border, linewidth=1.0, zorder=3)
-        ax.add_patch(circle)
-        ax.text(x_circle, current_y, str(val), ha='center', va='center', fontsize=11, fontweight='bold', color='black')
+    if image_path.endswith('.svg'):
+        with open(image_path, 'rb') as f:
+            name = _write_asset(f.read(), asset_dir, GAUGE_BASENAME, 'svg')
+        names.add(name)
+        # render_svg はIMAGE_SIZEで描くため、PNG版と同じく本来の大きさを一緒に渡す
+        assets["svg"] = {"width": IMAGE_SIZE[0], "height": IMAGE_SIZE[1], "url": f"{url_prefix}/{name}"}
+    else:
+        widths = sorted(GAUGE_ASSET_WIDTHS)
+        if os.getenv('GAUGE_RENDERER', 'matplotlib').lower() == 'pillow' and widths[-1] > IMAGE_SIZE[0]:
+            # Pillowなら高解像度版を直接描画できる（拡大による劣化を避ける）
+            master = _pillow_image(data, scale=math.ceil(widths[-1] / IMAGE_SIZE[0]))
+        else:
+            with Image.open(image_path) as opened:
+                master = opened.convert('RGB')
+            # 元画像より大きいサイズは拡大になるため作らない
+            widths = [w for w in widths if w <= master.width] or [master.width]
 
-        if i < len(history_keys) - 1:
-            line_y = current_y + y_step / 2
-            ax.plot([x_label, x_circle + 0.3], [line_y, line_y], color='#e0e0e0', linestyle='dotted', linewidth=1)
+        for fmt in GAUGE_ASSET_FORMATS:
+            variants = []
+            for width in widths:
+                height = round(master.height * width / master.width)
+                image = master if width == master.width else master.resize((width, height), Image.LANCZOS)
+                name = _write_asset(_encode(image, fmt), asset_dir, f"{GAUGE_BASENAME}-{width}w", fmt)
+                names.add(name)
+                variants.append({"width": width, "height": height, "url": f"{url_prefix}/{name}"})
+            assets[fmt] = variants
 
-    plt.savefig(output_path, bbox_inches='tight', pad_inches=0.1)
-    plt.close(fig)
+    _prune_assets(asset_dir, names)
+    return assets
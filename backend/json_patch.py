@@ -0,0 +1,120 @@
+import copy
+
+
+def _escape(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _same(a, b):
+    # True == 1 や 1 == 1.0 を同じ値として扱わない（入れ子の中も含めて）
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, dict):
+        return all(_same(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return all(map(_same, a, b))
+    return True
+
+
+def make_patch(src, dst):
+    """
+    Returns an RFC 6902 JSON Patch (list of operations) that turns src into dst.
+    Objects are diffed key by key and equal-length arrays element by element, so an updated value deep
+    inside a large structure becomes one small "replace" instead of a copy of the whole structure.
+    """
+    ops = []
+    _diff(src, dst, '', ops)
+    return ops
+
+
+def _diff(src, dst, path, ops):
+    if isinstance(src, dict) and isinstance(dst, dict):
+        for key in src:
+            if key not in dst:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in dst.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in src:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                _diff(src[key], value, child, ops)
+    elif isinstance(src, list) and isinstance(dst, list) and _diff_window(src, dst, path, ops):
+        pass
+    elif isinstance(src, list) and isinstance(dst, list) and len(src) == len(dst):
+        for i, (a, b) in enumerate(zip(src, dst)):
+            _diff(a, b, f"{path}/{i}", ops)
+    elif not _same(src, dst):
+        ops.append({"op": "replace", "path": path, "value": dst})
+
+
+def _diff_window(src, dst, path, ops):
+    """
+    Encodes a list that had items dropped from the front and/or appended at the end (e.g. a sliding window
+    of candles) as removes and appends. Returns False when dst is not such a window of src.
+    """
+    if not dst or _same(src, dst):
+        return False
+    shift = next((i for i, item in enumerate(src) if _same(item, dst[0])), None) if src else 0
+    if shift is None:
+        return False
+    kept = len(src) - shift
+    if kept > len(dst) or not _same(src[shift:], dst[:kept]) or (shift == 0 and kept == len(dst)):
+        return False
+    ops.extend({"op": "remove", "path": f"{path}/0"} for _ in range(shift))
+    ops.extend({"op": "add", "path": f"{path}/-", "value": value} for value in dst[kept:])
+    return True
+
+
+def _resolve(doc, path):
+    """Returns (parent, last token) for a JSON Pointer."""
+    if not path.startswith('/'):
+        raise ValueError(f"Invalid JSON Pointer: {path!r}")
+    tokens = [_unescape(t) for t in path[1:].split('/')]
+    parent = doc
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+    return parent, tokens[-1]
+
+
+def apply_patch(doc, patch, in_place=False):
+    """Applies add/remove/replace/test operations of an RFC 6902 patch and returns the result."""
+    if not in_place:
+        doc = copy.deepcopy(doc)
+    for op in patch:
+        if op["path"] == '':
+            if op["op"] in ("add", "replace"):
+                doc = copy.deepcopy(op["value"])
+                continue
+            raise ValueError(f"Unsupported operation on the document root: {op['op']}")
+        parent, token = _resolve(doc, op["path"])
+        kind = op["op"]
+        if isinstance(parent, list):
+            index = len(parent) if token == '-' else int(token)
+            if kind == "add":
+                parent.insert(index, op["value"])
+            elif kind == "remove":
+                del parent[index]
+            elif kind == "replace":
+                parent[index] = op["value"]
+            elif kind == "test":
+                if not _same(parent[index], op["value"]):
+                    raise ValueError(f"Test failed at {op['path']}")
+            else:
+                raise ValueError(f"Unsupported operation: {kind}")
+        else:
+            if kind in ("add", "replace"):
+                if kind == "replace" and token not in parent:
+                    raise KeyError(op["path"])
+                parent[token] = op["value"]
+            elif kind == "remove":
+                del parent[token]
+            elif kind == "test":
+                if not _same(parent[token], op["value"]):
+                    raise ValueError(f"Test failed at {op['path']}")
+            else:
+                raise ValueError(f"Unsupported operation: {kind}")
+    return doc
@@ -0,0 +1,105 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# イベントループを止めたと見なす1回のコールバックの長さ（ミリ秒、0で無効）
+LOOP_SLOW_CALLBACK_MS = float(os.getenv('LOOP_SLOW_CALLBACK_MS', 100))
+# 直近の遅いコールバックを何件覚えておくか
+RECENT_SLOW_CALLBACKS = 50
+
+# 実行中のリクエスト（"GET /api/data"）。コールバックのContextから読み、どのルートが止めたかを記録する
+current_route = contextvars.ContextVar('current_route', default=None)
+
+
+def describe_callback(handle):
+    """A short name of what a Handle runs: the coroutine of a task step, or the callback itself."""
+    callback = getattr(handle, '_callback', None)
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        return owner.get_coro().__qualname__
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+class LoopMonitor:
+    """
+    Times every callback the asyncio event loop runs (the same measurement asyncio's debug mode
+    does for slow_callback_duration, without the rest of debug mode) and logs the ones that block
+    the loop for longer than the threshold, with the route of the request they belong to.
+    """
+
+    def __init__(self, threshold_ms=LOOP_SLOW_CALLBACK_MS):
+        self.threshold = threshold_ms / 1000
+        self.slow_callbacks = 0
+        self.max_blocked_ms = 0.0
+        self.recent = deque(maxlen=RECENT_SLOW_CALLBACKS)
+        self._original_run = None
+
+    def install(self):
+        """Wraps asyncio.Handle._run. Loops that do not use asyncio.Handle (uvloop) are left unmonitored."""
+        if self.threshold <= 0 or self._original_run is not None:
+            return
+        original_run = asyncio.Handle._run
+        monitor = self
+
+        def timed_run(handle):
+            started = time.perf_counter()
+            try:
+                original_run(handle)
+            finally:
+                elapsed = time.perf_counter() - started
+                if elapsed >= monitor.threshold:
+                    monitor.record(handle, elapsed)
+
+        asyncio.Handle._run = timed_run
+        self._original_run = original_run
+
+    def uninstall(self):
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def record(self, handle, elapsed):
+        context = getattr(handle, '_context', None)
+        route = context.get(current_route) if context is not None else None
+        entry = {
+            "route": route or "-",
+            "callback": describe_callback(handle),
+            "blocked_ms": round(elapsed * 1000, 1),
+            "at": time.time(),
+        }
+        self.slow_callbacks += 1
+        self.max_blocked_ms = max(self.max_blocked_ms, entry["blocked_ms"])
+        self.recent.append(entry)
+        logger.warning(f"Event loop blocked for {entry['blocked_ms']}ms by {entry['callback']} "
+                       f"(route: {entry['route']})")
+
+    def stats(self):
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "slow_callbacks": self.slow_callbacks,
+            "max_blocked_ms": self.max_blocked_ms,
+            "recent": list(self.recent),
+        }
+
+
+class RouteContextMiddleware:
+    """Pure ASGI middleware (streaming responses pass straight through) that tags a request's callbacks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # reset はしない: リクエスト全体が1回のコールバックで終わると、計測時にはもう値が戻ってしまう。
+        # uvicorn はリクエストごとに別のタスク（Contextのコピー）で処理するため、他のリクエストには漏れない
+        current_route.set(f"{scope['method']} {scope['path']}")
+        await self.app(scope, receive, send)
+
+
+loop_monitor = LoopMonitor()
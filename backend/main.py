@@ -1,34 +1,55 @@
 # This file will contain the FastAPI application.
+import asyncio
+import gzip
 import os
 import json
+import mimetypes
 import re
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, FastAPI, HTTPException, Header, status, Response, Request, Cookie
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import Headers
 from fastapi.staticfiles import StaticFiles
+from functools import lru_cache
+from starlette.concurrency import run_in_threadpool
+from starlette.convertors import Convertor, register_url_convertor
 from pydantic import BaseModel
 from jose import JWTError, jwt
 from dotenv import load_dotenv
-from pywebpush import webpush, WebPushException
 from typing import Dict, Any, Optional
 
 # Import security manager
 from .security_manager import security_manager
+from . import data_archive, data_publisher, json_patch
+from .loop_monitor import RouteContextMiddleware, loop_monitor
+from .push_sender import PushSender
+from .subscription_store import SubscriptionStore
+from .timeseries_store import TimeSeriesStore
+from .token_cache import VerifiedTokenCache
 
 # Load environment variables from .env file
 load_dotenv()
 
 # --- FastAPI App Initialization ---
 app = FastAPI()
+# 遅いコールバックのログにルートを添えるため、各リクエストのルートをContextに記録する
+app.add_middleware(RouteContextMiddleware)
 
 # --- Project Directories ---
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 FRONTEND_DIR = os.path.join(PROJECT_ROOT, 'frontend')
+# python -m backend.build_frontend の出力（ハッシュ付きのapp.js/style.cssと圧縮済みファイル）
+FRONTEND_BUILD_DIR = os.getenv('FRONTEND_BUILD_DIR', os.path.join(PROJECT_ROOT, 'build', 'frontend'))
 
 # --- Initialize security keys on startup ---
 @app.on_event("startup")
 async def startup_event():
     """Initialize security keys on application startup"""
+    # LOOP_SLOW_CALLBACK_MS 以上イベントループを止めたコールバックをログに出す
+    loop_monitor.install()
     security_manager.data_dir = DATA_DIR
     security_manager.initialize()
 
@@ -41,16 +62,29 @@ async def startup_event():
     print(f"VAPID Subject: {security_manager.vapid_subject}")
     print("=" * 60 + "\n")
 
+    stale = stale_frontend_sources()
+    if stale:
+        print(f"Warning: {', '.join(stale)} changed after the last frontend build; "
+              f"run `python -m backend.build_frontend` to serve the new version")
+
 # --- Configuration ---
 AUTH_PIN = os.getenv("AUTH_PIN", "123456")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_DAYS", 30))
 NOTIFICATION_TOKEN_NAME = "notification_token"
 NOTIFICATION_TOKEN_EXPIRE_HOURS = 24  # 24時間（短期で問題ない）
+# /api/data のキャッシュがデータファイルの更新を確認する間隔（秒）
+DATA_CACHE_CHECK_SECONDS = float(os.getenv("DATA_CACHE_CHECK_SECONDS", 1.0))
+# /api/events で接続維持のコメント行を送る間隔（秒）。プロキシのアイドルタイムアウトより短くする
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", 15))
+# 切断後にEventSourceが再接続するまでの待ち時間（ミリ秒）
+EVENTS_RETRY_MS = 10000
 
 
-# In-memory storage for subscriptions
-push_subscriptions: Dict[str, Any] = {}
+# Push subscriptions, shared by all workers and the cron job (data/push_subscriptions.db)
+subscription_store = SubscriptionStore(DATA_DIR)
+# Daily per-ticker performance and market series written by the fetch job (data/timeseries.db)
+timeseries_store = TimeSeriesStore(DATA_DIR)
 
 # --- Pydantic Models ---
 class PinVerification(BaseModel):
@@ -70,6 +104,51 @@ def create_access_token(data: dict, expires_delta: timedelta):
     encoded_jwt = jwt.encode(to_encode, security_manager.jwt_secret, algorithm=ALGORITHM)
     return encoded_jwt
 
+def parse_accept_encoding(header):
+    """Parses an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+def negotiate_encoding(accept_encoding, available):
+    """Returns the best content-coding in available that the client accepts ("identity" when there is none)."""
+    accepted = parse_accept_encoding(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def stale_frontend_sources():
+    """Returns the frontend sources edited after the build in FRONTEND_BUILD_DIR (which keeps serving the old ones)."""
+    try:
+        built_at = os.stat(os.path.join(FRONTEND_BUILD_DIR, 'index.html')).st_mtime
+        with open(os.path.join(FRONTEND_BUILD_DIR, 'asset-manifest.json'), 'r', encoding='utf-8') as f:
+            sources = ['index.html'] + list(json.load(f))
+    except (OSError, ValueError):
+        return []
+    return [name for name in sources
+            if os.path.exists(os.path.join(FRONTEND_DIR, name))
+            and os.stat(os.path.join(FRONTEND_DIR, name)).st_mtime > built_at]
+
 def get_latest_data_file():
     """Finds the latest data_YYYY-MM-DD.json file in the DATA_DIR."""
     if not os.path.isdir(DATA_DIR):
@@ -82,7 +161,330 @@ def get_latest_data_file():
     latest_file = sorted(data_files, reverse=True)[0]
     return os.path.join(DATA_DIR, latest_file)
 
+# /api/data/{section} で個別に取得できる部分（データ文書のトップレベルキー）
+DATA_SECTIONS = {
+    "market": ["market"],
+    "news": ["news"],
+    "nasdaq_heatmap_1d": ["nasdaq_heatmap_1d"],
+    "nasdaq_heatmap_1w": ["nasdaq_heatmap_1w"],
+    "nasdaq_heatmap_1m": ["nasdaq_heatmap_1m"],
+    "sp500_combined_heatmap_1d": ["sp500_combined_heatmap_1d"],
+    "sp500_combined_heatmap_1w": ["sp500_combined_heatmap_1w"],
+    "sp500_combined_heatmap_1m": ["sp500_combined_heatmap_1m"],
+    "indicators": ["indicators"],
+    "column": ["column"],
+}
+# 小さなセクションは圧縮してもほとんど縮まないため、そのまま返す
+SECTION_COMPRESS_MIN_BYTES = 1024
+
+class CachedDocument:
+    """One published data document (or section): the identity body, its ETag and the precompressed variants."""
+
+    def __init__(self, body, etag, encoded, sections=None, version=None):
+        self.body = body
+        self.etag = etag
+        self.encoded = encoded
+        self.sections = sections or {}
+        self.version = version
+        self._deltas = {}
+        self._delta_lock = threading.Lock()
+
+    @classmethod
+    def for_body(cls, body):
+        """Wraps serialized JSON, compressing it once (small bodies are sent as is)."""
+        encoded = {}
+        if len(body) >= SECTION_COMPRESS_MIN_BYTES:
+            encoded = data_publisher.compress(body, gzip_level=6, brotli_quality=5)
+        return cls(body, data_publisher.compute_etag(body), encoded)
+
+    @classmethod
+    def for_payload(cls, payload):
+        """Serializes and compresses a section payload once, when the document is (re)loaded."""
+        return cls.for_body(data_publisher.serialize(payload))
+
+    def delta(self, since, versions_dir):
+        """
+        Returns the cached delta response from version `since` to this version,
+        or None when that version is unknown or the patch would not be smaller than the document.
+        """
+        # 存在しない版（負・未来・スナップショットが消えた版）はキャッシュしないため、
+        # キャッシュは保存されている版の数（DATA_VERSION_HISTORY）を超えない
+        if self.version is None or not 0 < since <= self.version:
+            return None
+        with self._delta_lock:
+            if since in self._deltas:
+                return self._deltas[since]
+            patch = []
+            if since < self.version:
+                base = data_publisher.load_snapshot(versions_dir, since)
+                if base is None:
+                    return None
+                patch = json_patch.make_patch(base, json.loads(self.body))
+            self._deltas[since] = self._build_delta(since, patch)
+            return self._deltas[since]
+
+    def _build_delta(self, since, patch):
+        patch_body = data_publisher.serialize(patch)
+        if len(patch_body) >= len(self.body):
+            return None
+        # meta は読み込み時にシリアライズ済みなので、そのまま埋め込む
+        body = (b'{"from":%d,"version":%d,"meta":' % (since, self.version)
+                + self.sections["meta"].body + b',"patch":' + patch_body + b'}')
+        return CachedDocument.for_body(body)
+
+    def negotiate(self, accept_encoding):
+        """Returns (content-coding, bytes) for the best encoding the client accepts."""
+        encoding = negotiate_encoding(accept_encoding, self.encoded)
+        return encoding, self.encoded.get(encoding, self.body)
+
+class DataDocumentCache:
+    """
+    Keeps the latest data document as ready-to-send bytes (identity and precompressed).
+    The data directory and file are re-checked with os.stat at most every check_interval seconds;
+    the document is only re-read when the latest file name, inode, size or mtime changes.
+    """
+
+    def __init__(self, check_interval=DATA_CACHE_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._path = None
+        self._file_key = None
+        self._document = None
+        self._checked_at = 0.0
+
+    def _load(self, path, file_key):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # FastAPIのJSONResponseと同じ形式で一度だけシリアライズしておく
+        body = data_publisher.serialize(data)
+        precompressed = data_publisher.read_precompressed(path, file_key)
+        if precompressed is not None:
+            etag, encoded = precompressed
+        else:
+            # 圧縮済みファイルが無い・古い場合は、読み込み時に一度だけ圧縮する
+            etag = data_publisher.compute_etag(body)
+            encoded = {"gzip": gzip.compress(body, compresslevel=6)}
+        return CachedDocument(body, etag, encoded, self._build_sections(data), version=data.get("version"))
+
+    def _build_sections(self, data):
+        sections = {
+            name: CachedDocument.for_payload({key: data[key] for key in keys if key in data})
+            for name, keys in DATA_SECTIONS.items()
+        }
+        # ヒートマップのAI解説は銘柄一覧と切り離して取得できるようにする
+        sections["heatmap_commentary"] = CachedDocument.for_payload({
+            key: {"ai_commentary": data[key]["ai_commentary"]}
+            for key in ("nasdaq_heatmap", "sp500_heatmap")
+            if isinstance(data.get(key), dict) and "ai_commentary" in data[key]
+        })
+        # meta は最初に読む小さな索引で、各セクションのETagで変更の有無が分かる
+        sections["meta"] = CachedDocument.for_payload({
+            "version": data.get("version"),
+            "date": data.get("date"),
+            "last_updated": data.get("last_updated"),
+            "ready": data.get("ready"),
+            "sections": {name: section.etag for name, section in sections.items()},
+        })
+        return sections
+
+    def get(self):
+        """Returns the latest CachedDocument, or None when no data file exists."""
+        now = time.monotonic()
+        if self._document is not None and now - self._checked_at < self.check_interval:
+            return self._document
+
+        with self._lock:
+            try:
+                dir_mtime = os.stat(DATA_DIR).st_mtime_ns
+            except FileNotFoundError:
+                return None
+            # ファイルの追加・置き換え（os.replace）はディレクトリのmtimeを更新する
+            path = self._path if dir_mtime == self._dir_mtime else get_latest_data_file()
+            if path is None:
+                self._dir_mtime, self._path, self._file_key, self._document = dir_mtime, None, None, None
+                return None
+            try:
+                file_key = data_publisher.file_signature(path)
+            except FileNotFoundError:
+                path = get_latest_data_file()
+                if path is None:
+                    return None
+                file_key = data_publisher.file_signature(path)
+
+            if path != self._path or file_key != self._file_key or self._document is None:
+                self._document = self._load(path, file_key)
+                self._path, self._file_key = path, file_key
+            self._dir_mtime = dir_mtime
+            self._checked_at = now
+            return self._document
+
+data_cache = DataDocumentCache()
+
+# --- Archive (dated data files) ---
+# 過去の日付の応答を保持する数（ファイルの版ごと、fields の組み合わせごと）
+ARCHIVE_CACHE_SIZE = 16
+
+class DateConvertor(Convertor):
+    """Matches YYYY-MM-DD path segments, so /api/data/{day:date} does not catch section names."""
+    regex = r"\d{4}-\d{2}-\d{2}"
+
+    def convert(self, value):
+        return value
+
+    def to_string(self, value):
+        return str(value)
+
+register_url_convertor("date", DateConvertor())
+
+class ArchiveIndexCache:
+    """Keeps data/archive_index.json in memory; the file is re-checked like DataDocumentCache does."""
+
+    def __init__(self, check_interval=DATA_CACHE_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._file_key = None
+        self._index = {"dates": {}, "series": {}}
+        self._checked_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            try:
+                file_key = data_publisher.file_signature(data_archive.index_path_for(DATA_DIR))
+            except FileNotFoundError:
+                file_key = None
+            if file_key != self._file_key:
+                self._index = data_archive.load_index(DATA_DIR)
+                self._file_key = file_key
+            self._checked_at = now
+            return self._index
+
+archive_index = ArchiveIndexCache()
+
+@lru_cache(maxsize=ARCHIVE_CACHE_SIZE)
+def _archived_document(day, file_key, fields):
+    """
+    Builds the response for one version (file_key) of data_<day>.json, or only its top-level `fields`.
+    Members are sliced out of the file with the byte offsets from the archive index and the whole document
+    comes from the precompressed siblings; the file is parsed only when neither is usable.
+    """
+    path = os.path.join(DATA_DIR, f"data_{day}.json")
+    signature = dict(zip(("ino", "size", "mtime_ns"), file_key))
+    if fields is None:
+        precompressed = data_publisher.read_precompressed(path, signature)
+        if precompressed is not None:
+            etag, encoded = precompressed
+            # ファイルと同じコンパクトな表現を、ETagと同じ版であることが確認できた gzip 版から作る
+            return CachedDocument(gzip.decompress(encoded["gzip"]), etag, encoded)
+    else:
+        entry = archive_index.get()["dates"].get(day) or {}
+        offsets = entry.get("offsets") if entry.get("source") == signature else None
+        if offsets is not None:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                # stat の後に置き換えられていないことを確認してから切り出す
+                if (st.st_ino, st.st_size, st.st_mtime_ns) == file_key:
+                    members = []
+                    for key in fields:
+                        if key in offsets:
+                            start, length = offsets[key]
+                            f.seek(start)
+                            members.append(json.dumps(key, ensure_ascii=False).encode('utf-8') + b':' + f.read(length))
+                    return CachedDocument.for_body(b'{' + b','.join(members) + b'}')
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if fields is not None:
+        data = {key: data[key] for key in fields if key in data}
+    return CachedDocument.for_payload(data)
+
+# --- Live update events ---
+class DataEventBroadcaster:
+    """
+    Watches the published data with one shared task and fans a "data-update" event out to every /api/events
+    connection. Connections keep no queue of their own: they wait on a shared asyncio.Event and then send
+    the latest (already encoded) event, so an idle connection costs one suspended generator.
+    """
+
+    def __init__(self, check_interval=DATA_CACHE_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self.connections = 0
+        self.latest = None  # (event id, encoded SSE message)
+        self._document = None
+        self._changed = None
+        self._task = None
+
+    def _encode(self, document, previous):
+        meta = json.loads(document.sections["meta"].body)
+        event_id = str(document.version if document.version is not None else document.etag.strip('"'))
+        payload = {
+            "version": document.version,
+            "date": meta.get("date"),
+            "last_updated": meta.get("last_updated"),
+            "ready": meta.get("ready"),
+            # 前の版とETagが異なるセクション（接続後の最初のイベントでは全セクション）
+            "sections": [
+                name for name, section in document.sections.items()
+                if name != "meta" and (previous is None or name not in previous.sections
+                                       or previous.sections[name].etag != section.etag)
+            ],
+        }
+        message = f"id: {event_id}\nevent: data-update\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        return event_id, message.encode('utf-8')
+
+    def _publish(self, document):
+        self.latest = self._encode(document, self._document)
+        self._document = document
+        # 待機中の全接続を一度に起こし、次の更新用に新しいEventを用意する
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _watch(self):
+        while True:
+            if self.connections:
+                try:
+                    # data_cache の確認（更新時は読み込み）はブロッキングなのでスレッドで行う
+                    document = await run_in_threadpool(data_cache.get)
+                    if document is not None and (self._document is None or document.etag != self._document.etag):
+                        self._publish(document)
+                except Exception as e:
+                    print(f"Error while watching data updates: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def _ensure_watching(self):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+    async def stream(self, last_event_id=None):
+        """Yields SSE messages for one connection: the current version first (unless the client already has it), then every update."""
+        self.connections += 1
+        self._ensure_watching()
+        try:
+            yield b"retry: %d\n\n" % EVENTS_RETRY_MS
+            sent = last_event_id
+            while True:
+                if self.latest is not None and self.latest[0] != sent:
+                    sent, message = self.latest
+                    yield message
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.connections -= 1
+
+data_events = DataEventBroadcaster()
+
 # --- Authentication Dependencies ---
+# 検証済みのJWT（ダッシュボードのポーリングやSSEの再接続では同じトークンが繰り返し届く）
+verified_tokens = VerifiedTokenCache()
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """メインAPI用の認証（Authorizationヘッダー）"""
     if not authorization or not authorization.startswith("Bearer "):
@@ -93,7 +495,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
 
     token = authorization[7:]
     try:
-        payload = jwt.decode(token, security_manager.jwt_secret, algorithms=[ALGORITHM])
+        payload = verified_tokens.decode(token, security_manager.jwt_secret, [ALGORITHM])
         if payload.get("type") != "main":
             raise HTTPException(status_code=401, detail="Invalid token type")
         username = payload.get("sub")
@@ -125,7 +527,7 @@ async def get_current_user_for_notification(
         )
 
     try:
-        payload = jwt.decode(token, security_manager.jwt_secret, algorithms=[ALGORITHM])
+        payload = verified_tokens.decode(token, security_manager.jwt_secret, [ALGORITHM])
         username = payload.get("sub")
         if not username:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -133,6 +535,26 @@ async def get_current_user_for_notification(
     except JWTError:
         raise HTTPException(status_code=401, detail="Token validation failed")
 
+def set_notification_cookie(response: Response, request: Request):
+    """通知用トークン（24時間）を発行し、クッキーに設定する"""
+    expires_short = timedelta(hours=NOTIFICATION_TOKEN_EXPIRE_HOURS)
+    notification_token = create_access_token(
+        data={"sub": "user", "type": "notification"},
+        expires_delta=expires_short
+    )
+
+    # 通知用クッキーを設定（httpOnly=Falseで設定）
+    is_https = request.headers.get("X-Forwarded-Proto") == "https"
+    response.set_cookie(
+        key=NOTIFICATION_TOKEN_NAME,
+        value=notification_token,
+        httponly=False,  # Service Workerからアクセス可能
+        max_age=int(expires_short.total_seconds()),
+        samesite="none" if is_https else "lax",
+        path="/",
+        secure=is_https
+    )
+
 # --- API Endpoints ---
 
 @app.post("/api/auth/verify")
@@ -148,24 +570,8 @@ def verify_pin(pin_data: PinVerification, response: Response, request: Request):
             expires_delta=expires_long
         )
 
-        # 通知用（24時間、自動更新される）
-        expires_short = timedelta(hours=NOTIFICATION_TOKEN_EXPIRE_HOURS)
-        notification_token = create_access_token(
-            data={"sub": "user", "type": "notification"},
-            expires_delta=expires_short
-        )
-
-        # 通知用クッキーを設定（httpOnly=Falseで設定）
-        is_https = request.headers.get("X-Forwarded-Proto") == "https"
-        response.set_cookie(
-            key=NOTIFICATION_TOKEN_NAME,
-            value=notification_token,
-            httponly=False,  # Service Workerからアクセス可能
-            max_age=int(expires_short.total_seconds()),
-            samesite="none" if is_https else "lax",
-            path="/",
-            secure=is_https
-        )
+        # 通知用（24時間、/api/auth/notification-cookie で更新される）
+        set_notification_cookie(response, request)
 
         # LocalStorage用のメイントークンを返す
         return {
@@ -180,23 +586,231 @@ def verify_pin(pin_data: PinVerification, response: Response, request: Request):
             detail="Incorrect authentication code"
         )
 
+@app.post("/api/auth/notification-cookie")
+def renew_notification_cookie(
+    response: Response,
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    メイントークン（30日間）で通知用クッキー（24時間）を再発行する。
+    クッキーの期限切れで /api/events が401になったEventSourceは、これで更新してから再接続する
+    """
+    set_notification_cookie(response, request)
+    return {"success": True, "expires_in": NOTIFICATION_TOKEN_EXPIRE_HOURS * 3600}
+
 @app.get("/api/health")
 def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+def document_response(request: Request, document: CachedDocument):
+    """Sends the best precompressed variant of a cached document, or 304 when the client's copy is current."""
+    encoding, body = document.negotiate(request.headers.get("accept-encoding"))
+    etag = data_publisher.encoded_etag(document.etag, encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def payload_response(request: Request, payload):
+    """
+    Sends a payload built for this request only (history and time-series queries). Nothing is reused, so unlike
+    CachedDocument only the encoding the client negotiated is compressed, and only when the copy is not current.
+    """
+    body = data_publisher.serialize(payload)
+    available = data_publisher.available_encodings() if len(body) >= SECTION_COMPRESS_MIN_BYTES else []
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), available)
+    etag = data_publisher.encoded_etag(data_publisher.compute_etag(body), encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        body = data_publisher.encode(body, encoding, gzip_level=6, brotli_quality=5)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/data")
-def get_market_data(current_user: str = Depends(get_current_user)):
+def get_market_data(
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
     """Endpoint to get the latest market data."""
     try:
-        data_file = get_latest_data_file()
-        if data_file is None or not os.path.exists(data_file):
-            raise HTTPException(status_code=404, detail="Data file not found.")
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        document = data_cache.get()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if document is None:
+        raise HTTPException(status_code=404, detail="Data file not found.")
+    return document_response(request, document)
+
+@app.get("/api/data/delta")
+def get_market_data_delta(
+    since: int,
+    request: Request,
+    fallback: str = "document",
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Returns a JSON Patch (RFC 6902) from the client's data version to the latest one:
+    {"from", "version", "meta", "patch"}. When `since` is no longer available, the full document is returned
+    instead (or only {"from", "version", "meta", "full": true} with fallback=none).
+    """
+    try:
+        document = data_cache.get()
+        delta = document.delta(since, os.path.join(DATA_DIR, data_publisher.VERSIONS_DIR_NAME)) if document else None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if document is None:
+        raise HTTPException(status_code=404, detail="Data file not found.")
+    if delta is not None:
+        return document_response(request, delta)
+    if fallback == "none":
+        return Response(
+            content=b'{"from":%d,"version":%d,"meta":' % (since, document.version or 0)
+                    + document.sections["meta"].body + b',"full":true}',
+            media_type="application/json",
+            headers={"Cache-Control": "private, no-cache"},
+        )
+    return document_response(request, document)
+
+@app.get("/api/data/{day:date}")
+def get_archived_market_data(
+    day: str,
+    request: Request,
+    fields: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Endpoint to get the data published for a date (data_YYYY-MM-DD.json, kept for DATA_RETENTION_DAYS).
+    `fields` (comma-separated top-level keys, e.g. market,news) limits the response to those members.
+    """
+    path = os.path.join(DATA_DIR, f"data_{day}.json")
+    try:
+        file_key = tuple(data_publisher.file_signature(path).values())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No data archived for {day}.")
+    selected = None
+    if fields is not None:
+        selected = tuple(dict.fromkeys(key.strip() for key in fields.split(",") if key.strip()))
+    try:
+        document = _archived_document(day, file_key, selected)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return document_response(request, document)
+
+@app.get("/api/history/{metric}")
+def get_metric_history(
+    metric: str,
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Endpoint to get the daily series of a metric (fear_greed, vix, t_note) from the archive index, without
+    opening the dated files: {"metric", "series": [[date, value], ...]}, optionally limited to start..end.
+    """
+    if metric not in data_archive.ARCHIVE_METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric: {metric}")
+    try:
+        series = archive_index.get().get("series", {}).get(metric, [])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    points = [point for point in series
+              if (start is None or point[0] >= start) and (end is None or point[0] <= end)]
+    return payload_response(request, {"metric": metric, "series": points})
+
+@app.get("/api/timeseries/tickers/{ticker}")
+def get_ticker_timeseries(
+    ticker: str,
+    request: Request,
+    period: str = "1d",
+    days: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Daily performance of one ticker over 1d/1w/1m from the time-series store (kept for every fetched day):
+    {"ticker", "period", "series": [[date, performance], ...]}. `days` limits it to the last N calendar days.
+    """
+    if days is not None and start is None:
+        start = (datetime.now(timezone(timedelta(hours=9))) - timedelta(days=days)).strftime('%Y-%m-%d')
+    try:
+        series = timeseries_store.ticker_history(ticker.upper(), period, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not series:
+        raise HTTPException(status_code=404, detail=f"No data recorded for {ticker}")
+    return payload_response(request, {"ticker": ticker.upper(), "period": period, "series": series})
+
+@app.get("/api/timeseries/heatmap/{day:date}/{universe}")
+def get_heatmap_timeseries(
+    day: str,
+    universe: str,
+    request: Request,
+    period: str = "1d",
+    current_user: str = Depends(get_current_user)
+):
+    """A past day's heatmap (sp500, nasdaq, sector_etf) rebuilt from the time-series store, shaped like the data document."""
+    try:
+        heatmap = timeseries_store.heatmap(day, universe, period)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not next(iter(heatmap.values())):
+        raise HTTPException(status_code=404, detail=f"No {universe} heatmap recorded for {day}")
+    return payload_response(request, heatmap)
+
+@app.get("/api/timeseries/candles/{symbol}")
+def get_candle_timeseries(
+    symbol: str,
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Intraday candles of vix or t_note accumulated across days: {"symbol", "candles": [{time, open, high, low, close}]}."""
+    try:
+        candles = timeseries_store.candles(symbol, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return payload_response(request, {"symbol": symbol, "candles": candles})
+
+@app.get("/api/data/{section}")
+def get_market_data_section(
+    section: str,
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """Endpoint to get one section of the latest market data (see DATA_SECTIONS, plus heatmap_commentary and meta)."""
+    try:
+        document = data_cache.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if document is None:
+        raise HTTPException(status_code=404, detail="Data file not found.")
+    if section not in document.sections:
+        raise HTTPException(status_code=404, detail=f"Unknown data section: {section}")
+    return document_response(request, document.sections[section])
+
+@app.get("/api/events")
+async def data_update_events(
+    request: Request,
+    current_user: str = Depends(get_current_user_for_notification)
+):
+    """
+    Server-Sent Events stream of "data-update" events ({"version", "date", "last_updated", "ready", "sections"})
+    sent whenever a new data file is published. EventSource cannot set headers, so the notification cookie is used.
+    """
+    return StreamingResponse(
+        data_events.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx がイベントを溜め込まずにすぐ転送するようにする
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/vapid-public-key")
 def get_vapid_public_key():
@@ -204,25 +818,14 @@ def get_vapid_public_key():
     return {"public_key": security_manager.vapid_public_key}
 
 @app.post("/api/subscribe")
-async def subscribe_push(
+def subscribe_push(
     subscription: PushSubscription,
     current_user: str = Depends(get_current_user_for_notification)  # ← 変更
 ):
     """Push通知のサブスクリプション登録（クッキーベース認証）"""
-    subscription_id = str(hash(subscription.endpoint))
-    push_subscriptions[subscription_id] = subscription.dict()
-
-    subscriptions_file = os.path.join(DATA_DIR, 'push_subscriptions.json')
     try:
-        existing = {}
-        if os.path.exists(subscriptions_file):
-            with open(subscriptions_file, 'r') as f:
-                existing = json.load(f)
-
-        existing[subscription_id] = subscription.dict()
-
-        with open(subscriptions_file, 'w') as f:
-            json.dump(existing, f)
+        # 同じendpointの再登録は鍵の更新として扱う
+        subscription_id = subscription_store.upsert(subscription.dict())
     except Exception as e:
         print(f"Error saving subscription: {e}")
         raise HTTPException(status_code=500, detail="Failed to save subscription")
@@ -230,54 +833,98 @@ async def subscribe_push(
     return {"status": "subscribed", "id": subscription_id}
 
 @app.post("/api/send-notification")
-async def send_notification(
+def send_notification(
     current_user: str = Depends(get_current_user_for_notification)
 ):
     """Manually send push notification to all subscribers (for testing)."""
-    # Load subscriptions from file
-    subscriptions_file = os.path.join(DATA_DIR, 'push_subscriptions.json')
-    if not os.path.exists(subscriptions_file):
+    saved_subscriptions = subscription_store.all()
+    if not saved_subscriptions:
         return {"sent": 0, "failed": 0, "message": "No subscriptions found"}
 
-    with open(subscriptions_file, 'r') as f:
-        saved_subscriptions = json.load(f)
-
     notification_data = {
         "title": "HanaView テスト通知",
         "body": "手動送信のテスト通知です",
         "type": "test"
     }
 
-    sent_count = 0
-    failed_count = 0
-
-    for sub_id, subscription in list(saved_subscriptions.items()):
-        try:
-            webpush(
-                subscription_info=subscription,
-                data=json.dumps(notification_data),
-                vapid_private_key=security_manager.vapid_private_key,
-                vapid_claims={
-                    "sub": security_manager.vapid_subject,
-                }
-            )
-            sent_count += 1
-        except WebPushException as ex:
-            print(f"Push failed for {sub_id}: {ex}")
-            # Remove invalid subscription
-            if ex.response and ex.response.status_code == 410:
-                del saved_subscriptions[sub_id]
-            failed_count += 1
-
-    # Save updated subscriptions
-    with open(subscriptions_file, 'w') as f:
-        json.dump(saved_subscriptions, f)
+    sender = PushSender(security_manager.vapid_private_key, security_manager.vapid_subject)
+    try:
+        # 並列に送信し、404/410 のサブスクリプションはまとめて削除する
+        report = sender.send(saved_subscriptions, notification_data)
+    finally:
+        sender.close()
+    for result in report["results"]:
+        if result["error"]:
+            print(f"Push failed for {result['id']}: {result['error']}")
+    removed = subscription_store.remove(report["expired"])
 
     return {
-        "sent": sent_count,
-        "failed": failed_count
+        "sent": report["sent"],
+        "failed": report["failed"],
+        "removed": removed,
+        "elapsed_ms": report["elapsed_ms"],
+        "latency_ms": report["latency_ms"],
     }
 
+# --- Static Files ---
+# Files named <name>.<content hash>.<ext> never change, so browsers may keep them forever
+HASHED_ASSET_PATTERN = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that looks in the frontend build first, sends a precompressed sibling (<file>.br / <file>.gz)
+    when the client accepts it, marks content-hashed files as immutable and makes everything else revalidate.
+    """
+
+    def __init__(self, *args, build_directory=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if build_directory and os.path.isdir(build_directory):
+            # ビルドに無いファイル（アイコン、sw.js、生成されたゲージ画像）は frontend/ から配信する
+            self.all_directories = [build_directory] + list(self.all_directories)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        variants = self._precompressed_variants(full_path, stat_result)
+        response = self._precompressed_response(full_path, variants, scope, status_code)
+        if response is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        if HASHED_ASSET_PATTERN.search(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            # 固定名のファイル（index.html や従来のゲージ画像）は毎回ETagで確認させる
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def _precompressed_variants(self, full_path, stat_result):
+        """Returns {content-coding: stat} of the siblings that are at least as new as the file itself."""
+        variants = {}
+        for encoding, suffix in data_publisher.ENCODING_SUFFIXES.items():
+            try:
+                encoded_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if encoded_stat.st_mtime >= stat_result.st_mtime:
+                variants[encoding] = encoded_stat
+        return variants
+
+    def _precompressed_response(self, full_path, variants, scope, status_code):
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding"))
+        for encoding, encoded_stat in variants.items():
+            if accepted.get(encoding, accepted.get("*", 0)) <= 0:
+                continue
+            # ETag/Last-Modified は圧縮ファイルのものになるため、表現ごとに別のETagになる
+            response = super().file_response(full_path + data_publisher.ENCODING_SUFFIXES[encoding],
+                                             encoded_stat, scope, status_code)
+            media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            response.headers["Content-Encoding"] = encoding
+            return response
+        return None
+
 # Mount the frontend directory to serve static files
 # This must come AFTER all API routes
-app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True), name="static")
\ No newline at end of file
+app.mount("/", CachedStaticFiles(directory=FRONTEND_DIR, html=True, build_directory=FRONTEND_BUILD_DIR), name="static")
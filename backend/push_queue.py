@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from .push_sender import EXPIRED_STATUSES
+from .subscription_store import BUSY_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PUSH_QUEUE_DB_NAME = 'push_queue.db'
+# 失敗した配信を何回まで試すか（超えたら dead_letters に移す）
+PUSH_MAX_ATTEMPTS = int(os.getenv('PUSH_MAX_ATTEMPTS', '5'))
+# 再試行までの待ち時間: PUSH_RETRY_BASE_SECONDS * 2^(試行回数-1)、上限 PUSH_RETRY_MAX_SECONDS
+PUSH_RETRY_BASE_SECONDS = float(os.getenv('PUSH_RETRY_BASE_SECONDS', '30'))
+PUSH_RETRY_MAX_SECONDS = 60 * 60
+# 1回に取り出す配信の数。途中でプロセスが落ちた場合、再送されうるのはこの件数まで
+PUSH_QUEUE_BATCH = 100
+# 取り出した配信を他のワーカーに渡さない時間。これを過ぎても完了しなければ落ちたと見なし、再び取り出せる
+PUSH_LEASE_SECONDS = 5 * 60
+# 送信済みの記録を残す日数
+PUSH_QUEUE_RETENTION_DAYS = 7
+
+# 再試行しても結果が変わらない失敗（リクエスト不正・VAPID不一致・大きすぎる通知）
+PERMANENT_FAILURE_STATUSES = (400, 401, 403, 413)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    notification_id INTEGER NOT NULL REFERENCES notifications(id),
+    endpoint TEXT NOT NULL,
+    subscription TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_status INTEGER,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (notification_id, endpoint)
+);
+CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    delivery_id INTEGER PRIMARY KEY,
+    notification_id INTEGER NOT NULL,
+    endpoint TEXT NOT NULL,
+    subscription TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_status INTEGER,
+    last_error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+def retry_delay(attempts, retry_after=None):
+    """Exponential backoff with jitter; a Retry-After from the push service wins when it is longer."""
+    delay = min(PUSH_RETRY_MAX_SECONDS, PUSH_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    delay *= random.uniform(0.8, 1.2)
+    return max(delay, retry_after or 0)
+
+
+class PushQueue:
+    """
+    Notification deliveries persisted in SQLite (data/push_queue.db), one row per subscription.
+    A row is leased while it is being sent and marked sent afterwards, so delivery is at-least-once:
+    a worker that dies mid-batch only causes that batch to be sent again once the lease expires.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, PUSH_QUEUE_DB_NAME)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def enqueue(self, notification, subscriptions, dedupe_key=None):
+        """
+        Queues notification for every subscription ({id: subscription}) in one transaction.
+        A notification whose dedupe_key was queued before is not queued again. Returns (notification id, queued count).
+        """
+        def work(conn):
+            now = time.time()
+            if dedupe_key is not None:
+                row = conn.execute("SELECT id FROM notifications WHERE dedupe_key = ?", (dedupe_key,)).fetchone()
+                if row:
+                    return row[0], 0
+            notification_id = conn.execute(
+                "INSERT INTO notifications (dedupe_key, payload, created_at) VALUES (?, ?, ?)",
+                (dedupe_key, json.dumps(notification, ensure_ascii=False), now)).lastrowid
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (notification_id, endpoint, subscription, next_attempt_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(notification_id, s["endpoint"], json.dumps(s), now, now) for s in subscriptions.values()])
+            return notification_id, conn.total_changes - before
+        return self._transaction(work)
+
+    def claim(self, limit=PUSH_QUEUE_BATCH, lease_seconds=PUSH_LEASE_SECONDS):
+        """
+        Leases up to limit due deliveries. Returns [{"id", "notification", "subscription", "attempts"}].
+        """
+        def work(conn):
+            now = time.time()
+            rows = conn.execute(
+                "SELECT d.id, n.payload, d.subscription, d.attempts FROM deliveries d "
+                "JOIN notifications n ON n.id = d.notification_id "
+                "WHERE d.status = 'pending' AND d.next_attempt_at <= ? ORDER BY d.next_attempt_at LIMIT ?",
+                (now, limit)).fetchall()
+            conn.executemany("UPDATE deliveries SET next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                             [(now + lease_seconds, now, row[0]) for row in rows])
+            return rows
+        return [{"id": delivery_id, "notification": json.loads(payload),
+                 "subscription": json.loads(subscription), "attempts": attempts}
+                for delivery_id, payload, subscription, attempts in self._transaction(work)]
+
+    def complete(self, results):
+        """
+        Records the PushSender results of claimed deliveries (result["id"] is the delivery id) in one
+        transaction. Returns {"sent", "retry", "dead", "expired": [endpoints]}.
+        """
+        summary = {"sent": 0, "retry": 0, "dead": 0, "expired": []}
+
+        def work(conn):
+            now = time.time()
+            for result in results:
+                if result["error"] is None:
+                    conn.execute("UPDATE deliveries SET status = 'sent', attempts = attempts + 1, last_status = ?, "
+                                 "last_error = NULL, updated_at = ? WHERE id = ?", (result["status"], now, result["id"]))
+                    summary["sent"] += 1
+                    continue
+                attempts = conn.execute("UPDATE deliveries SET attempts = attempts + 1, last_status = ?, last_error = ?, "
+                                        "updated_at = ? WHERE id = ? RETURNING attempts",
+                                        (result["status"], result["error"], now, result["id"])).fetchone()[0]
+                if result["status"] in EXPIRED_STATUSES:
+                    conn.execute("UPDATE deliveries SET status = 'expired' WHERE id = ?", (result["id"],))
+                    summary["expired"].append(result["endpoint"])
+                elif result["status"] in PERMANENT_FAILURE_STATUSES or attempts >= PUSH_MAX_ATTEMPTS:
+                    conn.execute("UPDATE deliveries SET status = 'dead' WHERE id = ?", (result["id"],))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters (delivery_id, notification_id, endpoint, subscription, "
+                        "attempts, last_status, last_error, failed_at) SELECT id, notification_id, endpoint, "
+                        "subscription, attempts, last_status, last_error, ? FROM deliveries WHERE id = ?",
+                        (now, result["id"]))
+                    summary["dead"] += 1
+                else:
+                    conn.execute("UPDATE deliveries SET next_attempt_at = ? WHERE id = ?",
+                                 (now + retry_delay(attempts, result.get("retry_after")), result["id"]))
+                    summary["retry"] += 1
+        self._transaction(work)
+        return summary
+
+    def next_due_at(self):
+        """When the earliest pending delivery becomes due (None when nothing is pending)."""
+        row = self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM deliveries WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    def stats(self):
+        counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM deliveries GROUP BY status"))
+        return {status: counts.get(status, 0) for status in ("pending", "sent", "expired", "dead")}
+
+    def purge(self, retention_days=PUSH_QUEUE_RETENTION_DAYS):
+        """Deletes finished notifications older than retention_days (dead letters are kept). Returns how many."""
+        cutoff = time.time() - retention_days * 86400
+
+        def work(conn):
+            finished = [row[0] for row in conn.execute(
+                "SELECT n.id FROM notifications n WHERE n.created_at < ? AND NOT EXISTS "
+                "(SELECT 1 FROM deliveries d WHERE d.notification_id = n.id AND d.status = 'pending')", (cutoff,))]
+            conn.executemany("DELETE FROM deliveries WHERE notification_id = ?", [(i,) for i in finished])
+            # dedupe_key を残すため notifications の行は payload だけ空にする
+            conn.executemany("UPDATE notifications SET payload = '{}' WHERE id = ?", [(i,) for i in finished])
+            return len(finished)
+        return self._transaction(work)
+
+
+def drain(queue, sender, store=None, max_wait=0):
+    """
+    Sends every due delivery of queue with sender (a PushSender), batch by batch, and removes the
+    subscriptions that have expired from store. Deliveries waiting for a retry are left for a later run,
+    unless they become due within max_wait seconds. Returns the totals.
+    """
+    totals = {"sent": 0, "retry": 0, "dead": 0, "removed": 0}
+    deadline = time.time() + max_wait
+    while True:
+        batch = queue.claim()
+        if not batch:
+            due_at = queue.next_due_at()
+            if due_at is None or due_at > deadline:
+                break
+            time.sleep(max(0.0, due_at - time.time()))
+            continue
+        # 同じ通知ごとにまとめて送る（通知本文の直列化と署名は通知ごとに1回）
+        by_notification = {}
+        for delivery in batch:
+            key = json.dumps(delivery["notification"], sort_keys=True)
+            by_notification.setdefault(key, (delivery["notification"], {}))[1][delivery["id"]] = delivery["subscription"]
+        results = []
+        for notification, subscriptions in by_notification.values():
+            results += sender.send(subscriptions, notification)["results"]
+        summary = queue.complete(results)
+        for result in results:
+            if result["error"]:
+                logger.warning(f"Push delivery {result['id']} failed ({result['status']}): {result['error']}")
+        if store is not None and summary["expired"]:
+            totals["removed"] += store.remove(summary["expired"])
+        for name in ("sent", "retry", "dead"):
+            totals[name] += summary[name]
+    queue.purge()
+    return totals
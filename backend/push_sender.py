@@ -0,0 +1,119 @@
+import logging
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from pywebpush import WebPusher, WebPushException
+
+from .push_signing import get_signer, serialize_payload
+
+logger = logging.getLogger(__name__)
+
+# 同時に送信する最大数（プッシュサービスごとの接続数の上限も兼ねる）
+PUSH_MAX_WORKERS = int(os.getenv('PUSH_MAX_WORKERS', '16'))
+PUSH_TIMEOUT_SECONDS = float(os.getenv('PUSH_TIMEOUT_SECONDS', '10'))
+# このステータスが返ったサブスクリプションは二度と届かないため削除する
+EXPIRED_STATUSES = (404, 410)
+
+
+def push_origin(endpoint):
+    """The push service of an endpoint, e.g. https://fcm.googleapis.com."""
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+class PushSender:
+    """
+    Delivers one notification to many subscriptions from a bounded thread pool.
+    Each push-service origin (FCM, Mozilla, Apple) gets its own requests.Session whose connection pool
+    is as large as the pool, so TLS connections are reused instead of being opened per subscription.
+    """
+
+    def __init__(self, vapid_private_key, vapid_subject, max_workers=PUSH_MAX_WORKERS,
+                 timeout=PUSH_TIMEOUT_SECONDS):
+        # 鍵の解析とJWTの署名はプッシュサービスごとに1回だけ（get_signer はプロセス内で共有）
+        self.signer = get_signer(vapid_private_key, vapid_subject)
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, origin):
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount(origin, adapter)
+                self._sessions[origin] = session
+            return session
+
+    def _send_one(self, sub_id, subscription, data):
+        endpoint = subscription.get("endpoint", "")
+        origin = push_origin(endpoint)
+        result = {"id": sub_id, "endpoint": endpoint, "origin": origin, "status": None, "error": None}
+        started = time.perf_counter()
+        try:
+            # 受信者ごとの処理はECDHによる暗号化だけ（署名済みヘッダーと直列化済みのデータを使い回す）
+            pusher = WebPusher(subscription, requests_session=self._session(origin))
+            response = pusher.send(data, dict(self.signer.headers(origin)), timeout=self.timeout)
+            if response.status_code > 202:
+                raise WebPushException(f"Push failed: {response.status_code} {response.reason}", response=response)
+            result["status"] = response.status_code
+        except WebPushException as ex:
+            result["status"] = ex.response.status_code if ex.response is not None else None
+            result["error"] = str(ex).splitlines()[0]
+            # 429/503 でプッシュサービスが指定した再送までの秒数
+            retry_after = ex.response.headers.get("Retry-After", "") if ex.response is not None else ""
+            if retry_after.isdigit():
+                result["retry_after"] = int(retry_after)
+        except Exception as e:
+            result["error"] = str(e)
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def send(self, subscriptions, notification):
+        """
+        Sends notification (a dict) to every {id: subscription} concurrently.
+        Returns a report with per-endpoint status/latency and the endpoints that have expired.
+        """
+        data = serialize_payload(notification)
+        started = time.perf_counter()
+        workers = min(self.max_workers, max(1, len(subscriptions)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="push") as executor:
+            results = list(executor.map(lambda item: self._send_one(item[0], item[1], data),
+                                        subscriptions.items()))
+        return build_report(results, time.perf_counter() - started)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def build_report(results, elapsed):
+    sent = [r for r in results if r["error"] is None]
+    latencies = sorted(r["latency_ms"] for r in results)
+    by_origin = {}
+    for r in results:
+        counts = by_origin.setdefault(r["origin"], {"sent": 0, "failed": 0})
+        counts["sent" if r["error"] is None else "failed"] += 1
+    return {
+        "sent": len(sent),
+        "failed": len(results) - len(sent),
+        "expired": [r["endpoint"] for r in results if r["status"] in EXPIRED_STATUSES],
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "latency_ms": {
+            "p50": statistics.median(latencies) if latencies else None,
+            "p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "max": latencies[-1] if latencies else None,
+        },
+        "by_origin": by_origin,
+        "results": results,
+    }
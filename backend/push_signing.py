@@ -0,0 +1,48 @@
+import json
+import threading
+import time
+from functools import lru_cache
+
+from pywebpush import Vapid
+
+# webpush() と同じ12時間。プッシュサービスは24時間を超える有効期限を受け付けない
+VAPID_TOKEN_LIFETIME_SECONDS = 12 * 60 * 60
+# 有効期限がこれより近いトークンは送信中に切れないよう作り直す
+VAPID_TOKEN_REFRESH_SECONDS = 10 * 60
+
+
+class VapidSigner:
+    """
+    VAPID headers for a push batch. The private key is parsed once and one JWT is signed per
+    push-service audience, then reused for every subscription of that audience until it nears expiry.
+    """
+
+    def __init__(self, private_key, subject, lifetime=VAPID_TOKEN_LIFETIME_SECONDS):
+        self.vapid = Vapid.from_string(private_key=private_key)
+        self.subject = subject
+        self.lifetime = lifetime
+        self._tokens = {}  # audience -> (exp, headers)
+        self._lock = threading.Lock()
+
+    def headers(self, audience):
+        """Returns the Authorization header for audience ("https://fcm.googleapis.com")."""
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(audience)
+            if cached is None or cached[0] - now < VAPID_TOKEN_REFRESH_SECONDS:
+                exp = int(now) + self.lifetime
+                cached = (exp, self.vapid.sign({"sub": self.subject, "aud": audience, "exp": exp}))
+                self._tokens[audience] = cached
+            return cached[1]
+
+
+@lru_cache(maxsize=4)
+def get_signer(private_key, subject):
+    """The process-wide signer of a VAPID key (the API server and the cron job each load it once)."""
+    return VapidSigner(private_key, subject)
+
+
+def serialize_payload(notification):
+    """Serializes the notification shared by a batch once; only the encryption is left per subscriber."""
+    # ensure_ascii=False: 日本語をUTF-8のまま送り、\uXXXX の6バイトにしない
+    return json.dumps(notification, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
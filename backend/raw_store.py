@@ -0,0 +1,145 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import MutableMapping
+
+from .data_publisher import RawJSON, serialize
+
+try:
+    import zstandard
+except ImportError:  # zstandardが無い環境ではzlibで圧縮する
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# data_raw.bin: MAGIC | 圧縮したトップレベルのメンバー... | 索引(JSON) | 索引の位置と長さ | MAGIC
+MAGIC = b'HVRAW01\n'
+TRAILER = struct.Struct('<QQ')
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+
+def default_codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(codec, payload):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return zlib.compress(payload, ZLIB_LEVEL)
+
+
+def _decompress(codec, payload, size):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("the raw data is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload, max_output_size=size)
+    return zlib.decompress(payload, bufsize=max(size, 1))
+
+
+def _loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+def write_raw_document(data, path, codec=None):
+    """
+    Writes data as a sectioned container: every top-level member is serialized (compact JSON, NaN as null)
+    and compressed on its own, followed by an index of their offsets. Replaces path atomically.
+    """
+    codec = codec or default_codec()
+    members = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        position = len(MAGIC)
+        for key, value in data.items():
+            payload = value if isinstance(value, RawJSON) else serialize(value)
+            compressed = _compress(codec, payload)
+            f.write(compressed)
+            members.append([key, position, len(compressed), len(payload)])
+            position += len(compressed)
+        index = json.dumps({"codec": codec, "members": members}, ensure_ascii=False).encode('utf-8')
+        f.write(index)
+        f.write(TRAILER.pack(position, len(index)))
+        f.write(MAGIC)
+    os.replace(tmp_path, path)
+    return position + len(index) + TRAILER.size + len(MAGIC)
+
+
+class LazyDocument(MutableMapping):
+    """
+    A raw document read from a write_raw_document container. The file is memory-mapped and each top-level
+    member is decompressed and parsed only when it is first accessed; assigned members are kept as given.
+    publishable() hands members that were never accessed to write_document as their serialized bytes.
+    close() (or leaving a with block) releases the mapping; members that were already read stay available.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        footer = len(self._mmap) - TRAILER.size - len(MAGIC)
+        if footer < len(MAGIC) or self._mmap[:len(MAGIC)] != MAGIC or self._mmap[-len(MAGIC):] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a raw data container")
+        index_offset, index_length = TRAILER.unpack_from(self._mmap, footer)
+        index = json.loads(self._mmap[index_offset:index_offset + index_length])
+        self._codec = index["codec"]
+        self._entries = {key: (offset, length, size) for key, offset, length, size in index["members"]}
+        self._keys = list(self._entries)
+        self._values = {}
+
+    def encoded(self, key):
+        """Compact JSON bytes of a member as stored in the file (KeyError when the file has no such member)."""
+        offset, length, size = self._entries[key]
+        if self._mmap.closed:
+            raise ValueError(f"the raw data container is closed; {key!r} was never read")
+        # mmap.close() は参照中の memoryview が残っていると失敗するため、展開後すぐに解放する
+        with memoryview(self._mmap) as view:
+            return _decompress(self._codec, view[offset:offset + length], size)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self._entries:
+                raise KeyError(key)
+            self._values[key] = _loads(self.encoded(key))
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._values and key not in self._entries:
+            self._keys.append(key)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._values and key not in self._entries:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._entries.pop(key, None)
+        self._keys.remove(key)
+
+    def __contains__(self, key):
+        # Mapping の既定の実装は __getitem__ を呼ぶため、読み込まずに判定する
+        return key in self._values or key in self._entries
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def publishable(self):
+        """{key: value} with the accessed members as objects and the others as RawJSON, in file order."""
+        return {key: self._values[key] if key in self._values else RawJSON(self.encoded(key)) for key in self._keys}
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SUBSCRIPTIONS_DB_NAME = 'push_subscriptions.db'
+# 以前の形式（{id: subscription} のJSON）。初回接続時に取り込み、.migrated に改名する
+LEGACY_SUBSCRIPTIONS_FILE = 'push_subscriptions.json'
+# 他のプロセスが書き込み中のときに待つ秒数
+BUSY_TIMEOUT_SECONDS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    endpoint TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    subscription TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def subscription_id(endpoint):
+    """Stable id of a subscription (the same in every process, unlike hash())."""
+    return hashlib.sha256(endpoint.encode('utf-8')).hexdigest()[:16]
+
+
+class SubscriptionStore:
+    """
+    Push subscriptions keyed by endpoint in SQLite (WAL mode), shared by every uvicorn worker and the cron job.
+    Each write is a single upsert or delete, so concurrent writers never lose each other's updates.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, SUBSCRIPTIONS_DB_NAME)
+        self.legacy_path = os.path.join(data_dir, LEGACY_SUBSCRIPTIONS_FILE)
+        # sqlite3 の接続はスレッド間で共有しない（FastAPIのスレッドプールから呼ばれる）
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # isolation_level=None: 暗黙のトランザクションを使わず、必要な所だけ BEGIN IMMEDIATE で囲む
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            self._import_legacy(conn)
+            self._local.conn = conn
+        return conn
+
+    def _import_legacy(self, conn):
+        if not os.path.exists(self.legacy_path):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 他のプロセスが先に取り込んだ場合はファイルが既に無い
+            if os.path.exists(self.legacy_path):
+                with open(self.legacy_path, 'r') as f:
+                    legacy = json.load(f)
+                now = time.time()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO subscriptions (endpoint, id, subscription, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(s["endpoint"], subscription_id(s["endpoint"]), json.dumps(s), now, now)
+                     for s in legacy.values() if isinstance(s, dict) and s.get("endpoint")])
+                os.replace(self.legacy_path, self.legacy_path + '.migrated')
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def upsert(self, subscription):
+        """Adds a subscription or replaces the keys of an existing endpoint. Returns its id."""
+        conn = self._connection()
+        endpoint = subscription["endpoint"]
+        sub_id = subscription_id(endpoint)
+        now = time.time()
+        conn.execute(
+            "INSERT INTO subscriptions (endpoint, id, subscription, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(endpoint) DO UPDATE SET subscription = excluded.subscription, updated_at = excluded.updated_at",
+            (endpoint, sub_id, json.dumps(subscription), now, now))
+        return sub_id
+
+    def all(self):
+        """Returns {id: subscription} of every stored subscription."""
+        rows = self._connection().execute("SELECT id, subscription FROM subscriptions ORDER BY created_at")
+        return {sub_id: json.loads(subscription) for sub_id, subscription in rows}
+
+    def remove(self, endpoints):
+        """Deletes the subscriptions of the given endpoints in one transaction. Returns how many were deleted."""
+        endpoints = list(endpoints)
+        if not endpoints:
+            return 0
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM subscriptions WHERE endpoint = ?", [(e,) for e in endpoints])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
@@ -0,0 +1,216 @@
+# データAPI（/api/data・セクション・差分・履歴・時系列）の内容、文書キャッシュ、圧縮とETag/304を確認する
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import data_archive, data_publisher, json_patch, main
+from backend.timeseries_store import TimeSeriesStore
+
+DOCUMENT = {
+    "date": "2025-09-01",
+    "last_updated": "2025-09-01T06:30:00+09:00",
+    "ready": {"market": True},
+    "market": {"vix": {"current": 15.1, "history": [{"time": "2025-09-01", "close": 15.1}] * 100}},
+    "news": {"summary": "市況", "topics": []},
+    "indicators": {"economic": []},
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DATA_DIR", str(tmp_path))
+    # 毎回ファイルを確認し、公開直後の読み直しを待たずに検証する
+    monkeypatch.setattr(main, "data_cache", main.DataDocumentCache(check_interval=0))
+    return tmp_path
+
+
+@pytest.fixture
+def client(data_dir):
+    main.app.dependency_overrides[main.get_current_user] = lambda: "user"
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def publish(data_dir, data, day="2025-09-01"):
+    return data_publisher.write_document(data, [str(data_dir / f"data_{day}.json"), str(data_dir / "data.json")])
+
+
+def test_missing_data_is_404(client):
+    assert client.get("/api/data").status_code == 404
+
+
+def test_serves_the_published_document(client, data_dir):
+    published = publish(data_dir, DOCUMENT)
+    response = client.get("/api/data")
+    assert response.status_code == 200
+    assert response.json() == dict(DOCUMENT, version=published["version"])
+
+
+def test_document_is_loaded_once_per_publication(client, data_dir, monkeypatch):
+    publish(data_dir, DOCUMENT)
+    loads = []
+    load = main.data_cache._load
+    monkeypatch.setattr(main.data_cache, "_load", lambda *args: loads.append(args) or load(*args))
+
+    client.get("/api/data")
+    client.get("/api/data/market")
+    assert len(loads) == 1
+
+    publish(data_dir, dict(DOCUMENT, date="2025-09-02"), day="2025-09-02")
+    assert client.get("/api/data").json()["date"] == "2025-09-02"
+    assert len(loads) == 2
+
+
+def test_sections_and_meta(client, data_dir):
+    publish(data_dir, DOCUMENT)
+    assert client.get("/api/data/market").json() == {"market": DOCUMENT["market"]}
+    meta = client.get("/api/data/meta").json()
+    assert meta["date"] == DOCUMENT["date"]
+    assert meta["sections"]["market"] == main.data_cache.get().sections["market"].etag
+    assert client.get("/api/data/unknown").status_code == 404
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, {}),
+    ("gzip, br", {"gzip": 1.0, "br": 1.0}),
+    ("BR;q=0.5, gzip;q=0, *;q=0.1", {"br": 0.5, "gzip": 0.0, "*": 0.1}),
+    ("gzip;q=bad", {"gzip": 0.0}),
+])
+def test_parse_accept_encoding(header, expected):
+    assert main.parse_accept_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"abc-br"', False),
+])
+def test_etag_matches(header, matches):
+    assert main.etag_matches(header, '"abc"') is matches
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("identity", "identity"),
+    (None, "identity"),
+])
+def test_negotiate_prefers_brotli(accept, expected):
+    document = main.CachedDocument(b"{}", '"e"', {"br": b"br-body", "gzip": b"gzip-body"})
+    encoding, body = document.negotiate(accept)
+    assert encoding == expected
+    assert body == {"br": b"br-body", "gzip": b"gzip-body", "identity": b"{}"}[expected]
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip", "identity"])
+def test_each_encoding_has_its_own_etag_and_revalidates(client, data_dir, encoding):
+    published = publish(data_dir, DOCUMENT)
+    headers = {"Accept-Encoding": encoding}
+    response = client.get("/api/data", headers=headers)
+    # 公開時に作成した圧縮済みファイルとETagをそのまま使う
+    assert response.headers["ETag"] == data_publisher.encoded_etag(published["etag"], encoding)
+    assert response.headers.get("Content-Encoding", "identity") == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.json()["version"] == published["version"]
+
+    revalidated = client.get("/api/data", headers=dict(headers, **{"If-None-Match": response.headers["ETag"]}))
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+
+def test_changed_document_is_sent_again(client, data_dir):
+    publish(data_dir, DOCUMENT)
+    etag = client.get("/api/data", headers={"Accept-Encoding": "br"}).headers["ETag"]
+    publish(data_dir, dict(DOCUMENT, last_updated="2025-09-01T07:00:00+09:00"))
+    response = client.get("/api/data", headers={"Accept-Encoding": "br", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_small_sections_are_not_compressed(client, data_dir):
+    publish(data_dir, DOCUMENT)
+    response = client.get("/api/data/indicators", headers={"Accept-Encoding": "br, gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.json() == {"indicators": DOCUMENT["indicators"]}
+
+
+def test_delta_patches_the_previous_version(client, data_dir):
+    first = publish(data_dir, DOCUMENT)
+    base = client.get("/api/data").json()
+    updated = dict(DOCUMENT, market={"vix": {"current": 16.0, "history": DOCUMENT["market"]["vix"]["history"][1:]}})
+    second = publish(data_dir, updated)
+
+    delta = client.get(f"/api/data/delta?since={first['version']}").json()
+    assert (delta["from"], delta["version"]) == (first["version"], second["version"])
+    assert delta["meta"]["version"] == second["version"]
+    assert json_patch.apply_patch(base, delta["patch"]) == client.get("/api/data").json()
+
+
+@pytest.mark.parametrize("since", [-1, 0, 99])
+def test_unknown_versions_fall_back_and_are_not_cached(client, data_dir, since):
+    publish(data_dir, DOCUMENT)
+    published = publish(data_dir, dict(DOCUMENT, date="2025-09-02"))
+    response = client.get(f"/api/data/delta?since={since}&fallback=none").json()
+    assert response["full"] is True and response["version"] == published["version"]
+    assert client.get(f"/api/data/delta?since={since}").json()["date"] == "2025-09-02"
+    assert main.data_cache.get()._deltas == {}
+
+
+@pytest.fixture
+def archive(client, data_dir, monkeypatch):
+    """80 archived days with a VIX value each."""
+    monkeypatch.setattr(main, "archive_index", main.ArchiveIndexCache(check_interval=0))
+    days = [(date(2025, 6, 1) + timedelta(days=i)).isoformat() for i in range(80)]
+    for i, day in enumerate(days):
+        data = dict(DOCUMENT, date=day, market={"vix": {"current": 15 + i / 100}})
+        path = str(data_dir / f"data_{day}.json")
+        data_publisher.write_document(data, [path])
+        data_archive.record_snapshot(path, data)
+    return days
+
+
+def test_history_compresses_only_the_negotiated_encoding(client, archive, monkeypatch):
+    encoded = []
+    encode = data_publisher.encode
+    monkeypatch.setattr(data_publisher, "encode", lambda body, encoding, *args, **kwargs:
+                        encoded.append(encoding) or encode(body, encoding, *args, **kwargs))
+    response = client.get("/api/history/vix", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["series"] == [[day, 15 + i / 100] for i, day in enumerate(archive)]
+    assert encoded == ["gzip"]
+
+    # クライアントの版が最新なら圧縮もしない
+    revalidated = client.get("/api/history/vix", headers={"Accept-Encoding": "gzip",
+                                                          "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304 and encoded == ["gzip"]
+
+    small = client.get(f"/api/history/vix?start={archive[-1]}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers and small.json()["series"] == [[archive[-1], 15.79]]
+    assert encoded == ["gzip"]
+
+
+def test_candles_compress_only_the_negotiated_encoding(client, data_dir, monkeypatch):
+    store = TimeSeriesStore(str(data_dir))
+    monkeypatch.setattr(main, "timeseries_store", store)
+    history = [{"time": f"2025-09-01T{hour:02d}:{minute:02d}:00", "open": 15.0, "high": 15.2, "low": 14.9, "close": 15.1}
+               for hour in range(9, 16) for minute in range(0, 60, 5)]
+    store.record("2025-09-01", {"market": {"vix": {"current": 15.1, "history": history}}})
+    encoded = []
+    encode = data_publisher.encode
+    monkeypatch.setattr(data_publisher, "encode", lambda body, encoding, *args, **kwargs:
+                        encoded.append(encoding) or encode(body, encoding, *args, **kwargs))
+
+    response = client.get("/api/timeseries/candles/vix", headers={"Accept-Encoding": "br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert len(response.json()["candles"]) == len(history)
+    revalidated = client.get("/api/timeseries/candles/vix", headers={"Accept-Encoding": "br",
+                                                                    "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert encoded == ["br"]
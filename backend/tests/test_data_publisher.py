@@ -0,0 +1,159 @@
+import gzip
+import json
+import math
+import os
+
+import pytest
+
+from backend import data_publisher
+from backend.data_publisher import RawJSON, read_precompressed, serialize, write_document
+
+DOCUMENT = {
+    "date": "2025-09-01",
+    "market": {"vix": {"current": 15.1, "history": [1.5, 15.1]}},
+    "news": {"summary": "米国株は続伸"},
+    "column": {},
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson" and data_publisher.orjson is None:
+        pytest.skip("orjson is not installed")
+    if request.param == "json":
+        monkeypatch.setattr(data_publisher, "orjson", None)
+    return request.param
+
+
+def test_serialize_is_compact_and_replaces_non_finite_floats(encoder):
+    data = {"vix": {"current": 15.1, "change": math.nan, "history": [1.5, math.inf, -math.inf]}, "news": "米国株"}
+    assert serialize(data) == '{"vix":{"current":15.1,"change":null,"history":[1.5,null,null]},"news":"米国株"}'.encode('utf-8')
+
+
+def test_serialize_matches_the_standard_json_output(encoder):
+    numpy = pytest.importorskip("numpy")
+    data = {"price": numpy.float64(1.25), "volume": 2 ** 70, 1: [True, None, 0.1], "empty": {}}
+    # 64ビットを超える整数は標準のjsonで書き、キーの数値は文字列にする
+    assert serialize(data) == b'{"price":1.25,"volume":1180591620717411303424,"1":[true,null,0.1],"empty":{}}'
+
+
+def test_serialize_with_offsets_slices_every_member(encoder):
+    body, offsets = data_publisher.serialize_with_offsets(DOCUMENT)
+    assert body == serialize(DOCUMENT)
+    for key, (start, length) in offsets.items():
+        assert body[start:start + length] == serialize(DOCUMENT[key])
+
+
+def test_raw_json_members_are_written_as_is(encoder, tmp_path):
+    data = {"a": RawJSON(b'{"x":[1,2]}'), "b": math.nan}
+    body, offsets = data_publisher.serialize_with_offsets(data)
+    assert body == b'{"a":{"x":[1,2]},"b":null}'
+    with open(tmp_path / "out.json", 'wb') as f:
+        data_publisher.write_json(data, f)
+    assert (tmp_path / "out.json").read_bytes() == body
+
+
+def publish_paths(tmp_path):
+    return [str(tmp_path / "data_2025-09-01.json"), str(tmp_path / "data.json")]
+
+
+def test_publishes_the_same_bytes_under_every_path(tmp_path):
+    paths = publish_paths(tmp_path)
+    published = write_document(DOCUMENT, paths)
+    body = serialize(dict(DOCUMENT, version=published["version"]))
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert f.read() == body
+        with open(path + ".gz", 'rb') as f:
+            assert gzip.decompress(f.read()) == body
+        with open(path + data_publisher.META_SUFFIX, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        assert meta["etag"] == published["etag"] == data_publisher.compute_etag(body)
+        assert meta["size"] == len(body)
+        assert meta["source"] == data_publisher.file_signature(path)
+        start, length = meta["offsets"]["news"]
+        assert body[start:start + length] == serialize(DOCUMENT["news"])
+    # 書きかけの一時ファイルは残らない
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_other_paths_are_hardlinks(tmp_path):
+    paths = publish_paths(tmp_path)
+    write_document(DOCUMENT, paths)
+    suffixes = ["", ".gz", data_publisher.META_SUFFIX] + ([".br"] if data_publisher.brotli is not None else [])
+    for suffix in suffixes:
+        assert os.path.samefile(paths[0] + suffix, paths[1] + suffix)
+
+
+def test_copies_when_hardlinks_are_unsupported(tmp_path, monkeypatch):
+    def no_link(source, destination):
+        raise OSError("links are not supported")
+    monkeypatch.setattr(data_publisher.os, "link", no_link)
+    paths = publish_paths(tmp_path)
+    published = write_document(DOCUMENT, paths)
+    assert not os.path.samefile(paths[0], paths[1])
+    for path in paths:
+        # コピーにもそのファイル自身のシグネチャのメタ情報が付く
+        assert read_precompressed(path, data_publisher.file_signature(path))[0] == published["etag"]
+
+
+def test_versions_increase_and_snapshots_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_publisher, "VERSION_HISTORY_LIMIT", 2)
+    paths = publish_paths(tmp_path)
+    versions = [write_document(dict(DOCUMENT, date=f"2025-09-0{i}"), paths)["version"] for i in range(1, 4)]
+    assert versions == [1, 2, 3]
+    versions_dir = data_publisher.versions_dir_for(paths[0])
+    assert data_publisher.load_snapshot(versions_dir, 3)["date"] == "2025-09-03"
+    assert data_publisher.load_snapshot(versions_dir, 1) is None
+
+    # スナップショットが消えても、公開済みファイルのメタ情報から版番号を続ける
+    for name in os.listdir(versions_dir):
+        os.remove(os.path.join(versions_dir, name))
+    assert write_document(DOCUMENT, paths)["version"] == 4
+
+
+def test_read_precompressed_rejects_another_version_of_the_file(tmp_path):
+    path = publish_paths(tmp_path)[0]
+    published = write_document(DOCUMENT, [path])
+    signature = data_publisher.file_signature(path)
+    etag, variants = read_precompressed(path, signature)
+    assert etag == published["etag"] and "gzip" in variants
+    assert read_precompressed(path, dict(signature, size=signature["size"] + 1)) is None
+
+
+def test_failed_publication_keeps_the_previous_file(tmp_path, monkeypatch):
+    paths = publish_paths(tmp_path)
+    write_document(DOCUMENT, paths)
+    with open(paths[0], 'rb') as f:
+        before = f.read()
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(data_publisher, "_publish_siblings", fail)
+    with pytest.raises(OSError):
+        write_document(dict(DOCUMENT, date="2025-09-02"), paths)
+    with open(paths[0], 'rb') as f:
+        assert f.read() == before
+    assert read_precompressed(paths[0], data_publisher.file_signature(paths[0])) is not None
+
+
+def test_stale_brotli_sibling_is_removed(tmp_path, monkeypatch):
+    if data_publisher.brotli is None:
+        pytest.skip("brotli is not installed")
+    paths = publish_paths(tmp_path)
+    write_document(DOCUMENT, paths)
+    monkeypatch.setattr(data_publisher, "brotli", None)
+    write_document(DOCUMENT, paths)
+    assert not any(os.path.exists(path + ".br") for path in paths)
+
+
+def test_draft_uses_the_cheap_compression_levels(tmp_path, monkeypatch):
+    levels = []
+    compress = data_publisher.compress
+    monkeypatch.setattr(data_publisher, "compress", lambda body, *args: levels.append(args) or compress(body, *args))
+    paths = publish_paths(tmp_path)
+    write_document(DOCUMENT, paths, draft=True)
+    write_document(DOCUMENT, paths)
+    assert levels == [(data_publisher.DRAFT_GZIP_LEVEL, data_publisher.DRAFT_BROTLI_QUALITY), ()]
+
@@ -0,0 +1,48 @@
+# Pillow / SVG のゲージが matplotlib 版と同じ大きさで、見た目の差がしきい値以内であることを確認する。
+# SVGは cairosvg でラスタライズできる場合のみ比較する
+import random
+
+import pytest
+
+from backend import gauge_matplotlib, image_generator
+from backend.benchmarks.gauge_backend_compare import load_rgb, visual_diff
+from backend.benchmarks.gauge_render_benchmark import sample_chart_data
+
+# matplotlib 版との差の上限（チャンネルごとの平均絶対差、0-255）
+MAX_MEAN_DIFF = 8.0
+
+
+def check_datasets(seed=0, count=5):
+    """Random gauges plus the extremes of the scale, where the needle and labels move the most."""
+    rng = random.Random(seed)
+    datasets = [sample_chart_data(rng) for _ in range(count)]
+    for value in (0, 50, 100):
+        datasets.append(dict(sample_chart_data(rng), center_value=value))
+    return datasets
+
+
+DATASETS = check_datasets()
+
+
+@pytest.fixture
+def render(tmp_path, monkeypatch):
+    # 背景キャッシュを一時ディレクトリに置き、data/ を汚さない
+    monkeypatch.setattr(gauge_matplotlib, 'template_renderer',
+                        gauge_matplotlib.GaugeTemplateRenderer(cache_dir=str(tmp_path / "cache")))
+
+    def render(backend, data):
+        monkeypatch.setenv('GAUGE_RENDERER', backend)
+        output_dir = tmp_path / backend
+        output_dir.mkdir(exist_ok=True)
+        return image_generator.generate_fear_greed_chart(data, str(output_dir))
+    return render
+
+
+@pytest.mark.parametrize("backend", ["pillow", "svg"])
+@pytest.mark.parametrize("data", DATASETS, ids=lambda data: f"value{data['center_value']}")
+def test_gauge_matches_matplotlib(render, backend, data):
+    if backend == "svg":
+        pytest.importorskip("cairosvg")
+    diff = visual_diff(load_rgb(render("matplotlib", data)), load_rgb(render(backend, data)))
+    assert "size_mismatch" not in diff
+    assert diff["mean_abs_diff"] <= MAX_MEAN_DIFF
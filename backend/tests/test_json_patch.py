@@ -0,0 +1,93 @@
+import copy
+
+import pytest
+
+from backend.json_patch import apply_patch, make_patch
+
+CANDLES = [{"time": f"09:{minute:02d}", "close": 15 + minute / 100} for minute in range(10)]
+
+ROUND_TRIPS = {
+    "unchanged": ({"a": [1, 2]}, {"a": [1, 2]}),
+    "nested value": ({"market": {"vix": {"current": 15.1}}}, {"market": {"vix": {"current": 15.4}}}),
+    "added and removed keys": ({"a": 1, "b": 2}, {"b": 2, "c": 3}),
+    "escaped keys": ({"a/b": 1, "m~n": 2}, {"a/b": 3, "m~n": 4}),
+    "bool is not int": ({"flag": 1, "items": [1.0]}, {"flag": True, "items": [1]}),
+    "same length list": ([1, 2, 3], [1, 5, 3]),
+    "different length list": ([1, 2, 3], [3, 2]),
+    "sliding window": (CANDLES, CANDLES[2:] + [{"time": "09:10", "close": 15.1}]),
+    "appended only": (CANDLES, CANDLES + [{"time": "09:10", "close": 15.1}]),
+    "dropped only": (CANDLES, CANDLES[3:]),
+    "window from empty": ([], CANDLES[:2]),
+    "window with a changed item": (CANDLES, CANDLES[2:5] + [{"time": "09:04", "close": 0}] + CANDLES[6:]),
+    "type change": ({"a": [1]}, {"a": {"0": 1}}),
+}
+
+
+def canonical(value):
+    # 1 と True、1 と 1.0 を区別して比較する
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return (type(value).__name__, value)
+
+
+@pytest.mark.parametrize("src, dst", ROUND_TRIPS.values(), ids=ROUND_TRIPS.keys())
+def test_round_trip(src, dst):
+    original = copy.deepcopy(src)
+    result = apply_patch(src, make_patch(src, dst))
+    assert canonical(result) == canonical(dst)
+    assert src == original  # 既定では元の文書を書き換えない
+
+
+def test_unchanged_document_has_an_empty_patch():
+    assert make_patch({"a": [1, {"b": None}]}, {"a": [1, {"b": None}]}) == []
+
+
+def test_deep_change_is_a_single_replace():
+    src = {"heatmap": {"stocks": [{"ticker": f"T{i}", "performance": i} for i in range(500)]}}
+    dst = copy.deepcopy(src)
+    dst["heatmap"]["stocks"][250]["performance"] = -1
+    assert make_patch(src, dst) == [{"op": "replace", "path": "/heatmap/stocks/250/performance", "value": -1}]
+
+
+def test_sliding_window_is_encoded_as_removes_and_appends():
+    dst = CANDLES[2:] + [{"time": "09:10", "close": 15.1}]
+    assert make_patch({"candles": CANDLES}, {"candles": dst}) == [
+        {"op": "remove", "path": "/candles/0"},
+        {"op": "remove", "path": "/candles/0"},
+        {"op": "add", "path": "/candles/-", "value": {"time": "09:10", "close": 15.1}},
+    ]
+
+
+def test_window_compares_items_strictly():
+    # 1 と 1.0 は等しいが同じ値ではないため、ずらしただけの窓として扱わない
+    patch = make_patch([1, 2, 3], [2.0, 3, 4])
+    assert canonical(apply_patch([1, 2, 3], patch)) == canonical([2.0, 3, 4])
+
+
+def test_apply_in_place():
+    doc = {"a": [1]}
+    result = apply_patch(doc, [{"op": "add", "path": "/a/-", "value": 2}], in_place=True)
+    assert result is doc and doc == {"a": [1, 2]}
+
+
+def test_root_replace():
+    assert apply_patch({"a": 1}, [{"op": "replace", "path": "", "value": [1]}]) == [1]
+
+
+def test_test_operation():
+    assert apply_patch({"a": 1}, [{"op": "test", "path": "/a", "value": 1}]) == {"a": 1}
+    with pytest.raises(ValueError):
+        apply_patch({"a": 1}, [{"op": "test", "path": "/a", "value": True}])
+
+
+@pytest.mark.parametrize("operation, error", [
+    ({"op": "replace", "path": "/missing", "value": 1}, KeyError),
+    ({"op": "move", "path": "/a", "from": "/b"}, ValueError),
+    ({"op": "add", "path": "a", "value": 1}, ValueError),
+    ({"op": "remove", "path": ""}, ValueError),
+])
+def test_invalid_operations(operation, error):
+    with pytest.raises(error):
+        apply_patch({"a": 1}, [operation])
@@ -0,0 +1,189 @@
+import sqlite3
+
+import pytest
+
+from backend import push_queue
+from backend.push_queue import PushQueue, drain
+from backend.subscription_store import SubscriptionStore, subscription_id
+
+NOTIFICATION = {"title": "HanaView", "body": "updated", "type": "data-update"}
+
+
+class Clock:
+    """Stands in for the time module of push_queue, so leases and backoff can be stepped through."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeSender:
+    """PushSender.send with a fixed status per endpoint (a list is consumed one status per attempt)."""
+
+    def __init__(self, statuses, retry_after=None):
+        self.statuses = statuses
+        self.retry_after = retry_after
+        self.sent = []
+
+    def send(self, subscriptions, notification):
+        results = []
+        for delivery_id, subscription in subscriptions.items():
+            endpoint = subscription["endpoint"]
+            status = self.statuses.get(endpoint, 201)
+            if isinstance(status, list):
+                status = status.pop(0) if len(status) > 1 else status[0]
+            self.sent.append(endpoint)
+            result = {"id": delivery_id, "endpoint": endpoint, "status": status,
+                      "error": None if status < 300 else f"Push failed: {status}"}
+            if self.retry_after is not None and status >= 300:
+                result["retry_after"] = self.retry_after
+            results.append(result)
+        return {"results": results}
+
+
+def subscription(name):
+    return {"endpoint": f"https://push.example/{name}", "keys": {"p256dh": "key", "auth": "auth"}}
+
+
+def subscriptions(*names):
+    return {subscription_id(subscription(name)["endpoint"]): subscription(name) for name in names}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(push_queue, "time", clock)
+    monkeypatch.setattr(push_queue.random, "uniform", lambda low, high: 1.0)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return PushQueue(str(tmp_path))
+
+
+def results_for(batch, status, error="Push failed"):
+    return [{"id": d["id"], "endpoint": d["subscription"]["endpoint"], "status": status,
+             "error": None if status < 300 else error} for d in batch]
+
+
+def test_enqueue_is_deduplicated(queue):
+    notification_id, queued = queue.enqueue(NOTIFICATION, subscriptions("a", "b"), dedupe_key="data-update:2025-09-01")
+    assert queued == 2
+    assert queue.enqueue(NOTIFICATION, subscriptions("a", "b", "c"), dedupe_key="data-update:2025-09-01") == (notification_id, 0)
+    assert queue.stats()["pending"] == 2
+
+
+def test_claimed_deliveries_are_leased(queue, clock):
+    queue.enqueue(NOTIFICATION, subscriptions("a", "b"))
+    batch = queue.claim(lease_seconds=60)
+    assert [d["subscription"]["endpoint"] for d in batch] == ["https://push.example/a", "https://push.example/b"]
+    assert batch[0]["notification"] == NOTIFICATION and batch[0]["attempts"] == 0
+    assert queue.claim(lease_seconds=60) == []
+
+    # 完了を記録しないまま落ちたワーカーの分は、リースが切れると再び取り出せる
+    clock.now += 61
+    assert len(queue.claim(lease_seconds=60)) == 2
+
+
+def test_claim_respects_the_limit(queue):
+    queue.enqueue(NOTIFICATION, subscriptions("a", "b", "c"))
+    assert len(queue.claim(limit=2)) == 2
+    assert len(queue.claim(limit=2)) == 1
+
+
+def test_success_is_recorded(queue):
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    summary = queue.complete(results_for(queue.claim(), 201))
+    assert summary == {"sent": 1, "retry": 0, "dead": 0, "expired": []}
+    assert queue.stats() == {"pending": 0, "sent": 1, "expired": 0, "dead": 0}
+    assert queue.next_due_at() is None
+
+
+def test_transient_failure_is_retried_with_backoff(queue, clock, monkeypatch):
+    monkeypatch.setattr(push_queue, "PUSH_RETRY_BASE_SECONDS", 30)
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    for attempt, delay in [(1, 30), (2, 60), (3, 120)]:
+        assert queue.complete(results_for(queue.claim(), 500))["retry"] == 1
+        assert queue.next_due_at() == clock.now + delay
+        assert queue.claim() == []
+        clock.now += delay
+    assert queue.claim()[0]["attempts"] == 3
+
+
+def test_retry_after_wins_when_longer(queue, clock):
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    batch = queue.claim()
+    queue.complete([dict(result, retry_after=3600) for result in results_for(batch, 429)])
+    assert queue.next_due_at() == clock.now + 3600
+
+
+def test_exhausted_retries_become_dead_letters(queue, clock, monkeypatch):
+    monkeypatch.setattr(push_queue, "PUSH_MAX_ATTEMPTS", 3)
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    summaries = []
+    for _ in range(3):
+        summaries.append(queue.complete(results_for(queue.claim(), 503, error="Service Unavailable")))
+        clock.now += push_queue.PUSH_RETRY_MAX_SECONDS
+    assert [s["retry"] for s in summaries] == [1, 1, 0] and summaries[-1]["dead"] == 1
+    assert queue.stats()["dead"] == 1 and queue.claim() == []
+
+    with sqlite3.connect(queue.path) as conn:
+        row = conn.execute("SELECT endpoint, attempts, last_status, last_error FROM dead_letters").fetchone()
+    assert row == ("https://push.example/a", 3, 503, "Service Unavailable")
+
+
+@pytest.mark.parametrize("status", push_queue.PERMANENT_FAILURE_STATUSES)
+def test_permanent_failure_is_not_retried(queue, status):
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    assert queue.complete(results_for(queue.claim(), status))["dead"] == 1
+    assert queue.next_due_at() is None
+
+
+@pytest.mark.parametrize("status", push_queue.EXPIRED_STATUSES)
+def test_expired_subscription_is_reported(queue, status):
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    summary = queue.complete(results_for(queue.claim(), status))
+    assert summary["expired"] == ["https://push.example/a"] and summary["dead"] == 0
+    assert queue.stats()["expired"] == 1
+
+
+def test_drain_sends_retries_and_removes_expired(queue, clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(push_queue, "PUSH_RETRY_BASE_SECONDS", 1)
+    store = SubscriptionStore(str(tmp_path))
+    for name in ("ok", "flaky", "gone", "bad"):
+        store.upsert(subscription(name))
+    queue.enqueue(NOTIFICATION, store.all())
+    sender = FakeSender({"https://push.example/flaky": [500, 201], "https://push.example/gone": 410,
+                         "https://push.example/bad": 403})
+
+    # 再試行が max_wait 以内に来るため、同じ実行で送り直す
+    totals = drain(queue, sender, store, max_wait=10)
+    assert totals == {"sent": 2, "retry": 1, "dead": 1, "removed": 1}
+    assert sender.sent.count("https://push.example/flaky") == 2
+    assert sorted(s["endpoint"] for s in store.all().values()) == [
+        "https://push.example/bad", "https://push.example/flaky", "https://push.example/ok"]
+    assert queue.stats() == {"pending": 0, "sent": 2, "expired": 1, "dead": 1}
+
+
+def test_drain_leaves_late_retries_for_a_later_run(queue, clock):
+    queue.enqueue(NOTIFICATION, subscriptions("a"))
+    sender = FakeSender({"https://push.example/a": [503, 201]}, retry_after=600)
+    assert drain(queue, sender)["retry"] == 1
+    assert queue.stats()["pending"] == 1
+    clock.now += 600
+    assert drain(queue, sender)["sent"] == 1
+
+
+def test_purge_keeps_the_dedupe_key(queue, clock):
+    queue.enqueue(NOTIFICATION, subscriptions("a"), dedupe_key="data-update:2025-09-01")
+    queue.complete(results_for(queue.claim(), 201))
+    clock.now += (push_queue.PUSH_QUEUE_RETENTION_DAYS + 1) * 86400
+    assert queue.purge() == 1
+    assert queue.stats()["sent"] == 0
+    assert queue.enqueue(NOTIFICATION, subscriptions("a"), dedupe_key="data-update:2025-09-01")[1] == 0
@@ -0,0 +1,129 @@
+import json
+import math
+
+import pytest
+
+from backend import raw_store
+from backend.data_publisher import RawJSON, serialize, write_document
+from backend.raw_store import LazyDocument, write_raw_document
+
+DOCUMENT = {
+    "market": {"vix": {"current": 15.1, "change": math.nan}},
+    "news_raw": [{"title": "米国株は続伸"}],
+    "sp500_heatmap_1d": {"stocks": [{"ticker": f"T{i}", "performance": i / 10} for i in range(200)]},
+    "indicators": {"economic": []},
+}
+
+
+@pytest.fixture(params=["zlib", "zstd"])
+def raw_path(request, tmp_path):
+    if request.param == "zstd" and raw_store.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    path = str(tmp_path / "data_raw.bin")
+    write_raw_document(DOCUMENT, path, codec=request.param)
+    return path
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """Keys of the members that have been decompressed."""
+    keys = []
+    encoded = LazyDocument.encoded
+    monkeypatch.setattr(LazyDocument, "encoded", lambda self, key: keys.append(key) or encoded(self, key))
+    return keys
+
+
+def test_members_round_trip(raw_path):
+    with LazyDocument(raw_path) as document:
+        assert list(document) == list(DOCUMENT)
+        assert len(document) == len(DOCUMENT)
+        # NaN は書き込み時に null になる
+        assert dict(document) == json.loads(serialize(DOCUMENT))
+
+
+def test_members_are_decoded_on_first_access_only(raw_path, decoded):
+    with LazyDocument(raw_path) as document:
+        assert "sp500_heatmap_1d" in document and "missing" not in document
+        assert decoded == []
+        assert document["market"]["vix"]["current"] == 15.1
+        document["market"]["vix"]["current"] = 16.0
+        assert document.get("market")["vix"]["current"] == 16.0
+        assert decoded == ["market"]
+        with pytest.raises(KeyError):
+            document["missing"]
+
+
+def test_assignment_and_deletion_keep_the_file_order(raw_path):
+    with LazyDocument(raw_path) as document:
+        document["news"] = {"summary": "ok"}
+        document["market"] = {"replaced": True}
+        del document["indicators"]
+        assert list(document) == ["market", "news_raw", "sp500_heatmap_1d", "news"]
+        assert document["market"] == {"replaced": True}
+        with pytest.raises(KeyError):
+            del document["indicators"]
+
+
+def test_publishable_passes_unread_members_through(raw_path, decoded):
+    with LazyDocument(raw_path) as document:
+        document["market"]["vix"]["current"] = 16.0
+        document["date"] = "2025-09-01"
+        publishable = document.publishable()
+    assert list(publishable) == list(DOCUMENT) + ["date"]
+    assert publishable["market"]["vix"]["current"] == 16.0
+    assert isinstance(publishable["sp500_heatmap_1d"], RawJSON)
+    assert publishable["sp500_heatmap_1d"] == serialize(DOCUMENT["sp500_heatmap_1d"])
+    # 読まれていないメンバーは展開されるだけで、解析はされない
+    assert decoded.count("sp500_heatmap_1d") == 1
+
+
+def test_write_document_publishes_a_lazy_document(raw_path, tmp_path):
+    published_path = str(tmp_path / "data.json")
+    with LazyDocument(raw_path) as document:
+        document["market"]["vix"]["current"] = 16.0
+        write_document(document, [published_path])
+    with open(published_path, 'rb') as f:
+        published = json.load(f)
+    expected = json.loads(serialize(DOCUMENT))
+    expected["market"]["vix"]["current"] = 16.0
+    assert published == dict(expected, version=1)
+
+
+def test_closed_document_keeps_the_read_members(raw_path):
+    document = LazyDocument(raw_path)
+    market = document["market"]
+    document["date"] = "2025-09-01"
+    document.close()
+    assert document["market"] is market and document["date"] == "2025-09-01"
+    assert "news_raw" in document
+    with pytest.raises(ValueError, match="closed"):
+        document["news_raw"]
+
+
+def test_rejects_files_that_are_not_containers(tmp_path):
+    path = tmp_path / "data_raw.bin"
+    path.write_bytes(b'{"market": {}}' * 10)
+    with pytest.raises(ValueError):
+        LazyDocument(str(path))
+
+
+def test_zstd_container_without_zstandard(tmp_path, monkeypatch):
+    if raw_store.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    path = str(tmp_path / "data_raw.bin")
+    write_raw_document(DOCUMENT, path, codec="zstd")
+    monkeypatch.setattr(raw_store, "zstandard", None)
+    assert raw_store.default_codec() == "zlib"
+    with LazyDocument(path) as document:
+        with pytest.raises(ValueError, match="zstandard"):
+            document["market"]
+
+
+def test_replaces_the_file_atomically(tmp_path):
+    path = tmp_path / "data_raw.bin"
+    write_raw_document(DOCUMENT, str(path))
+    size = write_raw_document({"market": {}}, str(path))
+    assert path.stat().st_size == size
+    assert [p.name for p in tmp_path.iterdir()] == ["data_raw.bin"]
+    with LazyDocument(str(path)) as document:
+        assert dict(document) == {"market": {}}
@@ -0,0 +1,250 @@
+import math
+import os
+import sqlite3
+import threading
+
+from .subscription_store import BUSY_TIMEOUT_SECONDS
+
+TIMESERIES_DB_NAME = 'timeseries.db'
+# universe -> (データ文書のヒートマップのキーの接頭辞, 銘柄リストのキー)
+HEATMAP_UNIVERSES = {
+    "sp500": ("sp500_heatmap", "stocks"),
+    "nasdaq": ("nasdaq_heatmap", "stocks"),
+    "sector_etf": ("sector_etf_heatmap", "etfs"),
+}
+PERIODS = ("1d", "1w", "1m")
+# 日中のローソク足を保存する系列: symbol -> data["market"] のキー
+CANDLE_SYMBOLS = {"vix": "vix", "t_note": "t_note_future"}
+FEAR_GREED_FIELDS = ("now", "previous_close", "prev_week", "prev_month", "prev_year")
+
+# 行は (銘柄, 日付) ごとに1行。文字列の繰り返し（セクター・業種）は tickers に1回だけ持つ
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT PRIMARY KEY,
+    sector TEXT,
+    industry TEXT,
+    updated_on TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ticker_daily (
+    ticker TEXT NOT NULL,
+    universe TEXT NOT NULL,
+    date TEXT NOT NULL,
+    market_cap INTEGER,
+    perf_1d REAL,
+    perf_1w REAL,
+    perf_1m REAL,
+    PRIMARY KEY (ticker, universe, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ticker_daily_by_date ON ticker_daily (universe, date);
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    time TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    PRIMARY KEY (symbol, time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS market_daily (
+    date TEXT PRIMARY KEY,
+    vix NUMERIC,
+    t_note NUMERIC,
+    fg_now NUMERIC,
+    fg_previous_close NUMERIC,
+    fg_prev_week NUMERIC,
+    fg_prev_month NUMERIC,
+    fg_prev_year NUMERIC,
+    fg_category TEXT
+) WITHOUT ROWID;
+"""
+
+
+def _number(value):
+    # 取得直後のデータには NaN・Infinity が残っている（ファイルに書くときに null になる）
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def ticker_rows(data, universe):
+    """{ticker: {"sector", "industry", "market_cap", "perf_1d", "perf_1w", "perf_1m"}} of one heatmap universe."""
+    prefix, list_key = HEATMAP_UNIVERSES[universe]
+    rows = {}
+    for period in PERIODS:
+        heatmap = data.get(f"{prefix}_{period}")
+        items = heatmap.get(list_key) if isinstance(heatmap, dict) else None
+        for item in items or []:
+            if not isinstance(item, dict) or not item.get("ticker"):
+                continue
+            row = rows.setdefault(item["ticker"], {"sector": None, "industry": None, "market_cap": None})
+            row[f"perf_{period}"] = _number(item.get("performance"))
+            for key in ("sector", "industry"):
+                row[key] = row[key] or item.get(key)
+            if row["market_cap"] is None:
+                row["market_cap"] = _number(item.get("market_cap"))
+    return rows
+
+
+class TimeSeriesStore:
+    """
+    Per-ticker daily performance, intraday VIX/10Y candles and daily market values in SQLite
+    (data/timeseries.db), so a series over any number of days is an index range scan instead of
+    loading one whole data_YYYY-MM-DD.json per day. Unlike the dated files it is never pruned.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, TIMESERIES_DB_NAME)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def record(self, date, data):
+        """Stores (or replaces) the values of one day's data document. Returns the number of ticker rows."""
+        conn = self._connection()
+        market = data.get("market") if isinstance(data.get("market"), dict) else {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = 0
+            for universe in HEATMAP_UNIVERSES:
+                rows = ticker_rows(data, universe)
+                conn.executemany(
+                    "INSERT INTO tickers (ticker, sector, industry, updated_on) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(ticker) DO UPDATE SET sector = COALESCE(excluded.sector, sector), "
+                    "industry = COALESCE(excluded.industry, industry), updated_on = excluded.updated_on "
+                    "WHERE excluded.updated_on >= updated_on",
+                    [(ticker, row["sector"], row["industry"], date) for ticker, row in rows.items()])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO ticker_daily (ticker, universe, date, market_cap, perf_1d, perf_1w, perf_1m) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(ticker, universe, date, row["market_cap"], row.get("perf_1d"), row.get("perf_1w"), row.get("perf_1m"))
+                     for ticker, row in rows.items()])
+                count += len(rows)
+
+            for symbol, key in CANDLE_SYMBOLS.items():
+                series = market.get(key) if isinstance(market.get(key), dict) else {}
+                # 日中足は日をまたいで重なるため、時刻をキーにして重複を持たない
+                conn.executemany(
+                    "INSERT OR REPLACE INTO candles (symbol, time, open, high, low, close) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(symbol, candle["time"], _number(candle.get("open")), _number(candle.get("high")),
+                      _number(candle.get("low")), _number(candle.get("close")))
+                     for candle in series.get("history") or [] if isinstance(candle, dict) and candle.get("time")])
+
+            fear_greed = market.get("fear_and_greed") if isinstance(market.get("fear_and_greed"), dict) else {}
+            vix = market.get("vix") if isinstance(market.get("vix"), dict) else {}
+            t_note = market.get("t_note_future") if isinstance(market.get("t_note_future"), dict) else {}
+            conn.execute(
+                "INSERT OR REPLACE INTO market_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (date, _number(vix.get("current")), _number(t_note.get("current")),
+                 *(_number(fear_greed.get(field)) for field in FEAR_GREED_FIELDS), fear_greed.get("category")))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def dates(self):
+        return [row[0] for row in self._connection().execute("SELECT date FROM market_daily ORDER BY date")]
+
+    def ticker_history(self, ticker, period="1d", start=None, end=None, universe=None):
+        """[[date, performance], ...] of one ticker (e.g. XLK over 1m), oldest first."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        query = f"SELECT date, perf_{period} FROM ticker_daily WHERE ticker = ?"
+        params = [ticker]
+        if universe is not None:
+            query += " AND universe = ?"
+            params.append(universe)
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(end)
+        # 同じ銘柄が複数の universe（S&P 500 と NASDAQ 100）にあっても日付ごとに1点にする
+        query += " GROUP BY date ORDER BY date"
+        return [[date, value] for date, value in self._connection().execute(query, params)]
+
+    def heatmap(self, date, universe, period="1d"):
+        """The heatmap section of a past day in the shape of the data document ({"stocks": [...]} / {"etfs": [...]})."""
+        if universe not in HEATMAP_UNIVERSES or period not in PERIODS:
+            raise ValueError(f"Unknown heatmap: {universe} {period}")
+        list_key = HEATMAP_UNIVERSES[universe][1]
+        rows = self._connection().execute(
+            f"SELECT d.ticker, t.sector, t.industry, d.market_cap, d.perf_{period} FROM ticker_daily d "
+            "LEFT JOIN tickers t ON t.ticker = d.ticker WHERE d.universe = ? AND d.date = ? "
+            "ORDER BY d.market_cap DESC, d.ticker", (universe, date))
+        if list_key == "etfs":
+            return {"etfs": [{"ticker": ticker, "performance": performance}
+                             for ticker, _, _, _, performance in rows]}
+        return {"stocks": [{"ticker": ticker, "sector": sector, "industry": industry, "market_cap": market_cap,
+                            "performance": performance}
+                           for ticker, sector, industry, market_cap, performance in rows]}
+
+    def candles(self, symbol, start=None, end=None):
+        """Intraday candles of vix / t_note between two ISO times (inclusive), oldest first."""
+        if symbol not in CANDLE_SYMBOLS:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        query = "SELECT time, open, high, low, close FROM candles WHERE symbol = ?"
+        params = [symbol]
+        if start is not None:
+            query += " AND time >= ?"
+            params.append(start)
+        if end is not None:
+            # 日付だけの指定はその日の終わりまでを含める
+            query += " AND time <= ?"
+            params.append(end if 'T' in end else end + 'T99')
+        query += " ORDER BY time"
+        return [{"time": time_, "open": open_, "high": high, "low": low, "close": close}
+                for time_, open_, high, low, close in self._connection().execute(query, params)]
+
+    def market(self, date):
+        """The daily VIX/10Y values and Fear & Greed of a day, in the shape of data["market"] (without candles)."""
+        row = self._connection().execute("SELECT * FROM market_daily WHERE date = ?", (date,)).fetchone()
+        if row is None:
+            return None
+        _, vix, t_note, *fear_greed, category = row
+        return {
+            "vix": {"current": vix},
+            "t_note_future": {"current": t_note},
+            "fear_and_greed": dict(zip(FEAR_GREED_FIELDS, fear_greed), category=category),
+        }
+
+
+def backfill(data_dir):
+    """Records every data_YYYY-MM-DD.json still in data_dir. Returns the dates recorded."""
+    import json
+    from .data_archive import DATED_FILE_PATTERN
+
+    store = TimeSeriesStore(data_dir)
+    recorded = []
+    for filename in sorted(os.listdir(data_dir)):
+        match = DATED_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        try:
+            with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+                store.record(match.group(1), json.load(f))
+            recorded.append(match.group(1))
+        except (OSError, ValueError):
+            continue
+    return recorded
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m backend.timeseries_store",
+                                     description="Record the dated data files into data/timeseries.db")
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+    dates = backfill(args.data_dir)
+    print(f"Recorded {len(dates)} days into {os.path.join(args.data_dir, TIMESERIES_DB_NAME)}")
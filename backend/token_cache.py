@@ -0,0 +1,61 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from jose import jwt
+
+# 検証済みトークンを覚えておく数（ダッシュボードの同時利用者数より十分大きければよい）
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '1024'))
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of JWTs that already passed jwt.decode, keyed by the SHA-256 of the token.
+    A hit skips python-jose's signature check and claims parsing; an entry is only used until the
+    token's exp, and the whole cache is dropped when the secret changes (key rotation).
+    """
+
+    def __init__(self, maxsize=AUTH_TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (payload, expires_at)
+        self._secret = None
+        self._lock = threading.Lock()
+
+    def decode(self, token, secret, algorithms):
+        """jwt.decode with a cache of successful results. Raises JWTError like jwt.decode."""
+        if self.maxsize <= 0:
+            return jwt.decode(token, secret, algorithms=algorithms)
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            if secret != self._secret:
+                self._entries.clear()
+                self._secret = secret
+            entry = self._entries.get(digest)
+            if entry is not None:
+                if entry[1] is None or entry[1] > now:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return entry[0]
+                # 期限切れ: jwt.decode に ExpiredSignatureError を出させる
+                del self._entries[digest]
+            self.misses += 1
+
+        payload = jwt.decode(token, secret, algorithms=algorithms)
+        exp = payload.get("exp")
+        with self._lock:
+            # 検証中に鍵が変わった場合は、古い鍵で検証した結果を残さない
+            if secret == self._secret:
+                self._entries[digest] = (payload, float(exp) if exp is not None else None)
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
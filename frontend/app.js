@@ -13,6 +13,12 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- State ---
     let failedAttempts = 0;
     const MAX_ATTEMPTS = 5;
+    const PARTIAL_DATA_REFRESH_MS = 30000; // AI解説の生成中に再取得する間隔
+    let partialRefreshTimer = null;
+    let dataEvents = null; // /api/events のEventSource
+    let dataEventsRetryMs = 1000; // 再接続までの待ち時間（失敗するたびに倍、最大 DATA_EVENTS_MAX_RETRY_MS）
+    const DATA_EVENTS_MAX_RETRY_MS = 60000;
+    const MAIN_TOKEN_KEY = 'hanaview-main-token'; // 通知用クッキーの更新に使うメイントークン（30日間）
 
     // --- Main App Logic ---
 
@@ -47,6 +53,7 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log("HanaView Dashboard Initialized");
             initTabs();
             fetchDataAndRender();
+            connectDataEvents();
             initSwipeNavigation();
             dashboardContainer.dataset.initialized = 'true';
         }
@@ -114,6 +121,8 @@ document.addEventListener('DOMContentLoaded', () => {
             });
 
             if (response.ok) {
+                const result = await response.json();
+                if (result.token) localStorage.setItem(MAIN_TOKEN_KEY, result.token);
                 showDashboard();
             } else {
                 failedAttempts++;
@@ -151,6 +160,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 .then(reg => console.log('Service Worker registered.', reg))
                 .catch(err => console.log('Service Worker registration failed: ', err));
         });
+        navigator.serviceWorker.addEventListener('message', event => {
+            if (event.data.type === 'data-refreshed' && dataMeta) {
+                // キャッシュから表示したmetaが裏の再検証で古いと分かったら、差分を取得して描画し直す
+                fetchDataAndRender();
+            } else if (event.data.type === 'auth-expired') {
+                // キャッシュから表示中に裏の再検証が401になった（Service Workerはデータのキャッシュを削除済み）
+                handleDataError(new AuthError());
+            }
+        });
     }
 
     // --- Tab-switching logic ---
@@ -167,6 +185,9 @@ document.addEventListener('DOMContentLoaded', () => {
             document.querySelectorAll('.tab-pane').forEach(pane => {
                 pane.classList.toggle('active', pane.id === `${targetTab}-content`);
             });
+
+            // タブを開いたときに、そのタブのデータだけを取得して描画する
+            if (dataMeta) showTabData(targetTab);
         });
     }
 
@@ -263,6 +284,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }).observe(container);
     }
 
+    // ハッシュ付きURLは内容が変わるとURLも変わるため、キャッシュ回避用のクエリは付けない
+    function renderGaugeImage(fgData) {
+        const style = 'max-width: 100%; height: auto;';
+        const alt = 'Fear and Greed Index Gauge';
+        const assets = fgData.gauge_assets;
+
+        if (assets && assets.svg) {
+            // 以前のデータでは svg はURLの文字列のみ（大きさを持たない）
+            const svg = typeof assets.svg === 'string' ? { url: assets.svg } : assets.svg;
+            const size = svg.width && svg.height ? ` width="${svg.width}" height="${svg.height}"` : '';
+            return `<img src="${svg.url}" alt="${alt}"${size} style="${style}">`;
+        }
+        if (assets && assets.png && assets.png.length > 0) {
+            const srcset = (variants) => variants.map(v => `${v.url} ${v.width}w`).join(', ');
+            const sizes = '(max-width: 700px) 100vw, 640px';
+            const fallback = assets.png.find(v => v.width >= 640) || assets.png[assets.png.length - 1];
+            const webp = assets.webp && assets.webp.length > 0
+                ? `<source type="image/webp" srcset="${srcset(assets.webp)}" sizes="${sizes}">`
+                : '';
+            return `<picture>${webp}<img src="${fallback.url}" srcset="${srcset(assets.png)}" sizes="${sizes}" alt="${alt}" width="${fallback.width}" height="${fallback.height}" style="${style}"></picture>`;
+        }
+
+        // Add a cache-busting query parameter
+        const timestamp = new Date().getTime();
+        const gaugeImage = fgData.gauge_image || '/fear_and_greed_gauge.png';
+        return `<img src="${gaugeImage}?v=${timestamp}" alt="${alt}" style="${style}">`;
+    }
+
     function renderMarketOverview(container, marketData, lastUpdated) {
         if (!container) return;
         container.innerHTML = ''; // Clear content
@@ -275,13 +324,11 @@ document.addEventListener('DOMContentLoaded', () => {
         // Fear & Greed Index
         const fgData = marketData.fear_and_greed;
         if (fgData) {
-            // Add a cache-busting query parameter
-            const timestamp = new Date().getTime();
             content += `
                 <div class="market-section">
                     <h3>Fear & Greed Index</h3>
                     <div class="fg-container" style="display: flex; justify-content: center; align-items: center; min-height: 400px;">
-                        <img src="/fear_and_greed_gauge.png?v=${timestamp}" alt="Fear and Greed Index Gauge" style="max-width: 100%; height: auto;">
+                        ${renderGaugeImage(fgData)}
                     </div>
                 </div>
             `;
@@ -798,7 +845,9 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function renderHeatmapCommentary(container, commentary, lastUpdated) {
-        if (!container || !commentary) return;
+        if (!container) return;
+        container.innerHTML = '';
+        if (!commentary) return;
 
         // Create a wrapper card for the commentary
         const card = document.createElement('div');
@@ -821,47 +870,267 @@ document.addEventListener('DOMContentLoaded', () => {
         container.appendChild(card);
     }
 
-    async function fetchDataAndRender() {
-        try {
-            const response = await fetch('/api/data');
-            if (!response.ok) {
-                // If token expires, API will return 401, redirect to auth
-                if (response.status === 401) {
-                    showAuthScreen();
-                    return;
-                }
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const data = await response.json();
-            console.log("Data fetched successfully:", data);
-
-            const lastUpdatedEl = document.getElementById('last-updated');
-            if (data.last_updated) {
-                lastUpdatedEl.textContent = `Last updated: ${new Date(data.last_updated).toLocaleString('ja-JP')}`;
-            }
-
-            renderMarketOverview(document.getElementById('market-content'), data.market, data.last_updated);
-            renderNews(document.getElementById('news-content'), data.news, data.last_updated);
+    // タブごとに必要なデータセクション（/api/data/{section}）
+    const TAB_SECTIONS = {
+        market: ['market'],
+        news: ['news'],
+        nasdaq: ['nasdaq_heatmap_1d', 'nasdaq_heatmap_1w', 'nasdaq_heatmap_1m', 'heatmap_commentary'],
+        sp500: ['sp500_combined_heatmap_1d', 'sp500_combined_heatmap_1w', 'sp500_combined_heatmap_1m', 'heatmap_commentary'],
+        indicators: ['indicators'],
+        world: [],
+        column: ['column'],
+    };
 
-            // Render NASDAQ Heatmaps
+    const TAB_RENDERERS = {
+        market: (data) => renderMarketOverview(document.getElementById('market-content'), data.market, data.last_updated),
+        news: (data) => renderNews(document.getElementById('news-content'), data.news, data.last_updated),
+        nasdaq: (data) => {
             renderGridHeatmap(document.getElementById('nasdaq-heatmap-1d'), 'Nasdaq (1-Day)', data.nasdaq_heatmap_1d);
             renderGridHeatmap(document.getElementById('nasdaq-heatmap-1w'), 'Nasdaq (1-Week)', data.nasdaq_heatmap_1w);
             renderGridHeatmap(document.getElementById('nasdaq-heatmap-1m'), 'Nasdaq (1-Month)', data.nasdaq_heatmap_1m);
             renderHeatmapCommentary(document.getElementById('nasdaq-commentary'), data.nasdaq_heatmap?.ai_commentary, data.last_updated);
-
+        },
+        sp500: (data) => {
             // Render S&P 500 & Sector ETF Combined Heatmaps
             renderGridHeatmap(document.getElementById('sp500-heatmap-1d'), 'SP500 & Sector ETFs (1-Day)', data.sp500_combined_heatmap_1d);
             renderGridHeatmap(document.getElementById('sp500-heatmap-1w'), 'SP500 & Sector ETFs (1-Week)', data.sp500_combined_heatmap_1w);
             renderGridHeatmap(document.getElementById('sp500-heatmap-1m'), 'SP500 & Sector ETFs (1-Month)', data.sp500_combined_heatmap_1m);
             renderHeatmapCommentary(document.getElementById('sp500-commentary'), data.sp500_heatmap?.ai_commentary, data.last_updated);
+        },
+        indicators: (data) => renderIndicators(document.getElementById('indicators-content'), data.indicators, data.last_updated),
+        column: (data) => renderColumn(document.getElementById('column-content'), data.column),
+    };
+
+    // 取得済みセクションのデータとETag、描画済みタブ
+    let dataMeta = null;
+    const sectionData = {};
+    const sectionEtags = {};
+    const renderedTabs = new Set();
+    let firstRenderLogged = false;
+
+    class AuthError extends Error {}
+
+    async function fetchSection(name) {
+        // ETagによる再検証（304）はブラウザのHTTPキャッシュに任せる
+        const response = await fetch(`/api/data/${name}`);
+        if (!response.ok) {
+            // If token expires, API will return 401, redirect to auth
+            if (response.status === 401) throw new AuthError();
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json();
+    }
+
+    // セクションは meta の版（ETag）をURLに含めて取得し、Service Workerが版ごとにキャッシュできるようにする
+    async function fetchSectionData(name) {
+        const version = dataMeta && dataMeta.sections[name];
+        const response = await fetch(version ? `/api/data/${name}?v=${encodeURIComponent(version)}` : `/api/data/${name}`);
+        if (!response.ok) {
+            if (response.status === 401) throw new AuthError();
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        // 実際に受け取った版を記録する（meta の取得後にサーバー側が更新されている場合がある）
+        const etag = response.headers.get('ETag');
+        return {
+            payload: await response.json(),
+            etag: etag ? etag.replace(/^W\//, '').replace(/-(br|gzip)"$/, '"') : version,
+        };
+    }
+
+    function activeTab() {
+        const active = document.querySelector('.tab-button.active');
+        return active ? active.dataset.tab : 'market';
+    }
 
-            renderIndicators(document.getElementById('indicators-content'), data.indicators, data.last_updated);
-            renderColumn(document.getElementById('column-content'), data.column);
+    async function loadTab(tab) {
+        const sections = TAB_SECTIONS[tab] || [];
+        const missing = sections.filter(name => !(name in sectionData));
+        const results = await Promise.all(missing.map(fetchSectionData));
+        missing.forEach((name, i) => {
+            sectionData[name] = results[i].payload;
+            sectionEtags[name] = results[i].etag;
+        });
+
+        if (renderedTabs.has(tab) || !TAB_RENDERERS[tab]) return;
+        const data = Object.assign({ last_updated: dataMeta.last_updated }, ...sections.map(name => sectionData[name]));
+        TAB_RENDERERS[tab](data);
+        renderedTabs.add(tab);
+        if (!firstRenderLogged) {
+            // 起動から最初の描画までの時間（Service Workerのキャッシュ有無の比較用）
+            firstRenderLogged = true;
+            performance.mark('hanaview-first-render');
+            console.info(`First render after ${Math.round(performance.now())} ms`);
+        }
+    }
 
+    async function showTabData(tab) {
+        try {
+            await loadTab(tab);
         } catch (error) {
-            console.error("Failed to fetch data:", error);
-            document.getElementById('dashboard-content').innerHTML = `<div class="card"><p>データの読み込みに失敗しました: ${error.message}</p></div>`;
+            handleDataError(error);
+        }
+    }
+
+    function handleDataError(error) {
+        if (error instanceof AuthError) {
+            showAuthScreen();
+            return;
+        }
+        if (renderedTabs.size > 0 && !navigator.onLine) {
+            // オフライン中の更新失敗は、表示中（キャッシュ済み）のデータをそのまま残す
+            console.warn("Offline, keeping the cached data:", error);
+            return;
+        }
+        console.error("Failed to fetch data:", error);
+        document.getElementById('dashboard-content').innerHTML = `<div class="card"><p>データの読み込みに失敗しました: ${error.message}</p></div>`;
+    }
+
+    // RFC 6902 JSON Patch（add / remove / replace）をその場で適用する
+    function applyJsonPatch(target, operations) {
+        for (const operation of operations) {
+            const tokens = operation.path.split('/').slice(1).map(t => t.replace(/~1/g, '/').replace(/~0/g, '~'));
+            const last = tokens.pop();
+            let parent = target;
+            for (const token of tokens) {
+                parent = parent[Array.isArray(parent) ? Number(token) : token];
+                if (parent === undefined || parent === null) throw new Error(`Invalid patch path: ${operation.path}`);
+            }
+            if (Array.isArray(parent)) {
+                const index = last === '-' ? parent.length : Number(last);
+                if (operation.op === 'add') parent.splice(index, 0, operation.value);
+                else if (operation.op === 'remove') parent.splice(index, 1);
+                else if (operation.op === 'replace') parent[index] = operation.value;
+                else throw new Error(`Unsupported patch operation: ${operation.op}`);
+            } else {
+                if (operation.op === 'add' || operation.op === 'replace') parent[last] = operation.value;
+                else if (operation.op === 'remove') delete parent[last];
+                else throw new Error(`Unsupported patch operation: ${operation.op}`);
+            }
+        }
+    }
+
+    function invalidateSection(name) {
+        delete sectionData[name];
+        delete sectionEtags[name];
+        for (const [tab, sections] of Object.entries(TAB_SECTIONS)) {
+            if (sections.includes(name)) renderedTabs.delete(tab);
+        }
+    }
+
+    // 取得済みのセクションのうち、内容が変わったものにだけ差分を適用する
+    function applyDelta(patch, newMeta) {
+        for (const name of Object.keys(sectionData)) {
+            const etag = newMeta.sections[name];
+            if (etag === sectionEtags[name]) continue;
+            if (sectionEtags[name] !== dataMeta.sections[name]) {
+                // 差分の基準（取得済みのmetaの版）と異なる版のセクションには適用できない
+                invalidateSection(name);
+                continue;
+            }
+            const section = sectionData[name];
+            const operations = patch.filter(op => op.path.split('/')[1].replace(/~1/g, '/').replace(/~0/g, '~') in section);
+            try {
+                if (operations.length === 0) throw new Error('No operations for a changed section');
+                applyJsonPatch(section, operations);
+                sectionEtags[name] = etag;
+                for (const [tab, sections] of Object.entries(TAB_SECTIONS)) {
+                    if (sections.includes(name)) renderedTabs.delete(tab);
+                }
+            } catch (error) {
+                // 部分的なセクションに適用できない差分は、セクションごと取り直す
+                invalidateSection(name);
+            }
+        }
+    }
+
+    async function fetchDataAndRender() {
+        try {
+            if (dataMeta && dataMeta.version) {
+                // 取得済みの版からの差分（JSON Patch）だけを受け取る
+                const delta = await fetchSection(`delta?since=${dataMeta.version}&fallback=none`);
+                if (delta.patch) {
+                    applyDelta(delta.patch, delta.meta);
+                } else {
+                    // 版が古すぎて差分が無い場合は、ETagが変わったセクションを取り直す
+                    for (const [name, etag] of Object.entries(sectionEtags)) {
+                        if (delta.meta.sections[name] !== etag) invalidateSection(name);
+                    }
+                }
+                dataMeta = delta.meta;
+            } else {
+                // 小さなmetaだけを先に読み、開いているタブのセクションだけを取得する
+                dataMeta = await fetchSection('meta');
+                // 内容が変わったセクションは破棄し、それを使うタブを描画し直す
+                for (const [name, etag] of Object.entries(sectionEtags)) {
+                    if (dataMeta.sections[name] !== etag) invalidateSection(name);
+                }
+            }
+            console.log("Data index fetched successfully:", dataMeta);
+
+            const lastUpdatedEl = document.getElementById('last-updated');
+            if (dataMeta.last_updated) {
+                lastUpdatedEl.textContent = `Last updated: ${new Date(dataMeta.last_updated).toLocaleString('ja-JP')}`;
+            }
+
+            await loadTab(activeTab());
+
+            // AI解説の生成中（readyフラグが未完了）の場合は、揃うまで定期的に再取得する
+            clearTimeout(partialRefreshTimer);
+            if (dataMeta.ready && Object.values(dataMeta.ready).some(ready => !ready)) {
+                partialRefreshTimer = setTimeout(fetchDataAndRender, PARTIAL_DATA_REFRESH_MS);
+            }
+
+        } catch (error) {
+            handleDataError(error);
+        }
+    }
+
+    // --- Live updates (Server-Sent Events) ---
+    // 新しいデータが公開されるとサーバーから通知され、差分だけを取得する
+    function connectDataEvents() {
+        if (!('EventSource' in window) || dataEvents) return;
+        // 切断時はEventSourceが自動で再接続し、Last-Event-IDで受け取り済みの版を伝える
+        dataEvents = new EventSource('/api/events', { withCredentials: true });
+        dataEvents.addEventListener('open', () => {
+            dataEventsRetryMs = 1000;
+        });
+        dataEvents.addEventListener('data-update', event => {
+            const update = JSON.parse(event.data);
+            // 初回の取得中（dataMeta未設定）はその取得で最新版が得られる
+            if (dataMeta && update.version !== dataMeta.version) {
+                fetchDataAndRender();
+            }
+        });
+        dataEvents.addEventListener('error', () => {
+            // 200以外の応答（通知用クッキーの期限切れによる401など）では、ブラウザは再接続せずに閉じる
+            if (dataEvents.readyState !== EventSource.CLOSED) return;
+            dataEvents = null;
+            const delay = dataEventsRetryMs;
+            dataEventsRetryMs = Math.min(dataEventsRetryMs * 2, DATA_EVENTS_MAX_RETRY_MS);
+            setTimeout(reconnectDataEvents, delay);
+        });
+    }
+
+    async function reconnectDataEvents() {
+        const token = localStorage.getItem(MAIN_TOKEN_KEY);
+        if (token) {
+            try {
+                const response = await fetch('/api/auth/notification-cookie', {
+                    method: 'POST',
+                    headers: { 'Authorization': `Bearer ${token}` },
+                    credentials: 'same-origin',
+                });
+                if (response.status === 401) {
+                    // メイントークンも期限切れ：PINの再入力が必要
+                    localStorage.removeItem(MAIN_TOKEN_KEY);
+                    showAuthScreen();
+                    return;
+                }
+            } catch (error) {
+                console.warn('Could not renew the notification cookie:', error);
+            }
         }
+        connectDataEvents();
     }
 
     // --- Swipe Navigation for Tabs ---
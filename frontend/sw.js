@@ -1,4 +1,194 @@
-// frontend/sw.js - 通知受信部分のみに集中
+// frontend/sw.js - 通知の受信と、アプリ本体・市況データのキャッシュ
+
+// キャッシュの形式を変えたら版を上げる（古いキャッシュはactivateで削除）
+const CACHE_VERSION = 'v1';
+const SHELL_CACHE = `hanaview-shell-${CACHE_VERSION}`;
+const DATA_CACHE = `hanaview-data-${CACHE_VERSION}`;
+// build_frontend のハッシュ付きファイル名 (<name>.<12桁のハッシュ>.<拡張子>)
+const HASHED_ASSET_PATTERN = /\.[0-9a-f]{12}\.\w+$/;
+// 最新版を表す小さな応答。キャッシュから即座に返し、裏でETagを使って再検証する
+const REVALIDATED_DATA_PATHS = ['/api/data', '/api/data/meta'];
+const SHELL_FILES = ['/', '/manifest.json', '/icons/icon-192x192.png', '/icons/icon-512x512.png'];
+
+// --- App shell precache ---
+async function shellAssets() {
+    // build_frontend のマニフェストがあればハッシュ付きの名前を使う（開発時は元の名前）
+    try {
+        const response = await fetch('/asset-manifest.json', { cache: 'no-cache' });
+        if (response.ok) return Object.values(await response.json()).map(name => `/${name}`);
+    } catch (error) {
+        console.log('No asset manifest, precaching unbuilt assets');
+    }
+    return ['/app.js', '/style.css'];
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.addAll(SHELL_FILES.concat(await shellAssets()));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const keep = [SHELL_CACHE, DATA_CACHE];
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => name.startsWith('hanaview-') && !keep.includes(name))
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+// --- Helpers ---
+function identityEtag(etag) {
+    // 圧縮ごとのETag ("<hash>-br") を meta.sections の値と比較できる形に戻す
+    return etag ? etag.replace(/^W\//, '').replace(/-(br|gzip)"$/, '"') : null;
+}
+
+async function notifyClients(message) {
+    const windows = await self.clients.matchAll({ type: 'window' });
+    windows.forEach(client => client.postMessage(message));
+}
+
+// キャッシュがあれば即座に返し、revalidate（ネットワークからの更新）は裏で続ける
+async function staleWhileRevalidate(event, cacheName, request, revalidate) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    const network = revalidate(cache, cached);
+    if (cached) {
+        event.waitUntil(network.catch(() => null));
+        return cached;
+    }
+    return network;
+}
+
+// --- Strategies ---
+// アプリ本体（index.html・外部ライブラリなど）
+function revalidateShell(request, isDocument = false) {
+    return async (cache) => {
+        const response = await fetch(request);
+        if (response.ok || response.type === 'opaque') {
+            if (isDocument && response.ok) {
+                // 新しい index.html が参照するハッシュ付きファイルを先に揃え、次回オフラインでも開けるようにする
+                const html = await response.clone().text();
+                const assets = [...html.matchAll(/(?:src|href)="\.?\/?([^"]+\.[0-9a-f]{12}\.\w+)"/g)].map(m => `/${m[1]}`);
+                await cache.addAll(assets);
+            }
+            await cache.put(request, response.clone());
+        }
+        return response;
+    };
+}
+
+// 内容ハッシュ付きのファイルは内容が変わらないため、キャッシュがあればそれを使う
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) await cache.put(request, response.clone());
+    return response;
+}
+
+// 認証が切れた端末には保存済みのデータも残さず、裏の再検証で分かった場合は画面にPIN認証へ戻らせる
+async function expireData(background) {
+    await caches.delete(DATA_CACHE);
+    if (background) await notifyClients({ type: 'auth-expired' });
+}
+
+// /api/data・/api/data/meta: 保存済みのETagで再検証し、内容が変わったときだけ保存して画面に知らせる
+function revalidateData(request) {
+    return async (cache, cached) => {
+        const headers = new Headers(request.headers);
+        const cachedEtag = cached && cached.headers.get('ETag');
+        if (cachedEtag) headers.set('If-None-Match', cachedEtag);
+        const response = await fetch(new Request(request, { headers, cache: 'no-store' }));
+        if (response.status === 401) {
+            // キャッシュから表示済みなら401は画面に届かないため、メッセージで知らせる
+            await expireData(Boolean(cached));
+            return response;
+        }
+        if (response.status === 304 && cached) return cached;
+        if (response.ok) {
+            await cache.put(request, response.clone());
+            if (cached && identityEtag(response.headers.get('ETag')) !== identityEtag(cachedEtag)) {
+                await notifyClients({ type: 'data-refreshed' });
+            }
+        }
+        return response;
+    };
+}
+
+// /api/data/{section}?v=<ETag>: 版（ETag）ごとに内容が決まるため、キャッシュを優先する
+async function sectionResponse(request, url) {
+    const cache = await caches.open(DATA_CACHE);
+    const version = url.searchParams.get('v');
+    if (!version) {
+        // 版の指定が無い場合はネットワークを優先し、オフライン時のみ最後に保存した版を使う
+        try {
+            const response = await fetch(request);
+            if (response.status === 401) await expireData(false);
+            return response;
+        } catch (error) {
+            const cached = await cache.match(request, { ignoreSearch: true });
+            if (cached) return cached;
+            throw error;
+        }
+    }
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.status === 401) {
+        await expireData(false);
+        return response;
+    }
+    // サーバーが既に次の版を返した場合は、要求した版としては保存しない
+    if (response.ok && identityEtag(response.headers.get('ETag')) === version) {
+        await cache.put(request, response.clone());
+        // 同じセクションの古い版は削除する
+        const keys = await cache.keys();
+        await Promise.all(keys.filter(key => {
+            const cachedUrl = new URL(key.url);
+            return cachedUrl.pathname === url.pathname && cachedUrl.searchParams.get('v') !== version;
+        }).map(key => cache.delete(key)));
+    }
+    return response;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        // CDNのチャートライブラリもキャッシュし、オフラインで描画できるようにする
+        if (request.destination === 'script') {
+            event.respondWith(staleWhileRevalidate(event, SHELL_CACHE, request, revalidateShell(request)));
+        }
+        return;
+    }
+
+    if (url.pathname.startsWith('/api/')) {
+        if (REVALIDATED_DATA_PATHS.includes(url.pathname)) {
+            event.respondWith(staleWhileRevalidate(event, DATA_CACHE, request, revalidateData(request)));
+        } else if (/^\/api\/data\/[a-z0-9_]+$/.test(url.pathname) && url.pathname !== '/api/data/delta') {
+            event.respondWith(sectionResponse(request, url));
+        }
+        // 差分・イベント・認証などはキャッシュしない
+        return;
+    }
+
+    if (request.mode === 'navigate') {
+        // どのURLで開いても、キャッシュ済みの index.html ('/') で即座に描画する
+        const shell = new Request('/');
+        event.respondWith(staleWhileRevalidate(event, SHELL_CACHE, shell, revalidateShell(shell, true)));
+    } else if (HASHED_ASSET_PATTERN.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    } else if (SHELL_FILES.includes(url.pathname) || url.pathname === '/app.js' || url.pathname === '/style.css') {
+        event.respondWith(staleWhileRevalidate(event, SHELL_CACHE, request, revalidateShell(request)));
+    }
+});
 
 // Push通知受信
 self.addEventListener('push', event => {
@@ -27,12 +217,16 @@ self.addEventListener('push', event => {
         }
     };
 
-    event.waitUntil(
-        self.registration.showNotification(
-            data.title || 'HanaView更新通知',
-            options
-        )
-    );
+    const tasks = [self.registration.showNotification(data.title || 'HanaView更新通知', options)];
+    if ((data.type || 'data-update') === 'data-update') {
+        // 新しいデータが公開されたので、次に開いたときは最新版を取得させる
+        tasks.push((async () => {
+            const cache = await caches.open(DATA_CACHE);
+            await Promise.all(REVALIDATED_DATA_PATHS.map(path => cache.delete(path)));
+            await notifyClients({ type: 'data-updated' });
+        })());
+    }
+    event.waitUntil(Promise.all(tasks));
 });
 
 // 通知クリック
@@ -42,4 +236,4 @@ self.addEventListener('notificationclick', event => {
     event.waitUntil(
         clients.openWindow('/')
     );
-});
\ No newline at end of file
+});
@@ -7,4 +7,5 @@ set -e
 
 echo "Starting Uvicorn web server..."
 # Start the uvicorn server in the foreground.
-exec uvicorn backend.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# /api/events (SSE) connections never finish on their own, so don't let them block shutdown.
+exec uvicorn backend.main:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown 5
\ No newline at end of file